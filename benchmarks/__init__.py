@@ -0,0 +1,37 @@
+"""Micro-benchmarks for the Semantic services.
+
+Each module can be run on its own from the repository root, e.g.:
+
+    $ python -m benchmarks.benchNumbers
+"""
+import timeit
+
+
+def timePerCall(fn, inputs, number=200, repeat=5):
+    """Measures the best-of-repeat latency of fn over a set of inputs.
+
+    Args:
+        fn (callable): Function of a single argument to be timed.
+        inputs (list): Arguments with which fn is called, in turn.
+        number (int): Number of passes over inputs per measurement.
+        repeat (int): Number of measurements, of which the best is kept.
+
+    Returns:
+        The mean time per call, in microseconds.
+    """
+    def run():
+        for inp in inputs:
+            fn(inp)
+
+    best = min(timeit.repeat(run, number=number, repeat=repeat))
+    return best * 1e6 / (number * len(inputs))
+
+
+def report(title, rows):
+    """Prints a table of (label, *columns) rows under a title."""
+    print(title)
+    print('-' * len(title))
+    for row in rows:
+        label, columns = row[0], row[1:]
+        print('%-40s' % label + ''.join('%16s' % c for c in columns))
+    print('')
@@ -0,0 +1,67 @@
+"""Cost per kilobyte of finding the numbers, quantities, dates and
+arithmetic expressions in a document: with Annotator, which scans the
+document once and shares its tokens and numbers among the extractors,
+against running NumberService, ConversionService, DateService and
+MathService over it one after another, each of which normalizes and splits
+the text again. The services are run over each sentence, as they only
+expect one description at a time."""
+import datetime
+from semantic.annotator import Annotator
+from semantic.dates import DateService
+from semantic.numbers import NumberService
+from semantic.solver import MathService
+from semantic.units import ConversionService
+from benchmarks import timePerCall, report
+from benchmarks.benchDates import CHAT, PROSE
+
+NOW = datetime.datetime(2014, 1, 1, 12, 0)
+
+MEASURES = "The crate weighs twenty-two kilograms and travels at 3.5 miles " \
+    "per hour. Two times three plus four is ten, and the square root of " \
+    "sixteen is four. "
+
+DOCUMENT = CHAT + PROSE + MEASURES
+
+SIZES = (1000, 10000, 100000)
+
+
+def services():
+    numbers = NumberService()
+    units = ConversionService()
+    dates = DateService(now=NOW)
+    math = MathService()
+
+    def annotate(doc):
+        results = []
+        for sentence in doc.split('. '):
+            results.append(numbers.extractNumbers(sentence))
+            results.append(units.extractUnits(sentence))
+            results.append(dates.extractDates(sentence))
+            try:
+                results.append(math.parseEquation(sentence))
+            except Exception:
+                pass
+        return results
+
+    return annotate
+
+
+def main():
+    annotator = Annotator(now=NOW)
+    separate = services()
+    rows = [("size (chars)", "apart (us/KB)", "once (us/KB)",
+             "speedup")]
+    for size in SIZES:
+        doc = (DOCUMENT * (size // len(DOCUMENT) + 1))[:size]
+        number = max(1, 20000 // size)
+        before = timePerCall(separate, [doc], number=number, repeat=3)
+        after = timePerCall(annotator.annotate, [doc], number=number,
+                            repeat=3)
+        kb = size / 1000.0
+        rows.append((size, "%.0f" % (before / kb), "%.0f" % (after / kb),
+                     "%.1fx" % (before / after)))
+    report("Annotating a document", rows)
+
+
+if __name__ == '__main__':
+    main()
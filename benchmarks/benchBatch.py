@@ -0,0 +1,67 @@
+"""Throughput of batch.extractDates over a corpus of short messages as the
+number of worker processes grows, against a loop over
+DateService.extractDates in this process, and the effect of the chunk
+size on the cost of passing inputs between processes. Times include
+starting the pool. Results are checked against the loop's; throughput
+can only grow with the workers up to the number of CPUs."""
+import datetime
+import multiprocessing
+import time
+from semantic import batch
+from semantic.dates import DateService
+from benchmarks import report
+from benchmarks.benchThreads import REQUESTS
+
+NOW = datetime.datetime(2014, 1, 1, 12, 0)
+
+# 20k short messages
+INPUTS = REQUESTS * 20
+
+WORKERS = (1, 2, 4, 8)
+
+CHUNKS = (1, 16, 256, 4096)
+
+
+def throughput(fn, repeat=3):
+    """Measures the best-of-repeat number of inputs handled per second.
+
+    Returns:
+        A tuple (inputs per second, results).
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        results = fn()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return len(INPUTS) / best, results
+
+
+def main():
+    service = DateService(now=NOW)
+    serial, expected = throughput(
+        lambda: [service.extractDates(inp) for inp in INPUTS])
+
+    rows = [("workers (%d CPUs)" % multiprocessing.cpu_count(), "inputs/s",
+             "speedup", "consistent")]
+    rows.append(("loop", "%.0f" % serial, "1.0x", True))
+    for workers in WORKERS:
+        after, results = throughput(lambda: list(batch.extractDates(
+            INPUTS, now=NOW, workers=workers)))
+        rows.append((workers, "%.0f" % after, "%.1fx" % (after / serial),
+                     results == expected))
+    report("batch.extractDates over %d messages" % len(INPUTS), rows)
+
+    workers = multiprocessing.cpu_count()
+    rows = [("chunk size (%d workers)" % workers, "inputs/s", "speedup")]
+    for chunkSize in CHUNKS:
+        after, _ = throughput(lambda: list(batch.extractDates(
+            INPUTS, now=NOW, workers=workers, chunkSize=chunkSize)),
+            repeat=1)
+        rows.append((chunkSize, "%.0f" % after, "%.1fx" % (after / serial)))
+    report("batch.extractDates by chunk size", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Cost per record of resolving the first date in log records, each
+relative to its own timestamp: with a DateService built for every record,
+with a shared service given now per call, and with
+DateService.extractDateArray, which parses each distinct message once and
+resolves every timestamp at once with numpy. Messages repeat, as they do
+in logs, so most of the vectorized cost is numpy's, per record, rather
+than parsing's."""
+import datetime
+import random
+import time
+import numpy as np
+from semantic.dates import DateService
+from benchmarks import report
+
+MESSAGES = [
+    "retrying in %d minutes" % n for n in range(1, 31)
+] + [
+    "backup scheduled for tomorrow at 2:30am",
+    "maintenance window next friday evening",
+    "certificate expires three weeks from monday",
+    "report due June 9 at 1:30pm",
+    "connection reset by peer",
+    "user logged in",
+]
+
+SIZES = (1000, 10000, 100000)
+
+# Largest size on which records are resolved one at a time
+LIMIT = 10000
+
+
+def records(size, seed=0):
+    """Generates size (messages, timestamps) spread over a year."""
+    rng = random.Random(seed)
+    start = datetime.datetime(2014, 1, 1)
+    texts = [rng.choice(MESSAGES) for _ in range(size)]
+    stamps = [start + datetime.timedelta(seconds=rng.randrange(365 * 86400))
+              for _ in range(size)]
+    return texts, stamps
+
+
+def timeBest(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        fn()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    service = DateService()
+    rows = [("records", "new (us/rec)", "shared (us/rec)",
+             "array (us/rec)", "speedup")]
+    for size in SIZES:
+        texts, stamps = records(size)
+        array = np.array(stamps, dtype='datetime64[us]')
+        after = timeBest(lambda: service.extractDateArray(texts, array))
+        after = after * 1e6 / size
+
+        if size > LIMIT:
+            rows.append((size, "-", "-", "%.2f" % after, "-"))
+            continue
+
+        def perRecord():
+            for text, stamp in zip(texts, stamps):
+                DateService(now=stamp).extractDate(text)
+
+        def shared():
+            for text, stamp in zip(texts, stamps):
+                service.extractDate(text, now=stamp)
+
+        before = timeBest(perRecord, repeat=1) * 1e6 / size
+        sharedTime = timeBest(shared, repeat=1) * 1e6 / size
+        rows.append((size, "%.2f" % before, "%.2f" % sharedTime,
+                     "%.2f" % after, "%.0fx" % (before / after)))
+    report("First date in log records", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Cost of DateService.extractDays, extractTimes and extractDates (one pass
+over the text, rather than one each for days and times) against the
+original regular expressions, on a long chat log, on text dense with
+"(weeks|days) from" phrases and on adversarial inputs, as the input grows.
+The scanner's cost per kilobyte should stay flat, while the backtracking
+expressions' grows with the input wherever times are sparse (so fast that
+they're only timed on the smaller inputs)."""
+import datetime
+from semantic.dates import DateService
+from benchmarks import timePerCall, report
+from benchmarks.legacy import LegacyDateService
+
+NOW = datetime.datetime(2014, 1, 1, 12, 0)
+
+CHAT = "hey, can we meet tomorrow at 5:30pm? I'm in the office until the " \
+    "evening. Maybe next friday instead, or in two hours and twenty " \
+    "minutes; otherwise June 9 works. "
+
+PROSE = "The quarterly report was circulated to the whole team, and most " \
+    "of the feedback focused on the sections about hiring and the budget " \
+    "for the coming year. A few people asked for more detail on the " \
+    "roadmap, which we agreed to discuss at the review on March 3. "
+
+RELATIVE = "ship it two weeks from friday, or three days from tomorrow. "
+
+# (label, generator, largest size on which to time the legacy service)
+INPUTS = [
+    ("prose", lambda size: (PROSE * (size // len(PROSE) + 1))[:size],
+     2000),
+    ("chat log", lambda size: (CHAT * (size // len(CHAT) + 1))[:size],
+     100000),
+    ("relative days",
+     lambda size: (RELATIVE * (size // len(RELATIVE) + 1))[:size], 10000),
+    ("repeated 'in'", lambda size: ("in " * size)[:size], 1000),
+    ("unterminated 'in one'",
+     lambda size: ("in " + "one " * size)[:size], 2000),
+]
+
+SIZES = (500, 1000, 2000, 10000, 100000)
+
+
+def main():
+    new = DateService(now=NOW)
+    old = LegacyDateService(now=NOW)
+
+    for method in ("extractDays", "extractTimes", "extractDates"):
+        rows = [("input", "KB", "legacy (us/KB)", "scanner (us/KB)",
+                 "speedup")]
+        for label, generate, limit in INPUTS:
+            for size in SIZES:
+                inp = generate(size)
+                number = max(1, 10000 // size)
+                kb = size / 1000.0
+                after = timePerCall(getattr(new, method), [inp],
+                                    number=number, repeat=3)
+                if size > limit:
+                    rows.append((label, "%g" % kb, "-",
+                                 "%.1f" % (after / kb), "-"))
+                    continue
+
+                before = timePerCall(getattr(old, method), [inp],
+                                     number=number, repeat=3)
+                rows.append((label, "%g" % kb, "%.1f" % (before / kb),
+                             "%.1f" % (after / kb),
+                             "%.1fx" % (before / after)))
+        report("DateService.%s" % method, rows)
+
+
+if __name__ == '__main__':
+    main()
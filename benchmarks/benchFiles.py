@@ -0,0 +1,96 @@
+"""Cost per megabyte and peak memory of finding the dates and numbers in
+log files of growing size: with Annotator.annotateFile, which
+memory-maps each file and annotates it a window at a time, against
+reading the whole file and annotating each of its lines. Peak memory is
+that of Python's own allocations, as traced by tracemalloc, and excludes
+the pages of the mapped file, which the OS can drop at will. The matches
+themselves aren't kept, as a pipeline would write them out."""
+import datetime
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from semantic.annotator import Annotator
+from benchmarks import report
+
+NOW = datetime.datetime(2014, 1, 1, 12, 0)
+
+MESSAGES = [
+    "retrying in %d minutes" % n for n in range(1, 31)
+] + [
+    "backup scheduled for tomorrow at 2:30am",
+    "maintenance window next friday evening, twenty-two hosts",
+    "certificate expires three weeks from monday",
+    "report due June 9 at 1:30pm",
+    "connection reset by peer after 1500 bytes",
+    "user logged in",
+]
+
+SIZES = (1, 4, 16)
+
+
+def writeLog(path, megabytes, seed=0):
+    """Writes a log of timestamped messages of about the given size."""
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        size = 0
+        while size < megabytes * 1000000:
+            line = "2014-01-01 12:00:%02d INFO %s\n" % (
+                rng.randrange(60), rng.choice(MESSAGES))
+            f.write(line)
+            size += len(line)
+
+
+def mapped(annotator, path):
+    count = 0
+    for _ in annotator.annotateFile(path):
+        count += 1
+    return count
+
+
+def whole(annotator, path):
+    count = 0
+    with open(path) as f:
+        for line in f.read().splitlines():
+            count += len(annotator.annotate(line))
+    return count
+
+
+def measure(fn, annotator, path):
+    """Returns the time taken by fn and its peak traced memory, in a
+    second run."""
+    start = time.time()
+    count = fn(annotator, path)
+    elapsed = time.time() - start
+
+    tracemalloc.start()
+    fn(annotator, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, count
+
+
+def main():
+    annotator = Annotator(kinds=[Annotator.NUMBER, Annotator.DATE],
+                          now=NOW)
+    directory = tempfile.mkdtemp()
+    rows = [("file (MB)", "read (s/MB)", "mmap (s/MB)", "read peak (MB)",
+             "mmap peak (MB)", "same matches")]
+    for size in SIZES:
+        path = os.path.join(directory, "log%d.txt" % size)
+        writeLog(path, size)
+        try:
+            before, beforePeak, expected = measure(whole, annotator, path)
+            after, afterPeak, count = measure(mapped, annotator, path)
+        finally:
+            os.unlink(path)
+        rows.append((size, "%.2f" % (before / size), "%.2f" % (after / size),
+                     "%.1f" % (beforePeak / 1e6), "%.1f" % (afterPeak / 1e6),
+                     count == expected))
+    os.rmdir(directory)
+    report("Dates and numbers in a log file", rows)
+
+
+if __name__ == '__main__':
+    main()
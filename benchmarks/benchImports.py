@@ -0,0 +1,57 @@
+"""Import time of each module, measured in a fresh interpreter so that
+nothing is already loaded, along with whether importing it pulled in
+quantities and numpy."""
+import subprocess
+import sys
+from benchmarks import report
+
+MODULES = ["semantic", "semantic.numbers", "semantic.dates",
+           "semantic.solver", "semantic.units", "quantities"]
+
+# Statements timed after the import, e.g., to include first use
+FIRST_USE = {
+    "semantic.units": "semantic.units.ConversionService()"
+}
+
+SCRIPT = """
+import sys, time
+start = time.time()
+import %(module)s
+%(use)s
+elapsed = time.time() - start
+print(elapsed, int('quantities' in sys.modules),
+      int('numpy' in sys.modules))
+"""
+
+
+def timeImport(module, use="pass", repeat=5):
+    """Measures the best-of-repeat time to import a module (and optionally
+    run a statement) in a new interpreter.
+
+    Returns:
+        A tuple (ms, loadedQuantities, loadedNumpy).
+    """
+    best = None
+    for _ in range(repeat):
+        script = SCRIPT % {'module': module, 'use': use}
+        output = subprocess.check_output([sys.executable, '-c', script])
+        elapsed, quantities, numpy = output.decode().split()
+        if best is None or float(elapsed) < best[0]:
+            best = (float(elapsed), quantities == '1', numpy == '1')
+    return (best[0] * 1e3,) + best[1:]
+
+
+def main():
+    rows = [("import", "time (ms)", "quantities", "numpy")]
+    for module in MODULES:
+        uses = [("import " + module, "pass")]
+        if module in FIRST_USE:
+            uses.append(("+ " + FIRST_USE[module], FIRST_USE[module]))
+        for label, use in uses:
+            ms, quantities, numpy = timeImport(module, use)
+            rows.append((label, "%.1f" % ms, quantities, numpy))
+    report("Startup", rows)
+
+
+if __name__ == '__main__':
+    main()
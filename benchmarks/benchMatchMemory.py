@@ -0,0 +1,72 @@
+"""Memory held per date found in a large chat corpus, as returned by
+DateService.extractDates (bare datetimes) and extractDateSpans (Match
+tuples), against the same fields held by a dict or by an instance of a
+class without __slots__. Sizes are those of everything each result list
+keeps alive, as traced by tracemalloc, including the datetimes and the
+text of each span."""
+import datetime
+import gc
+import tracemalloc
+from semantic.dates import DateService
+from benchmarks import report
+from benchmarks.benchDates import CHAT
+
+NOW = datetime.datetime(2014, 1, 1, 12, 0)
+
+# About 1.5MB of text
+CORPUS = CHAT * 10000
+
+
+class Record(object):
+
+    def __init__(self, kind, start, end, text, value):
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.text = text
+        self.value = value
+
+
+def spansAs(convert):
+    def extract(service):
+        return [convert(m) for m in service.extractDateSpans(CORPUS)]
+    return extract
+
+
+REPRESENTATIONS = [
+    ("datetime", lambda service: service.extractDates(CORPUS)),
+    ("Match", lambda service: service.extractDateSpans(CORPUS)),
+    ("dict", spansAs(lambda m: m._asdict())),
+    ("class", spansAs(lambda m: Record(*m))),
+]
+
+
+def footprint(extract, service):
+    """Measures the memory kept alive by the result of extract.
+
+    Returns:
+        A tuple (bytes, number of matches).
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = extract(service)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, len(result)
+
+
+def main():
+    service = DateService(now=NOW)
+    rows = [("result", "matches", "total (KB)", "per match (B)")]
+    for label, extract in REPRESENTATIONS:
+        size, count = footprint(extract, service)
+        rows.append((label, count, "%.0f" % (size / 1e3),
+                     "%.0f" % (float(size) / count)))
+    report("Memory held by dates found in %d KB of text" %
+           (len(CORPUS) // 1000), rows)
+
+
+if __name__ == '__main__':
+    main()
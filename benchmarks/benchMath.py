@@ -0,0 +1,89 @@
+"""Per-call latency of MathService.parseEquation against the original
+recursive evaluator, for equations of increasing length, the cost of
+normalizing the wording of equations against the original regular
+expressions, and the cost of evaluating a compiled Expression, for single
+values and NumPy arrays."""
+import random
+import numpy as np
+from semantic.solver import MathService
+from benchmarks import timePerCall, report
+from benchmarks.legacy import LegacyMathService
+
+CASES = [
+    ("binary", "five plus twenty one and a fifth"),
+    ("unary", "log sin eleven hundred"),
+    ("mixed",
+     "one plus two times three to the second power minus four over two"),
+    ("nested unary", "sqrt sqrt sqrt sixteen plus log log e times three"),
+    ("20 terms", " plus ".join(["two times three"] * 10)),
+    ("200 terms", " plus ".join(["two times three"] * 100)),
+]
+
+
+def main():
+    new = MathService()
+    old = LegacyMathService()
+
+    rows = [("equation", "legacy (us)", "tree (us)", "speedup")]
+    for label, inp in CASES:
+        assert abs(new.parseEquation(inp) - old.parseEquation(inp)) < 1e-9
+        number = 20 if len(inp) > 500 else 200
+        before = timePerCall(old.parseEquation, [inp], number=number)
+        after = timePerCall(new.parseEquation, [inp], number=number)
+        rows.append((label, "%.2f" % before, "%.2f" % after,
+                     "%.1fx" % (before / after)))
+    report("MathService.parseEquation", rows)
+
+    phrase = "two pie plus the square root of nine divided by three cubed"
+    rows = [("words", "legacy (us)", "one pass (us)", "speedup")]
+    for repeat in (1, 10, 100):
+        inp = " plus ".join([phrase] * repeat)
+        number = 20 if repeat > 10 else 200
+        assert ' '.join(new._normalize(inp)) == old._preprocess(inp)
+        before = timePerCall(old._preprocess, [inp], number=number)
+        after = timePerCall(new._normalize, [inp], number=number)
+        rows.append((len(inp.split()), "%.2f" % before, "%.2f" % after,
+                     "%.1fx" % (before / after)))
+    report("MathService normalization", rows)
+
+    # Evaluate a formula for many values of its variable
+    formula = "x squared plus two times x plus one"
+    expression = new.compile(formula, variables=['x'])
+    values = np.linspace(0.0, 1.0, 10000)
+
+    def parseEach(x):
+        return new.parseEquation(formula.replace("x", repr(float(x))))
+
+    perValue = timePerCall(parseEach, values[:100], number=5)
+    rows = [("evaluation", "us per value")]
+    rows.append(("parseEquation per value", "%.3f" % perValue))
+    rows.append(("Expression per value", "%.3f" % timePerCall(
+        expression, values[:100], number=50)))
+    rows.append(("Expression on array", "%.3f" % (timePerCall(
+        expression, [values], number=50) / len(values))))
+    report("MathService.compile (%s)" % formula, rows)
+
+    # Solve a batch of equations drawn from a few templates
+    random.seed(0)
+    templates = ["%d plus %d times %d", "log %d over %d", "%d to the %d",
+                 "%d minus %d divided by sqrt %d"]
+    batch = []
+    for _ in range(2000):
+        template = random.choice(templates)
+        numbers = tuple(random.randint(1, 9)
+                        for _ in range(template.count('%d')))
+        batch.append(template % numbers)
+
+    loop = timePerCall(new.parseEquation, batch, number=1, repeat=3)
+    grouped = timePerCall(new.parseEquations, [batch], number=1,
+                          repeat=3) / len(batch)
+    rows = [("solver", "us per equation", "speedup")]
+    rows.append(("parseEquation loop", "%.2f" % loop, ""))
+    rows.append(("parseEquations", "%.2f" % grouped,
+                 "%.1fx" % (loop / grouped)))
+    report("MathService.parseEquations (%d equations, %d structures)" %
+           (len(batch), len(templates)), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Per-call latency of NumberService.parse against the original backtracking
+parser, for descriptions of increasing length, the cost of
+NumberService.isValid on words which are (and aren't) numbers, and the
+per-item cost of NumberService.parseMany on a repetitive column."""
+from semantic.numbers import NumberService
+from benchmarks import timePerCall, report
+from benchmarks.legacy import LegacyNumberService
+
+CASES = [
+    ("integer", "fifty one million and eleven"),
+    ("long integer",
+     "a hundred and fifty six thousand two hundred and twelve"),
+    ("point", "five hundred and ten point one five"),
+    ("long point",
+     "five hundred and ten point one five nine two six five three five"),
+    ("fraction", "two and a quarter"),
+    ("nested and", "twelve thousand and eleven and one third"),
+    ("long fraction",
+     "nine hundred and ninety nine thousand nine hundred and ninety nine "
+     "and three twenty fifths"),
+]
+
+
+def main():
+    new = NumberService()
+    old = LegacyNumberService()
+
+    rows = [("description", "legacy (us)", "automaton (us)", "speedup")]
+    for label, words in CASES:
+        assert abs(new.parse(words) - old.parse(words)) < 1e-9, words
+        before = timePerCall(old.parse, [words])
+        after = timePerCall(new.parse, [words])
+        rows.append((label, "%.2f" % before, "%.2f" % after,
+                     "%.1fx" % (before / after)))
+    report("NumberService.parse", rows)
+
+    # Misses dominate on real text, which is mostly not numbers
+    misses = ["the", "kilograms", "meeting", "tomorrow", "and", "point"]
+    hits = ["five", "twenty one", "two and a quarter", "5.5"]
+    rows = [("isValid", "legacy (us)", "recognizer (us)", "speedup")]
+    for label, inputs in (("miss", misses), ("hit", hits)):
+        before = timePerCall(old.isValid, inputs)
+        after = timePerCall(new.isValid, inputs)
+        rows.append((label, "%.2f" % before, "%.2f" % after,
+                     "%.1fx" % (before / after)))
+    report("NumberService.isValid", rows)
+
+    # A repetitive column, as seen in ETL jobs
+    column = [words for _, words in CASES] * 1000
+    perLoop = timePerCall(lambda col: [new.parse(w) for w in col],
+                          [column], number=3) / len(column)
+    perBatch = timePerCall(new.parseMany, [column], number=3) / len(column)
+    report("NumberService.parseMany (%d items, %d distinct)" % (
+        len(column), len(CASES)), [
+        ("method", "per item (us)"),
+        ("loop over parse", "%.3f" % perLoop),
+        ("parseMany", "%.3f" % perBatch)])
+
+
+if __name__ == '__main__':
+    main()
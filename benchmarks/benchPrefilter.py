@@ -0,0 +1,68 @@
+"""Cost per kilobyte of Annotator.annotate with and without its
+prefilter, on documents in which a growing share of the sentences
+describe numbers or dates, along with the fraction of sentences the
+prefilter skipped, its own cost alone, and whether the annotations found
+were the same."""
+import datetime
+import random
+from semantic.annotator import Annotator
+from benchmarks import timePerCall, report
+
+NOW = datetime.datetime(2014, 1, 1, 12, 0)
+
+PLAIN = [
+    "The quarterly report was circulated to the whole team.",
+    "Most of the feedback focused on the sections about hiring.",
+    "A few people asked for more detail on the roadmap.",
+    "We agreed to revisit the budget once the review is done.",
+    "Nobody objected to the proposal, so it goes ahead as planned.",
+    "The office will be closed while the carpets are cleaned.",
+]
+
+DESCRIPTIVE = [
+    "Ship twenty-two crates by next friday at 5:30pm.",
+    "The rig weighs 3.5 tonnes and travels at sixty miles per hour.",
+    "Two times three plus four is ten.",
+    "The review is on March 3, in the morning.",
+]
+
+# Fractions of sentences which describe something
+SHARES = (0.05, 0.2, 0.5, 1.0)
+
+
+def document(share, sentences=2000, seed=0):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(DESCRIPTIVE if rng.random() < share
+                               else PLAIN)
+                    for _ in range(sentences))
+
+
+def main():
+    annotator = Annotator(now=NOW)
+    prefiltered = Annotator(now=NOW, prefilter=True)
+    rows = [("describing", "full (us/KB)", "prefilt (us/KB)",
+             "filter (us/KB)", "skipped", "speedup", "same")]
+    for share in SHARES:
+        doc = document(share)
+        kb = len(doc) / 1000.0
+        same = prefiltered.annotate(doc) == annotator.annotate(doc)
+
+        prefilter = prefiltered.prefilter
+        prefilter.checked = prefilter.skipped = 0
+        lowered = doc.lower()
+        prefilter.segments(lowered)
+        skipped = prefilter.skippedFraction
+
+        before = timePerCall(annotator.annotate, [doc], number=3, repeat=3)
+        after = timePerCall(prefiltered.annotate, [doc], number=3, repeat=3)
+        alone = timePerCall(prefilter.segments, [lowered], number=20,
+                            repeat=3)
+        rows.append(("%d%%" % (share * 100), "%.0f" % (before / kb),
+                     "%.0f" % (after / kb), "%.1f" % (alone / kb),
+                     "%.0f%%" % (skipped * 100), "%.1fx" % (before / after),
+                     same))
+    report("Annotator.annotate with a prefilter", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Cost of following the dates in a transcript which arrives a few words
+at a time, with a DateStream against running extractDates on the whole
+transcript after every chunk. The stream's cost per kilobyte should stay
+flat as the transcript grows, while re-extraction's grows with it (so it's
+only timed on the smaller transcripts)."""
+import datetime
+import time
+from semantic.dates import DateService
+from benchmarks import report
+from benchmarks.benchDates import CHAT, PROSE
+
+NOW = datetime.datetime(2014, 1, 1, 12, 0)
+
+# Characters per chunk, as a few words of transcription
+CHUNK = 20
+
+INPUTS = [("chat log", CHAT), ("prose", PROSE)]
+
+SIZES = (1000, 10000, 100000)
+
+# Largest size on which the transcript is re-extracted after every chunk
+LIMIT = 10000
+
+
+def streamed(service, text):
+    stream = service.stream(now=NOW)
+    for i in range(0, len(text), CHUNK):
+        stream.feed(text[i:i + CHUNK])
+    stream.close()
+    return stream.dates
+
+
+def reextracted(service, text):
+    for i in range(CHUNK, len(text) + CHUNK, CHUNK):
+        dates = service.extractDates(text[:i], now=NOW)
+    return dates
+
+
+def timeOnce(fn, *args):
+    start = time.time()
+    result = fn(*args)
+    return time.time() - start, result
+
+
+def main():
+    service = DateService()
+    rows = [("input", "KB", "rerun (us/KB)", "stream (us/KB)",
+             "speedup")]
+    for label, base in INPUTS:
+        for size in SIZES:
+            text = (base * (size // len(base) + 1))[:size]
+            kb = size / 1000.0
+            after, dates = timeOnce(streamed, service, text)
+            assert dates == service.extractDates(text, now=NOW)
+            after = after * 1e6 / kb
+            if size > LIMIT:
+                rows.append((label, "%g" % kb, "-", "%.0f" % after, "-"))
+                continue
+
+            before, _ = timeOnce(reextracted, service, text)
+            before = before * 1e6 / kb
+            rows.append((label, "%g" % kb, "%.0f" % before, "%.0f" % after,
+                         "%.0fx" % (before / after)))
+    report("Dates in a transcript, %d characters at a time" % CHUNK, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Throughput of DateService.extractDates from a pool of threads, as a
+server would call it: with one service shared by every thread and the
+reference time supplied per call, against building a service for every
+request. Results from the shared service are checked against those from
+a single thread. Extraction holds the GIL, so throughput isn't expected to
+grow with the number of threads, only to hold steady."""
+import datetime
+import time
+from multiprocessing.pool import ThreadPool
+from semantic.dates import DateService
+from benchmarks import report
+from benchmarks.benchDates import CHAT
+
+# Short messages, as a chat server would see them
+REQUESTS = [sentence.strip() + '.' for sentence in CHAT.split('.')
+            if sentence.strip()] * 500
+
+THREADS = (1, 2, 4, 8)
+
+
+def shared(service):
+    def handle(inp):
+        return service.extractDates(inp, now=datetime.datetime.now())
+    return handle
+
+
+def perRequest(inp):
+    return DateService(now=datetime.datetime.now()).extractDates(inp)
+
+
+def throughput(handle, threads, repeat=3):
+    """Measures the best-of-repeat number of requests handled per second
+    by a pool of threads.
+
+    Returns:
+        A tuple (requests per second, results).
+    """
+    best = None
+    for _ in range(repeat):
+        pool = ThreadPool(threads)
+        try:
+            start = time.time()
+            results = pool.map(handle, REQUESTS)
+            elapsed = time.time() - start
+        finally:
+            pool.close()
+        if best is None or elapsed < best:
+            best = elapsed
+    return len(REQUESTS) / best, results
+
+
+def main():
+    now = datetime.datetime(2014, 1, 1, 12, 0)
+    service = DateService()
+    expected = [service.extractDates(inp, now=now) for inp in REQUESTS]
+
+    def fixed(inp):
+        return service.extractDates(inp, now=now)
+
+    rows = [("threads", "new (req/s)", "shared (req/s)",
+             "consistent")]
+    for threads in THREADS:
+        before, _ = throughput(perRequest, threads)
+        after, _ = throughput(shared(service), threads)
+        _, results = throughput(fixed, threads, repeat=1)
+        rows.append((threads, "%.0f" % before, "%.0f" % after,
+                     results == expected))
+    report("DateService.extractDates from a thread pool", rows)
+
+
+if __name__ == '__main__':
+    main()
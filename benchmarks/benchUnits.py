@@ -0,0 +1,62 @@
+"""Per-word latency of ConversionService.isValidUnit against the original
+quantities-based check, the cost of extractUnits over a sentence, and the
+cost of applying a cached conversion plan rather than converting through
+quantities."""
+import quantities as pq
+from semantic.units import ConversionService
+from benchmarks import timePerCall, report
+from benchmarks.legacy import LegacyConversionService
+
+UNITS = ["kilograms", "ft", "meters^2", "kg/m**2"]
+WORDS = ["I", "want", "eggs", "converted", "to", "of"]
+SENTENCE = "I want seven and a half pounds per square foot of eggs " \
+    "converted to kilograms per meter squared"
+
+
+def main():
+    new = ConversionService()
+    old = LegacyConversionService()
+
+    # Build the index outside of the timed region
+    new.isValidUnit('m')
+
+    rows = [("isValidUnit", "legacy (us)", "index (us)", "speedup")]
+    for label, inputs in (("units", UNITS), ("other words", WORDS)):
+        for w in inputs:
+            assert new.isValidUnit(w) == old.isValidUnit(w), w
+        before = timePerCall(old.isValidUnit, inputs, number=50)
+        after = timePerCall(new.isValidUnit, inputs, number=50)
+        rows.append((label, "%.2f" % before, "%.2f" % after,
+                     "%.1fx" % (before / after)))
+
+    assert new.extractUnits(SENTENCE) == old.extractUnits(SENTENCE)
+    before = timePerCall(old.extractUnits, [SENTENCE], number=20)
+    after = timePerCall(new.extractUnits, [SENTENCE], number=20)
+    rows.append(("extractUnits (sentence)", "%.2f" % before,
+                 "%.2f" % after, "%.1fx" % (before / after)))
+    report("ConversionService", rows)
+
+    # Isolate the conversion itself from the text processing around it
+    rows = [("conversion", "legacy (us)", "plan (us)", "speedup")]
+    for source, target in (("kg", "pounds"), ("kg / meter", "pounds / ft")):
+        def legacy(n):
+            quantity = pq.Quantity(float(n), source)
+            quantity.units = target
+            return quantity
+
+        def planned(n):
+            plan = new.conversionPlan(source, target)
+            return pq.Quantity(float(n) * plan.scale + plan.offset,
+                               plan.units)
+
+        assert legacy(55.12).magnitude == planned(55.12).magnitude
+        before = timePerCall(legacy, [55.12], number=200)
+        after = timePerCall(planned, [55.12], number=200)
+        rows.append(("%s to %s" % (source, target), "%.2f" % before,
+                     "%.2f" % after, "%.1fx" % (before / after)))
+    report("ConversionService.conversionPlan (%s)" % new.plans.stats(),
+           rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Cost of finding the current time, and of extracting dates relative to
+it, for requests spread over hundreds of Pytz timezones, with the cache of
+each zone's local day against finding the time anew on every call."""
+import pytz
+from semantic.dates import DateService
+from benchmarks import timePerCall, report
+from benchmarks.legacy import LegacyZoneDateService
+
+ZONES = [pytz.timezone(name) for name in pytz.common_timezones]
+
+MESSAGE = "see you tomorrow at 5:30pm, or next friday"
+
+
+def main():
+    new = DateService()
+    old = LegacyZoneDateService()
+
+    rows = [("call", "uncached (us)", "cached (us)", "speedup")]
+    calls = [
+        ("current time", lambda service: service._localNow),
+        ("extractDates", lambda service:
+         lambda tz: service.extractDates(MESSAGE, tz=tz)),
+    ]
+    for label, method in calls:
+        before = timePerCall(method(old), ZONES, number=20)
+        after = timePerCall(method(new), ZONES, number=20)
+        rows.append((label, "%.2f" % before, "%.2f" % after,
+                     "%.1fx" % (before / after)))
+    report("%d timezones" % len(ZONES), rows)
+
+
+if __name__ == '__main__':
+    main()
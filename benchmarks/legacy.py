@@ -0,0 +1,625 @@
+"""Reference implementations that have since been replaced, kept so that the
+benchmarks can compare against them."""
+import re
+import datetime
+from itertools import zip_longest
+import quantities as pq
+from semantic.dates import DateService
+from semantic.numbers import NumberService
+from semantic.solver import MathService
+from semantic.units import ConversionService
+
+
+class LegacyNumberService(NumberService):
+
+    """NumberService using the original backtracking parser."""
+
+    def parse(self, words):
+        def exact(words):
+            try:
+                return float(words)
+            except:
+                return None
+
+        guess = exact(words)
+        if guess is not None:
+            return guess
+
+        split = words.split(' ')
+
+        if split[-1] in self.__fractions__:
+            split[-1] = self.__fractions__[split[-1]]
+        elif split[-1] in self.__ordinals__:
+            split[-1] = self.__ordinals__[split[-1]]
+
+        parsed_ordinals = ' '.join(split)
+
+        return self.parseFloat(parsed_ordinals)
+
+    def parseFloat(self, words):
+        def pointFloat(words):
+            m = re.search(r'(.*) point (.*)', words)
+            if m:
+                whole = m.group(1)
+                frac = m.group(2)
+                total = 0.0
+                coeff = 0.10
+                for digit in frac.split(' '):
+                    total += coeff * self.parse(digit)
+                    coeff /= 10.0
+
+                return self.parseInt(whole) + total
+            return None
+
+        def fractionFloat(words):
+            m = re.search(r'(.*) and (.*)', words)
+            if m:
+                whole = self.parseInt(m.group(1))
+                frac = m.group(2)
+                frac = re.sub(r'(\w+)s(\b)', r'\g<1>\g<2>', frac)
+                frac = re.sub(r'(\b)a(\b)', r'\g<1>one\g<2>', frac)
+
+                split = frac.split(' ')
+                num = split[:1]
+                denom = split[1:]
+
+                while denom:
+                    try:
+                        num_value = self.parse(' '.join(num))
+                        denom_value = self.parse(' '.join(denom))
+                        return whole + float(num_value) / denom_value
+                    except:
+                        num += denom[:1]
+                        denom = denom[1:]
+            return None
+
+        result = pointFloat(words)
+        if result:
+            return result
+
+        result = fractionFloat(words)
+        if result:
+            return result
+
+        return self.parseInt(words)
+
+    def parseInt(self, words):
+        words = words.replace(" and ", " ").lower()
+        words = re.sub(r'(\b)a(\b)', r'\g<1>one\g<2>', words)
+
+        def textToNumber(s):
+            a = re.split(r"[\s-]+", s)
+            n = 0
+            g = 0
+            for w in a:
+                x = NumberService.__small__.get(w, None)
+                if x is not None:
+                    g += x
+                elif w == "hundred":
+                    g *= 100
+                else:
+                    x = NumberService.__magnitude__.get(w, None)
+                    if x is not None:
+                        n += g * x
+                        g = 0
+                    else:
+                        raise NumberService.NumberException(
+                            "Unknown number: " + w)
+            return n + g
+
+        return textToNumber(words)
+
+    def isValid(self, inp):
+        try:
+            self.parse(inp)
+            return True
+        except:
+            return False
+
+
+class LegacyConversionService(ConversionService):
+
+    """ConversionService which checks units by building a throwaway
+    quantities object, and preprocesses conversions with a series of regular
+    expression substitutions."""
+
+    def _isValidUnit(self, w):
+        bad = set(['point', 'a'])
+        if w in bad:
+            return False
+
+        try:
+            pq.Quantity(0.0, w)
+            return True
+        except:
+            return w == '/'
+
+    def convert(self, inp):
+        inp = self._preprocess(inp)
+
+        n = NumberService().longestNumber(inp)
+        units = self.extractUnits(inp)
+
+        quantity = pq.Quantity(float(n), units[0])
+        quantity.units = units[1]
+
+        return quantity
+
+    def _preprocess(self, inp):
+        def handleExponents(inp):
+            m = re.search(r'\bsquare (\w+)', inp)
+            if m and self.isValidUnit(m.group(1)):
+                inp = re.sub(r'\bsquare (\w+)', r'\g<1>^2', inp)
+
+            m = re.search(r'\bsquared (\w+)', inp)
+            if m and self.isValidUnit(m.group(1)):
+                inp = re.sub(r'\bsquared (\w+)', r'\g<1>^2', inp)
+
+            m = re.search(r'\b(\w+) squared', inp)
+            if m and self.isValidUnit(m.group(1)):
+                inp = re.sub(r'\b(\w+) squared', r'\g<1>^2', inp)
+
+            m = re.search(r'\bsq (\w+)', inp)
+            if m and self.isValidUnit(m.group(1)):
+                inp = re.sub(r'\bsq (\w+)', r'\g<1>^2', inp)
+
+            m = re.search(r'\b(\w+) cubed', inp)
+            if m and self.isValidUnit(m.group(1)):
+                inp = re.sub(r'\b(\w+) cubed', r'\g<1>^3', inp)
+
+            m = re.search(r'\bcubic (\w+)', inp)
+            if m and self.isValidUnit(m.group(1)):
+                inp = re.sub(r'\bcubic (\w+)', r'\g<1>^3', inp)
+
+            service = NumberService()
+            m = re.search(r'\b(\w+) to the (\w+)( power)?', inp)
+            if m and self.isValidUnit(m.group(1)):
+                if m.group(2) in service.__ordinals__:
+                    exp = service.parseMagnitude(m.group(2))
+                    inp = re.sub(r'\b(\w+) to the (\w+)( power)?',
+                                   r'\g<1>^' + str(exp), inp)
+
+            return inp
+
+        inp = re.sub(r'\sper\s', r' / ', inp)
+        inp = handleExponents(inp)
+
+        return inp
+
+    def extractUnits(self, inp):
+        inp = self._preprocess(inp)
+        words = inp.split(' ')
+
+        units = []
+        description = ""
+        i = 0
+        while i < len(words):
+            w, end = self._matchUnit(words, i)
+            if w is None:
+                w, end = words[i], i + 1
+
+            if self.isValidUnit(w):
+                if description:
+                    description += " "
+                description += w
+            else:
+                if description:
+                    units.append(description)
+                description = ""
+            i = end
+
+        if description:
+            units.append(description)
+        return units
+
+
+class LegacyMathService(MathService):
+
+    """MathService which evaluates equations by recursing on each operator,
+    re-parsing the intermediate results of unary operators from strings."""
+
+    @staticmethod
+    def _applyBinary(a, b, op):
+        a = float(a)
+        b = float(b)
+        return op(a, b)
+
+    @staticmethod
+    def _applyUnary(a, op):
+        a = float(a)
+        return op(a)
+
+    @staticmethod
+    def _preprocess(inp):
+        """Revise wording to match canonical and expected forms."""
+        inp = re.sub(r'(\b)a(\b)', r'\g<1>one\g<2>', inp)
+        inp = re.sub(r'to the (.*) power', r'to \g<1>', inp)
+        inp = re.sub(r'to the (.*?)(\b)', r'to \g<1>\g<2>', inp)
+        inp = re.sub(r'log of', r'log', inp)
+        inp = re.sub(r'(square )?root( of)?', r'sqrt', inp)
+        inp = re.sub(r'squared', r'to two', inp)
+        inp = re.sub(r'cubed', r'to three', inp)
+        inp = re.sub(r'divided?( by)?', r'divide', inp)
+        inp = re.sub(r'(\b)over(\b)', r'\g<1>divide\g<2>', inp)
+        inp = re.sub(r'(\b)EE(\b)', r'\g<1>e\g<2>', inp)
+        inp = re.sub(r'(\b)E(\b)', r'\g<1>e\g<2>', inp)
+        inp = re.sub(r'(\b)pie(\b)', r'\g<1>pi\g<2>', inp)
+        inp = re.sub(r'(\b)PI(\b)', r'\g<1>pi\g<2>', inp)
+
+        def findImplicitMultiplications(inp):
+            """Replace omitted 'times' references."""
+
+            def findConstantMultiplications(inp):
+                split = inp.split(' ')
+                revision = ""
+
+                converter = NumberService()
+                for i, w in enumerate(split):
+                    if i > 0 and w in MathService.__constants__:
+                        if converter.isValid(split[i - 1]):
+                            revision += " times"
+                    if not revision:
+                        revision = w
+                    else:
+                        revision += " " + w
+
+                return revision
+
+            def findUnaryMultiplications(inp):
+                split = inp.split(' ')
+                revision = ""
+
+                for i, w in enumerate(split):
+                    if i > 0 and w in MathService.__unaryOperators__:
+                        last_op = split[i - 1]
+
+                        binary = last_op in MathService.__binaryOperators__
+                        unary = last_op in MathService.__unaryOperators__
+
+                        if last_op and not (binary or unary):
+                            revision += " times"
+                    if not revision:
+                        revision = w
+                    else:
+                        revision += " " + w
+
+                return revision
+
+            return findUnaryMultiplications(findConstantMultiplications(inp))
+
+        return findImplicitMultiplications(inp)
+
+    @staticmethod
+    def _calculate(numbers, symbols):
+        if len(numbers) == 1:
+            return numbers[0]
+
+        # Find most important operation
+        for op_group in LegacyMathService.__precedence__:
+            for i, op in enumerate(symbols):
+                if op in op_group:
+                    # Apply operation
+                    a = numbers[i]
+                    b = numbers[i + 1]
+                    result = LegacyMathService._applyBinary(a, b, op)
+                    new_numbers = numbers[:i] + [result] + numbers[i + 2:]
+                    new_symbols = symbols[:i] + symbols[i + 1:]
+
+                    return LegacyMathService._calculate(new_numbers,
+                                                        new_symbols)
+
+    def _parseEquation(self, inp):
+        inp = LegacyMathService._preprocess(inp)
+        split = inp.split(' ')
+
+        # Recursive call on unary operators
+        for i, w in enumerate(split):
+            if w in self.__unaryOperators__:
+                op = self.__unaryOperators__[w]
+
+                # Split equation into halves
+                eq1 = ' '.join(split[:i])
+                eq2 = ' '.join(split[i + 1:])
+
+                # Calculate second half
+                result = LegacyMathService._applyUnary(
+                    self._parseEquation(eq2), op)
+
+                return self._parseEquation(eq1 + " " + str(result))
+
+        def extractNumbersAndSymbols(inp):
+            numbers = []
+            symbols = []
+
+            # Divide into values (numbers), operators (symbols)
+            next_number = ""
+            for w in inp.split(' '):
+                if w in self.__binaryOperators__:
+                    symbols.append(self.__binaryOperators__[w])
+
+                    if next_number:
+                        numbers.append(next_number)
+                        next_number = ""
+
+                else:
+                    if next_number:
+                        next_number += " "
+                    next_number += w
+
+            if next_number:
+                numbers.append(next_number)
+
+            # Cast numbers from words to integers
+            def convert(n):
+                if n in self.__constants__:
+                    return self.__constants__[n]
+
+                converter = NumberService()
+                return converter.parse(n)
+
+            numbers = [convert(n) for n in numbers]
+
+            return numbers, symbols
+
+        numbers, symbols = extractNumbersAndSymbols(inp)
+
+        return LegacyMathService._calculate(numbers, symbols)
+
+
+class LegacyDateService(DateService):
+
+    """DateService which finds days and times with backtracking regular
+    expressions."""
+
+    _dayRegex = re.compile(
+        r"""(?ix)
+        ((week|day)s?\ from\ )?
+        (
+            tomorrow
+            |tonight
+            |today
+            |(next|this)[\ \b](morning|afternoon|evening|Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)
+            |(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)
+            |(Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?|Sept(?:ember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\ (\w+)((\s|\-)?\w*)
+        )
+        """)
+
+    _timeRegex = re.compile(
+        r"""(?ix)
+        .*?
+        (
+            morning
+            |afternoon
+            |evening
+            |(\d{1,2}\:\d{2})\ ?(am|pm)?
+            |in\ (.+?)\ (hours|minutes)(\ (?:and\ )?(.+?)\ (hours|minutes))?
+        )
+        .*?""")
+
+    def extractDays(self, inp):
+        """Extracts all day-related information from an input string.
+        Ignores any information related to the specific time-of-day.
+
+        Args:
+            inp (str): Input string to be parsed.
+
+        Returns:
+            A list of datetime objects containing the extracted date from the
+            input snippet, or an empty list if none found.
+        """
+        inp = self._preprocess(inp)
+
+        def extractDayOfWeek(dayMatch):
+            if dayMatch.group(5) in self.__daysOfWeek__:
+                return self.__daysOfWeek__.index(dayMatch.group(5))
+            elif dayMatch.group(6) in self.__daysOfWeek__:
+                return self.__daysOfWeek__.index(dayMatch.group(6))
+
+        def extractMonth(dayMatch):
+            if dayMatch.group(7) in self.__months__:
+                return self.__months__.index(dayMatch.group(7)) + 1
+            elif dayMatch.group(7) in self.__shortMonths__:
+                return self.__shortMonths__.index(dayMatch.group(7)) + 1
+
+        def extractDay(dayMatch):
+            combined = dayMatch.group(8) + dayMatch.group(9)
+            if combined in self.__dateDescriptors__:
+                return self.__dateDescriptors__[combined]
+            elif dayMatch.group(8) in self.__dateDescriptors__:
+                return self.__dateDescriptors__[dayMatch.group(8)]
+            elif int(dayMatch.group(8)) in self.__dateDescriptors__.values():
+                return int(dayMatch.group(8))
+
+        def extractDaysFrom(dayMatch):
+            if not dayMatch.group(1):
+                return 0
+
+            def numericalPrefix(dayMatch):
+                # Grab 'three' of 'three weeks from'
+                prefix = inp.split(dayMatch.group(1))[0].strip().split(' ')
+                prefix.reverse()
+                prefix = list(filter(lambda s: s != 'and', prefix))
+
+                # Generate best guess number
+                service = NumberService()
+                num = prefix[0]
+                if service.isValid(num):
+                    for n in prefix[1:]:
+                        inc = n + " " + num
+                        if service.isValid(inc):
+                            num = inc
+                        else:
+                            break
+                    return service.parse(num)
+                return 1
+
+            factor = numericalPrefix(dayMatch)
+
+            if dayMatch.group(2) == 'week':
+                return factor * 7
+            elif dayMatch.group(2) == 'day':
+                return factor * 1
+
+        def handleMatch(dayMatch):
+            def safe(exp):
+                """For safe evaluation of regex groups"""
+                try:
+                    return exp()
+                except:
+                    return False
+
+            days_from = safe(lambda: extractDaysFrom(dayMatch))
+            today = safe(lambda: dayMatch.group(3) in self.__todayMatches__)
+            tomorrow = safe(lambda: dayMatch.group(3)
+                            in self.__tomorrowMatches__)
+            next_week = safe(lambda: dayMatch.group(4) == 'next')
+            day_of_week = safe(lambda: extractDayOfWeek(dayMatch))
+            month = safe(lambda: extractMonth(dayMatch))
+            day = safe(lambda: extractDay(dayMatch))
+
+            # Convert extracted terms to datetime object
+            if not dayMatch:
+                return None
+            elif today:
+                d = self.now
+            elif tomorrow:
+                d = self.now + datetime.timedelta(days=1)
+            elif type(day_of_week) == int:
+                current_day_of_week = self.now.weekday()
+                num_days_away = (day_of_week - current_day_of_week) % 7
+
+                if next_week:
+                    num_days_away += 7
+
+                d = self.now + \
+                    datetime.timedelta(days=num_days_away)
+            elif month and day:
+                d = datetime.datetime(
+                    self.now.year, month, day,
+                    self.now.hour, self.now.minute)
+
+            if days_from:
+                d += datetime.timedelta(days=days_from)
+
+            return d
+
+        matches = self._dayRegex.finditer(inp)
+        return [handleMatch(dayMatch) for dayMatch in matches]
+
+    def extractTimes(self, inp):
+        """Extracts time-related information from an input string.
+        Ignores any information related to the specific date, focusing
+        on the time-of-day.
+
+        Args:
+            inp (str): Input string to be parsed.
+
+        Returns:
+            A list of datetime objects containing the extracted times from the
+            input snippet, or an empty list if none found.
+        """
+        def handleMatch(time):
+            relative = False
+
+            if not time:
+                return None
+
+            # Default times: 8am, 12pm, 7pm
+            elif time.group(1) == 'morning':
+                h = 8
+                m = 0
+            elif time.group(1) == 'afternoon':
+                h = 12
+                m = 0
+            elif time.group(1) == 'evening':
+                h = 19
+                m = 0
+            elif time.group(4) and time.group(5):
+                h, m = 0, 0
+
+                # Extract hours difference
+                converter = NumberService()
+                try:
+                    diff = converter.parse(time.group(4))
+                except:
+                    return None
+
+                if time.group(5) == 'hours':
+                    h += diff
+                else:
+                    m += diff
+
+                # Extract minutes difference
+                if time.group(6):
+                    converter = NumberService()
+                    try:
+                        diff = converter.parse(time.group(7))
+                    except:
+                        return None
+
+                    if time.group(8) == 'hours':
+                        h += diff
+                    else:
+                        m += diff
+
+                relative = True
+            else:
+                # Convert from "HH:MM pm" format
+                t = time.group(2)
+                h, m = int(t.split(':')[0]) % 12, int(t.split(':')[1])
+
+                try:
+                    if time.group(3) == 'pm':
+                        h += 12
+                except IndexError:
+                    pass
+
+            if relative:
+                return self.now + datetime.timedelta(hours=h, minutes=m)
+            else:
+                return datetime.datetime(
+                    self.now.year, self.now.month, self.now.day, h, m
+                )
+
+        inp = self._preprocess(inp)
+        return [handleMatch(time) for time in self._timeRegex.finditer(inp)]
+
+    def extractDates(self, inp):
+        """Extract semantic date information from an input string.
+        In effect, runs both parseDay and parseTime on the input
+        string and merges the results to produce a comprehensive
+        datetime object.
+
+        Args:
+            inp (str): Input string to be parsed.
+
+        Returns:
+            A list of datetime objects containing the extracted dates from the
+            input snippet, or an empty list if not found.
+        """
+        def merge(param):
+            day, time = param
+            if not (day or time):
+                return None
+
+            if not day:
+                return time
+            if not time:
+                return day
+
+            return datetime.datetime(
+                day.year, day.month, day.day, time.hour, time.minute
+            )
+
+        days = self.extractDays(inp)
+        times = self.extractTimes(inp)
+        return list(map(merge, zip_longest(days, times, fillvalue=None)))
+
+
+class LegacyZoneDateService(DateService):
+
+    """DateService which finds the current time in a timezone anew on
+    every call."""
+
+    def _localNow(self, tz, t=None):
+        return datetime.datetime.now(tz=tz)
@@ -0,0 +1,50 @@
+"""Semantic extracts dates, numbers, units and mathematical expressions from
+text.
+
+The services are importable from the package itself, e.g.,
+
+    >>> from semantic import NumberService
+
+but each is only loaded on first access, so that a program which uses
+NumberService or DateService doesn't pay for importing quantities and numpy.
+Before Python 3.7, which added module __getattr__, they're all loaded with
+the package instead, though quantities still isn't imported until a
+ConversionService is built.
+"""
+import importlib
+import sys
+
+__all__ = ['NumberService', 'DateService', 'MathService', 'ConversionService',
+           'Annotator', 'Match', 'Prefilter']
+
+# Maps each public name to the module in which it's defined
+_services = {
+    'NumberService': '.numbers',
+    'DateService': '.dates',
+    'MathService': '.solver',
+    'ConversionService': '.units',
+    'Annotator': '.annotator',
+    'Match': '.match',
+    'Prefilter': '.prefilter'
+}
+
+
+def __getattr__(name):
+    if name not in _services:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+
+    service = getattr(importlib.import_module(_services[name], __name__),
+                      name)
+    globals()[name] = service
+    return service
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    for _name, _module in _services.items():
+        globals()[_name] = getattr(importlib.import_module(_module, __name__),
+                                   _name)
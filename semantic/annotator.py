@@ -0,0 +1,429 @@
+import codecs
+import mmap
+import os
+import re
+from bisect import bisect_right
+from .cache import LRUCache
+from .match import Match
+from .numbers import NumberService
+from .dates import DateService
+from .prefilter import Prefilter
+from .solver import MathService
+
+# Annotator's results, which are the same Matches as the services' own
+Annotation = Match
+
+# How annotateFile decodes bytes which aren't valid in the file's encoding:
+# as lone surrogates, which encode back to the same bytes, or else, before
+# Python 3, as replacement characters
+try:
+    codecs.lookup_error('surrogateescape')
+    _undecodable = 'surrogateescape'
+except LookupError:
+    _undecodable = 'replace'
+
+
+class Annotator(object):
+
+    """Initialize an Annotator for finding the numbers, quantities, dates
+    and arithmetic expressions in documents.
+
+    Each document is lowercased and split into tokens once, by
+    NumberService, and the tokens are shared by all of the extractors: the
+    numbers they describe are found by a single pass of the number
+    recognizer, quantities are the numbers followed by units, and
+    arithmetic expressions are the runs of numbers and operators. Dates
+    are found by DateService's scanner over the same lowercased text.
+
+    Args:
+        kinds: The kinds of annotation to find, among Annotator.NUMBER,
+            QUANTITY, DATE and MATH. Finds all of them if none are
+            supplied. Only QUANTITY requires quantities, which isn't
+            imported otherwise.
+        tz: An optional Pytz timezone for dates, as for DateService.
+        now: An optional time to which dates are relative, as for
+            DateService.
+        prefilter (bool): Whether to split each document into sentences,
+            and skip those without any of the words of
+            Prefilter.vocabulary, available as self.prefilter, before
+            tokenizing them. Faster on text which mostly describes no
+            numbers or dates, but misses, e.g., "a kilogram" on its own.
+
+    Returns:
+        An Annotator which finds the requested kinds of annotation.
+    """
+
+    NUMBER, QUANTITY, DATE, MATH = 'number', 'quantity', 'date', 'math'
+
+    def __init__(self, kinds=None, tz=None, now=None, prefilter=False):
+        self.kinds = frozenset(kinds or (Annotator.NUMBER, Annotator.QUANTITY,
+                                         Annotator.DATE, Annotator.MATH))
+        self.prefilter = None
+        if prefilter:
+            self.prefilter = Prefilter(Prefilter.vocabulary(self.kinds))
+        self._numbers = NumberService()
+        self._dates = DateService(tz=tz, now=now)
+        self._math = MathService()
+        self._units = self._pq = None
+        self._quantityUnits = LRUCache(256)
+        if Annotator.QUANTITY in self.kinds:
+            from . import units
+            self._units = units.ConversionService()
+            self._pq = units._importQuantities()
+
+    # Units which are more often English words, e.g., the 'in' of "5 in
+    # the morning" or the 'pm' of "5 pm"
+    __ambiguousUnits__ = set(['in', 'at', 'are', 'pm', 'a'])
+
+    # Most words read after a number for its units, e.g., "square feet per
+    # second"
+    _unitWords = 4
+
+    # Words which may appear in an arithmetic expression, besides numbers
+    _mathWords = set(MathService.__binaryOperators__) | \
+        set(MathService.__unaryOperators__) | \
+        set(MathService.__rewrites__) | \
+        set(MathService.__followers__.values()) | \
+        set(MathService.__constants__) | set(['power', 'square'])
+
+    # Words of which an arithmetic expression must contain at least one
+    _mathOperators = set(MathService.__binaryOperators__) | \
+        set(MathService.__unaryOperators__) | \
+        set(['root', 'squared', 'cubed', 'divided'])
+
+    # Words which can't begin or end an arithmetic expression
+    _mathFillers = set(MathService.__binaryOperators__) | \
+        set(MathService.__followers__.values()) | \
+        set(['and', 'point', 'power', 'divided'])
+
+    @staticmethod
+    def _lower(text):
+        """Lowercases text, keeping the offsets of its characters, which
+        lower() alone doesn't for a few characters (e.g., a dotted 'I')."""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        return ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+    @staticmethod
+    def _adjacent(text, a, b):
+        """Checks that only whitespace or a hyphen separates the tokens a
+        and b of text, as returned by NumberService._scan."""
+        return not text[a[5]:b[4]].replace('-', ' ').strip()
+
+    def annotate(self, text, now=None, tz=None):
+        """Finds the numbers, quantities (numbers followed by units, e.g.,
+        "five kilograms"), dates and arithmetic expressions (e.g., "two
+        times three") in a document.
+
+        A number is only annotated on its own if it isn't part of another
+        annotation, e.g., the "five" of "five kilograms", and isn't just
+        the article 'a'. Likewise, a quantity isn't annotated within a
+        date, e.g., the "three weeks" of "three weeks from friday".
+
+        Args:
+            text (str): The document to be annotated.
+            now: The time to which dates are relative, for this call only.
+                Defaults to the Annotator's.
+            tz: The timezone of dates, for this call only, if now isn't
+                supplied. Defaults to the Annotator's.
+
+        Returns:
+            A list of Match, ordered by their start offsets, whose
+            values are a float for NUMBER and MATH, a quantities object for
+            QUANTITY and a datetime object for DATE.
+        """
+        now = self._dates._reference(now, tz)
+        lowered = self._lower(text)
+        if self.prefilter is None:
+            return self._annotate(text, lowered, now)
+
+        annotations = []
+        for start, end in self.prefilter.segments(lowered):
+            for a in self._annotate(text[start:end], lowered[start:end],
+                                    now):
+                annotations.append(a._replace(start=start + a.start,
+                                              end=start + a.end))
+        return annotations
+
+    def _annotate(self, text, lowered, now):
+        """Annotates text, and its lowercase counterpart, as annotate,
+        relative to the datetime now."""
+        kinds = self.kinds
+        tokens = self._numbers._scan(lowered)
+        numbers = self._numbers._matchNumbers(lowered, tokens)
+
+        annotations = []
+        if Annotator.QUANTITY in kinds:
+            annotations.extend(self._findQuantities(text, tokens, numbers))
+        if Annotator.MATH in kinds:
+            annotations.extend(self._findMath(text, tokens))
+        if Annotator.DATE in kinds:
+            dates = self._dates
+            inp = lowered.replace('-', ' ')
+            spans = dates._mergeDates(inp, dates._scan(inp), now)
+            # Skip the quantities within dates, e.g., the "three weeks" of
+            # "three weeks from friday", finding the last date to start
+            # before each and the furthest any date up to it reaches
+            starts = [start for start, _, _ in spans]
+            reaches = []
+            for _, end, _ in spans:
+                reaches.append(max(end, reaches[-1]) if reaches else end)
+            kept = []
+            for a in annotations:
+                if a.kind == Annotator.QUANTITY:
+                    i = bisect_right(starts, a.start) - 1
+                    if i >= 0 and a.end <= reaches[i]:
+                        continue
+                kept.append(a)
+            annotations = kept
+            for start, end, date in spans:
+                annotations.append(Match(Annotator.DATE, start, end,
+                                         text[start:end], date))
+
+        if Annotator.NUMBER in kinds:
+            # Merge the spans of other annotations, to skip the numbers
+            # within them
+            covered = []
+            for a in sorted(annotations, key=lambda a: a.start):
+                if covered and a.start <= covered[-1][1]:
+                    covered[-1][1] = max(covered[-1][1], a.end)
+                else:
+                    covered.append([a.start, a.end])
+            starts = [span[0] for span in covered]
+
+            for match in numbers:
+                i = bisect_right(starts, match.start) - 1
+                if i >= 0 and match.end <= covered[i][1]:
+                    continue
+                if lowered[match.start:match.end] == 'a':
+                    continue
+                annotations.append(Match(
+                    Annotator.NUMBER, match.start, match.end,
+                    text[match.start:match.end], match.value))
+
+        annotations.sort(key=lambda a: (a.start, -a.end))
+        return annotations
+
+    # Where a window of a file may end, in order of preference: after a
+    # sentence, at which every extractor stops (as Prefilter's segments
+    # do), or at least after a word. Descriptions may run across a line
+    # break, e.g., "next\nfriday", so lines aren't preferred
+    __windowBreaks__ = [
+        tuple(p + w for p in (b'.', b'!', b'?', b';')
+              for w in (b' ', b'\t', b'\r', b'\n')),
+        (b' ', b'\t', b'\r', b'\n')]
+
+    # The whitespace after which a window without any break ends
+    _wordEndRegex = re.compile(br"[ \t\r\n]")
+
+    @staticmethod
+    def _windowEnd(mm, start, end):
+        """Finds the end of a window of a memory-mapped file which begins at
+        start, as late as possible before end, or else after the word which
+        end would cut, so that neither the word nor a character encoded in
+        several bytes is split."""
+        if end == len(mm):
+            return end
+        for breaks in Annotator.__windowBreaks__:
+            cut = start
+            for b in breaks:
+                i = mm.rfind(b, start, end)
+                if i >= 0:
+                    cut = max(cut, i + len(b))
+            if cut > start:
+                return cut
+        m = Annotator._wordEndRegex.search(mm, end)
+        if m is None:
+            return len(mm)
+        return m.end()
+
+    @staticmethod
+    def _byteOffsets(text, offsets, encoding):
+        """Maps sorted character offsets in text to the offsets of the same
+        positions in its encoding."""
+        mapping = {}
+        last = position = 0
+        for offset in offsets:
+            position += len(text[last:offset].encode(encoding,
+                                                     _undecodable))
+            mapping[offset] = position
+            last = offset
+        return mapping
+
+    def annotateFile(self, path, now=None, tz=None, windowSize=1 << 16,
+                     encoding='utf-8'):
+        """Annotates a text file, e.g., a log or a transcript, as annotate,
+        without reading the whole of it into memory.
+
+        The file is memory-mapped and annotated a window at a time, each
+        of which ends at the end of a sentence where possible, or else at
+        the end of a word, so that memory use depends on windowSize rather
+        than on the size of the file. Annotations don't span windows: no
+        description runs past the end of a sentence in any case, but one
+        in a window without a sentence end may be cut at a word, e.g., a
+        number spelled out is read as two.
+
+        Args:
+            path (str): The path of the file.
+            now: The time to which dates are relative. Defaults to the
+                Annotator's, read once for the whole file.
+            tz: The timezone of dates, if now isn't supplied.
+            windowSize (int): The most bytes annotated at once, unless a
+                single word is longer.
+            encoding (str): The encoding of the file, which must encode
+                whitespace as ASCII does, e.g., UTF-8. Bytes which can't
+                be decoded are kept as they are, except on Python 2,
+                where they're replaced, which shifts the byte offsets
+                after them.
+
+        Returns:
+            An iterator over the Matches in the file, in order, whose start
+            and end are byte offsets in the file and whose text is
+            decoded.
+        """
+        now = self._dates._reference(now, tz)
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            pos = 0
+            while pos < len(mm):
+                end = self._windowEnd(mm, pos, min(len(mm), pos + windowSize))
+                window = mm[pos:end]
+                text = window.decode(encoding, _undecodable)
+                annotations = self.annotate(text, now=now)
+
+                if len(text) == len(window):
+                    for a in annotations:
+                        yield a._replace(start=pos + a.start,
+                                         end=pos + a.end)
+                else:
+                    offsets = self._byteOffsets(text, sorted(
+                        set(a.start for a in annotations) |
+                        set(a.end for a in annotations)), encoding)
+                    for a in annotations:
+                        yield a._replace(start=pos + offsets[a.start],
+                                         end=pos + offsets[a.end])
+                pos = end
+        finally:
+            mm.close()
+
+    def _findQuantities(self, text, tokens, numbers):
+        """Finds the numbers which are followed by units, reading at most
+        _unitWords words after each with ConversionService's tokenizer.
+        """
+        units = self._units
+        quantities = []
+        p = 0
+        for match in numbers:
+            while p < len(tokens) and tokens[p][4] < match.end:
+                p += 1
+
+            # The words following the number, up to any punctuation
+            window = []
+            previous = (None, None, None, None, match.start, match.end)
+            for token in tokens[p:p + self._unitWords]:
+                if not self._adjacent(text, previous, token):
+                    break
+                window.append(token)
+                previous = token
+            if not window:
+                continue
+
+            words = [text[token[4]:token[5]] for token in window]
+            unitWords, spans, _ = units._tokenize(' '.join(words))
+
+            description = []
+            i = 0
+            while i < len(unitWords):
+                label, end = units._matchUnit(unitWords, i)
+                if label is None:
+                    label, end = unitWords[i], i + 1
+                if label.lower() in self.__ambiguousUnits__ or \
+                        not units.isValidUnit(label):
+                    break
+                description.append(label)
+                i = end
+            if not description:
+                continue
+
+            # Parse each description of units once, as quantities compiles
+            # compound units
+            description = ' '.join(description)
+            unit = self._quantityUnits.get(description)
+            if unit is None:
+                try:
+                    unit = self._pq.Quantity(1.0, description).units
+                except Exception:
+                    unit = False
+                self._quantityUnits.put(description, unit)
+            if unit is False:
+                continue
+            value = self._pq.Quantity(match.value, unit)
+
+            # Map the end of the last unit back to the window's tokens
+            last = spans[i - 1][1]
+            offset = k = 0
+            while k < len(words) and offset < last:
+                offset += len(words[k]) + 1
+                k += 1
+            end = window[k - 1][5]
+            quantities.append(Match(Annotator.QUANTITY, match.start, end,
+                                    text[match.start:end], value))
+
+        return quantities
+
+    def _findMath(self, text, tokens):
+        """Finds the arithmetic expressions among the tokens: the runs of
+        number words and the words of _mathWords, uninterrupted by
+        punctuation, which contain an operator and can be solved. A 'to'
+        only counts as an exponent in "to the", so that "from 5 to 10"
+        isn't 5 to the tenth power."""
+        expressions = []
+
+        def isMath(i):
+            w, kind = tokens[i][0], tokens[i][1]
+            if w == 'to':
+                return i + 1 < len(tokens) and tokens[i + 1][0] == 'the'
+            return kind is not None or w in self._mathWords
+
+        def solve(first, last):
+            # Trim the words which can't begin or end the expression
+            while first < last and tokens[first][0] in self._mathFillers:
+                first += 1
+            while last > first and (
+                    tokens[last - 1][0] in self._mathFillers or
+                    tokens[last - 1][0] in MathService.__unaryOperators__):
+                last -= 1
+
+            words = [token[0] for token in tokens[first:last]]
+            if not any(w in self._mathOperators for w in words):
+                return
+            try:
+                value = self._math.parseEquation(' '.join(words))
+            except (ValueError, ArithmeticError,
+                    NumberService.NumberException):
+                return
+
+            start, end = tokens[first][4], tokens[last - 1][5]
+            expressions.append(Match(Annotator.MATH, start, end,
+                                     text[start:end], value))
+
+        first = None
+        for i in range(len(tokens)):
+            if first is not None and not (
+                    self._adjacent(text, tokens[i - 1], tokens[i]) and
+                    isMath(i)):
+                solve(first, i)
+                first = None
+            if first is None and isMath(i):
+                first = i
+        if first is not None:
+            solve(first, len(tokens))
+
+        return expressions
@@ -0,0 +1,176 @@
+"""Runs the services over large batches of short inputs in a pool of
+processes, e.g.,
+
+    >>> from semantic import batch
+    >>> for result in batch.extractDates(messages, workers=4):
+    ...     print(result)
+
+Inputs are sent to the workers in chunks, so that the cost of passing them
+between processes is shared by many calls, and each worker builds its
+service once and keeps it (with any caches) for every chunk it receives.
+Results are yielded in the order of the inputs. An input on which the
+service raises yields a Failure, rather than ending the batch.
+"""
+import multiprocessing
+import pickle
+from collections import deque, namedtuple
+from itertools import islice
+from .dates import DateService
+from .solver import MathService
+from .units import ConversionService
+
+# An input on which the service raised error
+Failure = namedtuple('Failure', ['input', 'error'])
+
+# The service held by each worker process, built once by _initialize
+_service = None
+
+
+def _initialize(serviceClass, serviceArgs):
+    global _service
+    _service = serviceClass(**serviceArgs)
+
+
+def _cpuCount():
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def _portable(error):
+    """Returns error if it can be sent back from a worker, or else a
+    RuntimeError describing it."""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(repr(error))
+
+
+def _runChunk(method, chunk, kwargs):
+    """Calls a method of the worker's service on each of a chunk of
+    inputs, catching the errors of each."""
+    fn = getattr(_service, method)
+    results = []
+    for inp in chunk:
+        try:
+            results.append(fn(inp, **kwargs))
+        except Exception as e:
+            results.append(Failure(inp, _portable(e)))
+    return results
+
+
+def run(serviceClass, method, inputs, serviceArgs=None, kwargs=None,
+        workers=None, chunkSize=256):
+    """Calls a method of a service on every input in a pool of processes.
+
+    Args:
+        serviceClass: The class of the service, e.g., DateService, of which
+            each worker builds a single instance.
+        method (str): The name of the method called on each input.
+        inputs: An iterable of inputs, which is read a few chunks ahead of
+            the results, so that it may be arbitrarily long.
+        serviceArgs (dict): Keyword arguments with which each worker
+            builds its service.
+        kwargs (dict): Keyword arguments passed with every input.
+        workers (int): The number of worker processes. Defaults to the
+            number of CPUs.
+        chunkSize (int): The number of inputs sent to a worker at once.
+
+    Returns:
+        An iterator over the result of each input, in order, or a Failure
+        for any input on which the method raised.
+    """
+    if chunkSize < 1:
+        raise ValueError("chunkSize must be positive")
+    return _results(serviceClass, method, iter(inputs), serviceArgs or {},
+                    kwargs or {}, workers or _cpuCount(), chunkSize)
+
+
+def _results(serviceClass, method, inputs, serviceArgs, kwargs, workers,
+             chunkSize):
+    """Yields the results of run, starting the pool on first use."""
+    pool = multiprocessing.Pool(workers, _initialize,
+                                (serviceClass, serviceArgs))
+    pending = deque()
+
+    def submit():
+        chunk = list(islice(inputs, chunkSize))
+        if chunk:
+            pending.append(pool.apply_async(_runChunk,
+                                            (method, chunk, kwargs)))
+        return bool(chunk)
+
+    try:
+        # Keep every worker busy, with a chunk to spare
+        for _ in range(2 * workers):
+            if not submit():
+                break
+
+        while pending:
+            results = pending.popleft().get()
+            submit()
+            for result in results:
+                yield result
+        pool.close()
+    finally:
+        # Stops the workers at once if the batch was abandoned
+        pool.terminate()
+        pool.join()
+
+
+def extractDates(inputs, now=None, tz=None, workers=None, chunkSize=256):
+    """Extracts the dates from every input, as DateService.extractDates.
+
+    Args:
+        inputs: An iterable of input strings.
+        now: The time to which all of the results are relative. Defaults
+            to the current time, read once when the batch starts, so that
+            results are consistent across workers.
+        tz: The timezone of the results, if now isn't supplied.
+        workers (int): The number of worker processes.
+        chunkSize (int): The number of inputs sent to a worker at once.
+
+    Returns:
+        An iterator over a list of datetime objects for each input, in
+        order, or a Failure for any input which couldn't be parsed.
+    """
+    now = DateService(tz=tz)._reference(now, tz)
+    return run(DateService, 'extractDates', inputs, serviceArgs={'tz': tz},
+               kwargs={'now': now}, workers=workers, chunkSize=chunkSize)
+
+
+def convert(inputs, target=None, workers=None, chunkSize=256):
+    """Converts every input, as ConversionService.convert.
+
+    Args:
+        inputs: An iterable of input strings, e.g., "fifty kilograms to
+            pounds".
+        target (str): Optional units to which every input is converted.
+        workers (int): The number of worker processes.
+        chunkSize (int): The number of inputs sent to a worker at once.
+
+    Returns:
+        An iterator over a quantities object for each input, in order, or
+        a Failure for any input which couldn't be converted.
+    """
+    return run(ConversionService, 'convert', inputs,
+               kwargs={'target': target}, workers=workers,
+               chunkSize=chunkSize)
+
+
+def parseEquation(inputs, workers=None, chunkSize=256):
+    """Solves every input, as MathService.parseEquation.
+
+    Args:
+        inputs: An iterable of equations, in words.
+        workers (int): The number of worker processes.
+        chunkSize (int): The number of inputs sent to a worker at once.
+
+    Returns:
+        An iterator over the float result of each input, in order, or a
+        Failure for any input which couldn't be solved.
+    """
+    return run(MathService, 'parseEquation', inputs, workers=workers,
+               chunkSize=chunkSize)
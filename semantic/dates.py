@@ -1,16 +1,36 @@
 import re
+import time
 import datetime
-try:
-    from itertools import zip_longest
-except:
-    from itertools import izip_longest as zip_longest
+from collections import namedtuple
+from itertools import chain, islice
+from .match import Match
 from .numbers import NumberService
 
+# A day found in text, spanning the [start, end) character offsets: either a
+# weekday (in the following week, if nextWeek), a month and day, or shift
+# days from today. prefix holds any leading "(weeks|days) from ".
+_DayMatch = namedtuple('_DayMatch', ['start', 'end', 'prefix', 'shift',
+                                     'weekday', 'nextWeek', 'month', 'day'])
+
+# A span of [start, end) timestamps over which the local date and UTC offset
+# of a timezone stay the same, where local is the time at start
+_LocalDay = namedtuple('_LocalDay', ['start', 'end', 'local'])
+
+# A time found in text, spanning the [start, end) character offsets: either
+# a time of day, or hours and minutes from now if relative
+_TimeMatch = namedtuple('_TimeMatch', ['start', 'end', 'hours', 'minutes',
+                                       'relative'])
+
 
 class DateService(object):
 
     """Initialize a DateService for extracting dates from text.
 
+    A DateService holds no state between calls, so a single instance can
+    be shared, e.g., by the threads of a server. The timezone and reference
+    time can be supplied when calling each of the extraction methods, and
+    otherwise default to those given here.
+
     Args:
         tz: An optional Pytz timezone. All datetime objects returned will
             be relative to the supplied timezone, or timezone-less if none
@@ -18,7 +38,8 @@ class DateService(object):
         now: The time to which all returned datetime objects should be
             relative. For example, if the text is "In 5 hours", the
             datetime returned will be now + datetime.timedelta(hours=5).
-            Uses datetime.datetime.now() if none is supplied.
+            Uses the time at which each method is called if none is
+            supplied.
 
     Returns:
         A DateService which uses tz and now for all of its computations.
@@ -26,10 +47,99 @@ class DateService(object):
 
     def __init__(self, tz=None, now=None):
         self.tz = tz
+        self._now = now
+
+    @property
+    def now(self):
+        """The time to which returned datetime objects are relative: the
+        time supplied on initialization, if any, or else the current
+        time."""
+        if self._now:
+            return self._now
+        if self.tz is None:
+            return datetime.datetime.now()
+        return self._localNow(self.tz)
+
+    @now.setter
+    def now(self, now):
+        self._now = now
+
+    def _reference(self, now=None, tz=None):
+        """Returns the time to which a single call's results are relative,
+        read once so that they're consistent with each other.
+
+        Args:
+            now: The time supplied to the call, if any.
+            tz: The timezone supplied to the call, if any.
+        """
         if now:
-            self.now = now
-        else:
-            self.now = datetime.datetime.now(tz=self.tz)
+            return now
+        if tz is None:
+            return self.now
+        if self._now and self._now.tzinfo:
+            return self._now.astimezone(tz)
+        return self._localNow(tz)
+
+    # The current local day of each timezone seen, shared by all services
+    _localDays = {}
+
+    def _localDay(self, tz, t):
+        """Finds the span of time around timestamp t over which both the
+        local date and the UTC offset in tz stay the same: usually the
+        whole local day, or the part of it before or after a change to or
+        from daylight saving time.
+
+        Returns:
+            A _LocalDay.
+        """
+        def offset(t):
+            return datetime.datetime.fromtimestamp(t, tz).utcoffset()
+
+        def bisect(lo, hi, before):
+            # Finds the first second in [lo, hi] at which the offset is
+            # the current one, if before, or else the first at which it
+            # isn't, given that it changes once
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if (offset(mid) == current) == before:
+                    hi = mid
+                else:
+                    lo = mid
+            return hi
+
+        local = datetime.datetime.fromtimestamp(t, tz)
+        current = local.utcoffset()
+        midnight = datetime.datetime(local.year, local.month, local.day)
+        epoch = datetime.datetime(1970, 1, 1) + current
+        start = (midnight - epoch).total_seconds()
+        end = start + 86400
+
+        if offset(start) != current:
+            start = bisect(int(start), int(t), True)
+        if offset(end - 1) != current:
+            end = bisect(int(t), int(end - 1), False)
+
+        local = datetime.datetime.fromtimestamp(start, tz)
+        return _LocalDay(start, end, local)
+
+    def _localNow(self, tz, t=None):
+        """Returns the current time in tz, as datetime.datetime.now(tz=tz)
+        would. The local day of each timezone is cached until it ends (or
+        daylight saving time starts or ends), so that the time is found by
+        adding the seconds elapsed to the start of the day.
+
+        Args:
+            tz: A Pytz timezone.
+            t: The timestamp to use as the current time, if not the
+                current time itself.
+        """
+        if t is None:
+            t = time.time()
+        day = self._localDays.get(tz)
+        if day is None or not day.start <= t < day.end:
+            day = self._localDay(tz, t)
+            self._localDays[tz] = day
+        return day.local + datetime.timedelta(seconds=t - day.start)
 
     __months__ = ['january', 'february', 'march', 'april', 'may', 'june',
                   'july', 'august', 'september', 'october', 'november',
@@ -114,278 +224,784 @@ class DateService(object):
         'thirty first': 31
     }
 
-    _dayRegex = re.compile(
-        r"""(?ix)
-        ((week|day)s?\ from\ )?
-        (
-            tomorrow
-            |tonight
-            |today
-            |(next|this)[\ \b](morning|afternoon|evening|Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)
-            |(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)
-            |(Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?|Sept(?:ember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\ (\w+)((\s|\-)?\w*)
-        )
-        """)
-
-    _timeRegex = re.compile(
-        r"""(?ix)
-        .*?
-        (
-            morning
-            |afternoon
-            |evening
-            |(\d{1,2}\:\d{2})\ ?(am|pm)?
-            |in\ (.+?)\ (hours|minutes)(\ (?:and\ )?(.+?)\ (hours|minutes))?
-        )
-        .*?""")
+    # Times assumed for descriptions of the time of day
+    __timesOfDay__ = {
+        'morning': (8, 0),
+        'afternoon': (12, 0),
+        'evening': (19, 0)
+    }
+
+    _monthNumbers = dict(zip(__months__ + __shortMonths__,
+                             list(range(1, 13)) * 2))
+
+    _weekdayNumbers = dict(zip(__daysOfWeek__, range(7)))
+
+    _tokenRegex = re.compile(r"\d{1,2}:\d{2}|\w+")
+
+    _clockRegex = re.compile(r"(\d{1,2}):(\d{2})$")
+
+    _ordinalRegex = re.compile(r"(\d{1,2})(?:st|nd|rd|th)?$")
+
+    _wordRegex = re.compile(r"\S+")
+
+    # Most words read back from "(weeks|days) from" for the number of weeks
+    # or days, e.g., "nine hundred and ninety nine thousand nine hundred and
+    # ninety nine"
+    _prefixLimit = 12
+
+    # Words at which a description of a day or a time may start, as the
+    # named groups 'day' and 'time'
+    _dayAnchorRegex = re.compile(r"(?P<day>\b(?:%s)\b)" % '|'.join(
+        ['tomorrow', 'today', 'tonight', 'next', 'this', 'weeks?', 'days?'] +
+        __daysOfWeek__ + __months__ + __shortMonths__))
+
+    _timeAnchorRegex = re.compile(
+        r"(?P<time>\b(?:(?:morning|afternoon|evening|in)\b|\d{1,2}:\d{2}))")
+
+    _anchorRegex = re.compile(
+        _dayAnchorRegex.pattern + '|' + _timeAnchorRegex.pattern)
+
+    # The end of a sentence, across which days and times aren't paired
+    _sentenceRegex = re.compile(r"[.!?;]\s|\n")
+
+    _numbers = NumberService()
 
     def _preprocess(self, inp):
         return inp.replace('-', ' ').lower()
 
-    def extractDays(self, inp):
-        """Extracts all day-related information from an input string.
-        Ignores any information related to the specific time-of-day.
+    def _words(self, inp, pos, limit=None):
+        """Returns the (word, start, end) triples of preprocessed text from
+        pos onwards, keeping times such as '12:30' whole, as a list of at
+        most limit words (or a generator, if limit is None). Stops at the
+        first word separated from the one before it (or from pos) by
+        anything but whitespace, e.g., "june. 9", so that descriptions
+        don't run across punctuation."""
+        def words():
+            last = pos
+            for m in self._tokenRegex.finditer(inp, pos):
+                if inp[last:m.start()].strip():
+                    return
+                yield m.group(), m.start(), m.end()
+                last = m.end()
+
+        if limit is None:
+            return words()
+        return list(islice(words(), limit))
+
+    # Punctuation following a word, at which _words stops
+    _breakRegex = re.compile(r"\s*[^\w\s]")
+
+    def _brokenAfter(self, inp, end, stable):
+        """Checks whether _words stops after the word ending at end, however
+        text is appended after the offset stable."""
+        m = self._breakRegex.match(inp, end)
+        return m is not None and m.end() <= stable
+
+    def _matchDay(self, tokens):
+        """Matches the description of a day at the start of tokens,
+        returning (length, shift, weekday, nextWeek, month, day), or None.
+        """
+        n = len(tokens)
+        w = tokens[0][0]
+        for length in (1, 2):
+            phrase = ' '.join(token[0] for token in tokens[:length])
+            if phrase in self.__todayMatches__:
+                return length, 0, None, False, None, None
+            if phrase in self.__tomorrowMatches__:
+                return length, 1, None, False, None, None
+
+        if w in ('next', 'this') and n > 1:
+            following = tokens[1][0]
+            if following in self._weekdayNumbers:
+                return (2, 0, self._weekdayNumbers[following], w == 'next',
+                        None, None)
+
+        if w in self._weekdayNumbers:
+            return 1, 0, self._weekdayNumbers[w], False, None, None
+
+        if w in self._monthNumbers and n > 1:
+            month = self._monthNumbers[w]
+            # Prefer two-word days, e.g., "twenty sixth"
+            if n > 2:
+                combined = tokens[1][0] + ' ' + tokens[2][0]
+                if combined in self.__dateDescriptors__:
+                    return (3, 0, None, False, month,
+                            self.__dateDescriptors__[combined])
+
+            following = tokens[1][0]
+            if following in self.__dateDescriptors__:
+                return (2, 0, None, False, month,
+                        self.__dateDescriptors__[following])
+
+            m = self._ordinalRegex.match(following)
+            if m and 1 <= int(m.group(1)) <= 31:
+                return 2, 0, None, False, month, int(m.group(1))
+
+        return None
+
+    def _matchDayAt(self, inp, start):
+        """Matches the description of a day, reading at most five words
+        from the anchor at start, and allowing a leading "(weeks|days)
+        from". Returns a _DayMatch, or None."""
+        tokens = self._words(inp, start, 5)
+
+        day = None
+        skip = 0
+        if tokens[0][0] in ('week', 'weeks', 'day', 'days') and \
+                len(tokens) > 2 and tokens[1][0] == 'from':
+            skip = 2
+            day = self._matchDay(tokens[skip:])
+        if day is None:
+            skip = 0
+            day = self._matchDay(tokens)
+        if day is None:
+            return None
+
+        length, shift, weekday, nextWeek, month, d = day
+        prefix = inp[start:tokens[skip][1]] if skip else None
+        end = tokens[skip + length - 1][2]
+        return _DayMatch(start, end, prefix, shift, weekday, nextWeek,
+                         month, d)
+
+    def _matchDuration(self, inp, words):
+        """Matches "X (hours|minutes)" at the start of the (word, start,
+        end) triples, following them only across words which can describe
+        a number. Returns (end, hours, minutes), or None."""
+        first = last = None
+        for w, start, end in words:
+            if w in ('hours', 'minutes'):
+                break
+            if not self._numbers.isNumberWord(w):
+                return None
+            if first is None:
+                first = start
+            last = end
+        else:
+            return None
+        if first is None:
+            return None
+
+        try:
+            amount = self._numbers.parse(inp[first:last])
+        except NumberService.NumberException:
+            return None
+
+        if w == 'hours':
+            return end, amount, 0
+        return end, 0, amount
+
+    def _matchTimeAt(self, inp, anchor):
+        """Matches the description of a time from an anchor found by
+        _timeAnchorRegex. Returns a _TimeMatch, or None."""
+        w, start, end = anchor.group(), anchor.start(), anchor.end()
+
+        if w in self.__timesOfDay__:
+            h, m = self.__timesOfDay__[w]
+            return _TimeMatch(start, end, h, m, False)
+
+        if w == 'in':
+            duration = self._matchDuration(inp, self._words(inp, end))
+            if not duration:
+                return None
+            end, h, m = duration
+
+            # Allow a second duration, e.g., "and twenty minutes"
+            words = self._words(inp, end)
+            following = next(words, None)
+            if following and following[0] != 'and':
+                words = chain([following], words)
+            second = self._matchDuration(inp, words)
+            if second:
+                end, h2, m2 = second
+                h, m = h + h2, m + m2
+
+            return _TimeMatch(start, end, h, m, True)
+
+        clock = self._clockRegex.match(w)
+        h = int(clock.group(1)) % 12
+        m = int(clock.group(2))
+
+        # Allow a suffix, e.g., "12:30pm" or "12:30 pm"
+        suffix = self._words(inp, end, 1)
+        if suffix and suffix[0][0] in ('am', 'pm') and \
+                inp[end:suffix[0][1]] in ('', ' '):
+            if suffix[0][0] == 'pm':
+                h += 12
+            end = suffix[0][2]
+
+        return _TimeMatch(start, end, h, m, False)
+
+    def _scan(self, inp, anchors=None, pos=0):
+        """Finds the descriptions of days and times in preprocessed text in
+        a single pass. Works by finding the words at which they may start
+        (e.g., those in the __daysOfWeek__, __months__ and __shortMonths__
+        tables, or clock times) with a single regular expression, then
+        reading a bounded number of words from each. Relative times (e.g.,
+        "in two hours") are only followed across words which can describe
+        a number, so the scan runs in time linear in the length of the
+        text.
 
         Args:
-            inp (str): Input string to be parsed.
+            inp (str): Preprocessed text to be scanned.
+            anchors: The regular expression finding the words at which
+                matches may start, as the named groups 'day' and 'time'.
+                Defaults to _anchorRegex, which finds both.
+            pos (int): The offset from which to scan, which mustn't fall
+                inside a match.
 
         Returns:
-            A list of datetime objects containing the extracted date from the
-            input snippet, or an empty list if none found.
+            A list of _DayMatch and _TimeMatch, in order of appearance. A
+            day may overlap a time, as in "this morning".
         """
-        inp = self._preprocess(inp)
+        matches = []
+        lastDay = lastTime = 0
+        for anchor in (anchors or self._anchorRegex).finditer(inp, pos):
+            start = anchor.start()
+            if anchor.lastgroup == 'day':
+                if start < lastDay:
+                    continue
+                match = self._matchDayAt(inp, start)
+                if match:
+                    lastDay = match.end
+            else:
+                if start < lastTime:
+                    continue
+                match = self._matchTimeAt(inp, anchor)
+                if match:
+                    lastTime = match.end
+
+            if match:
+                matches.append(match)
+
+        return matches
+
+    def _decided(self, inp, anchor, stable):
+        """Checks whether the outcome of matching from an anchor found by
+        _anchorRegex is final, i.e., whether matching only reads words
+        which end by the offset stable, so that text appended after it
+        can't change whether there's a match or what it is.
+        """
+        if anchor.end() > stable:
+            return False
+        w = anchor.group()
+        if anchor.lastgroup == 'day':
+            words = self._words(inp, anchor.start(), 5)
+            return words[-1][2] <= stable and (
+                len(words) == 5 or
+                self._brokenAfter(inp, words[-1][2], stable))
+        if w in self.__timesOfDay__:
+            return True
+        if w != 'in':
+            suffix = self._words(inp, anchor.end(), 1)
+            if not suffix:
+                return self._brokenAfter(inp, anchor.end(), stable)
+            return suffix[0][2] <= stable
+
+        # Durations read number words up to the first other word, which
+        # may be 'hours' or 'minutes', and then perhaps a second duration
+        words = self._words(inp, anchor.end())
+        last = anchor.end()
+        for duration in range(2):
+            for w, start, end in words:
+                if end > stable:
+                    return False
+                last = end
+                if not self._numbers.isNumberWord(w):
+                    break
+            else:
+                return self._brokenAfter(inp, last, stable)
+            if w not in ('hours', 'minutes'):
+                return True
+            if duration == 0:
+                following = next(words, None)
+                if following is None:
+                    return self._brokenAfter(inp, last, stable)
+                if following[2] > stable:
+                    return False
+                if following[0] != 'and':
+                    words = chain([following], words)
+        return True
+
+    def _scanDays(self, inp):
+        """Finds the descriptions of days in preprocessed text, as a list
+        of _DayMatch."""
+        return self._scan(inp, self._dayAnchorRegex)
+
+    def _scanTimes(self, inp):
+        """Finds the descriptions of times in preprocessed text, as a list
+        of _TimeMatch."""
+        return self._scan(inp, self._timeAnchorRegex)
+
+    def _pairable(self, inp, a, b):
+        """Checks whether consecutive matches a and b are a day and a time
+        of day in the same sentence, which _pairDates may merge."""
+        if type(a) is type(b):
+            return False
+        time = a if isinstance(a, _TimeMatch) else b
+        if time.relative:
+            return False
+        return a.end >= b.start or \
+            not self._sentenceRegex.search(inp, a.end, b.start)
+
+    def _pairDates(self, inp, matches):
+        """Pairs each day with the nearest compatible time, i.e., one which
+        is next to it in matches, in the same sentence, and describes a
+        time of day rather than a time relative to now. Pairs are chosen
+        greedily, closest first, so that in "June 9 at 1:30pm, or June 10"
+        the time goes with June 9.
+
+        Args:
+            inp (str): The preprocessed text in which matches were found.
+            matches (list): _DayMatch and _TimeMatch, as returned by _scan.
+
+        Returns:
+            A list holding, for each match, the index of the match with
+            which it's paired, or None.
+        """
+        candidates = [(max(0, matches[i + 1].start - matches[i].end), i)
+                      for i in range(len(matches) - 1)
+                      if self._pairable(inp, matches[i], matches[i + 1])]
 
-        def extractDayOfWeek(dayMatch):
-            if dayMatch.group(5) in self.__daysOfWeek__:
-                return self.__daysOfWeek__.index(dayMatch.group(5))
-            elif dayMatch.group(6) in self.__daysOfWeek__:
-                return self.__daysOfWeek__.index(dayMatch.group(6))
-
-        def extractMonth(dayMatch):
-            if dayMatch.group(7) in self.__months__:
-                return self.__months__.index(dayMatch.group(7)) + 1
-            elif dayMatch.group(7) in self.__shortMonths__:
-                return self.__shortMonths__.index(dayMatch.group(7)) + 1
-
-        def extractDay(dayMatch):
-            combined = dayMatch.group(8) + dayMatch.group(9)
-            if combined in self.__dateDescriptors__:
-                return self.__dateDescriptors__[combined]
-            elif dayMatch.group(8) in self.__dateDescriptors__:
-                return self.__dateDescriptors__[dayMatch.group(8)]
-            elif int(dayMatch.group(8)) in self.__dateDescriptors__.values():
-                return int(dayMatch.group(8))
+        partners = [None] * len(matches)
+        for _, i in sorted(candidates):
+            if partners[i] is None and partners[i + 1] is None:
+                partners[i], partners[i + 1] = i + 1, i
+
+        return partners
+
+    def _daysFrom(self, inp, dayMatches):
+        """Finds the number of days added to each day by a leading "(weeks|
+        days) from", e.g., 21 for "three weeks from friday".
+
+        Args:
+            inp (str): The preprocessed text in which the days were found.
+            dayMatches (list): _DayMatch, in order of appearance.
+
+        Returns:
+            A list of (days, start) pairs, one for each match, of the
+            number of days (0 if it has no such prefix) and the offset at
+            which the description starts, i.e., that of its number, if
+            any, or else of the match.
+        """
+        service = self._numbers
+
+        # Whitespace-separated words, with their start and end offsets,
+        # tokenized once the first match with a numerical prefix is found
+        words = []
+        starts = []
+        ends = []
+        position = [0]
+
+        def numericalPrefix(dayMatch):
+            # Grab 'three' of 'three weeks from', reading back from the
+            # match over the words preceding it. Matches are in order, so
+            # the index of the first word after the last one only advances.
+            if not words:
+                for m in self._wordRegex.finditer(inp):
+                    words.append(m.group())
+                    starts.append(m.start())
+                    ends.append(m.end())
+            i = position[0]
+            while i < len(words) and ends[i] <= dayMatch.start:
+                i += 1
+            position[0] = i
+
+            prefix = [j for j in range(max(0, i - self._prefixLimit), i)
+                      if words[j] != 'and']
+            prefix.reverse()
+            if not prefix:
+                return 1, dayMatch.start
+
+            # Generate best guess number
+            num = words[prefix[0]]
+            start = starts[prefix[0]]
+            if service.isValid(num):
+                for j in prefix[1:]:
+                    inc = words[j] + " " + num
+                    if service.isValid(inc):
+                        num = inc
+                        start = starts[j]
+                    else:
+                        break
+                return service.parse(num), start
+            return 1, dayMatch.start
 
         def extractDaysFrom(dayMatch):
-            if not dayMatch.group(1):
-                return 0
-
-            def numericalPrefix(dayMatch):
-                # Grab 'three' of 'three weeks from'
-                prefix = inp.split(dayMatch.group(1))[0].strip().split(' ')
-                prefix.reverse()
-                prefix = list(filter(lambda s: s != 'and', prefix))
-
-                # Generate best guess number
-                service = NumberService()
-                num = prefix[0]
-                if service.isValid(num):
-                    for n in prefix[1:]:
-                        inc = n + " " + num
-                        if service.isValid(inc):
-                            num = inc
-                        else:
-                            break
-                    return service.parse(num)
-                return 1
-
-            factor = numericalPrefix(dayMatch)
-
-            if dayMatch.group(2) == 'week':
-                return factor * 7
-            elif dayMatch.group(2) == 'day':
-                return factor * 1
-
-        def handleMatch(dayMatch):
-            def safe(exp):
-                """For safe evaluation of regex groups"""
-                try:
-                    return exp()
-                except:
-                    return False
+            if not dayMatch.prefix:
+                return 0, dayMatch.start
+
+            try:
+                factor, start = numericalPrefix(dayMatch)
+            except:
+                return 0, dayMatch.start
 
-            days_from = safe(lambda: extractDaysFrom(dayMatch))
-            today = safe(lambda: dayMatch.group(3) in self.__todayMatches__)
-            tomorrow = safe(lambda: dayMatch.group(3)
-                            in self.__tomorrowMatches__)
-            next_week = safe(lambda: dayMatch.group(4) == 'next')
-            day_of_week = safe(lambda: extractDayOfWeek(dayMatch))
-            month = safe(lambda: extractMonth(dayMatch))
-            day = safe(lambda: extractDay(dayMatch))
+            if dayMatch.prefix.startswith('week'):
+                return factor * 7, start
+            return factor, start
 
+        return [extractDaysFrom(dayMatch) for dayMatch in dayMatches]
+
+    def _resolveDays(self, inp, dayMatches, now):
+        """Converts the days found in preprocessed text to datetime objects.
+
+        Args:
+            inp (str): The preprocessed text in which the days were found.
+            dayMatches (list): _DayMatch, in order of appearance.
+            now (datetime): The time to which the days are relative.
+
+        Returns:
+            A list of (start, datetime) pairs, one for each match, of the
+            offset at which the day's description starts, including any
+            numerical prefix, e.g., "three" of "three weeks from friday",
+            and the day.
+        """
+        def handleMatch(dayMatch, days_from):
             # Convert extracted terms to datetime object
-            if not dayMatch:
-                return None
-            elif today:
-                d = self.now
-            elif tomorrow:
-                d = self.now + datetime.timedelta(days=1)
-            elif type(day_of_week) == int:
-                current_day_of_week = self.now.weekday()
-                num_days_away = (day_of_week - current_day_of_week) % 7
-
-                if next_week:
+            if dayMatch.weekday is not None:
+                current_day_of_week = now.weekday()
+                num_days_away = (dayMatch.weekday - current_day_of_week) % 7
+
+                if dayMatch.nextWeek:
                     num_days_away += 7
 
-                d = self.now + \
-                    datetime.timedelta(days=num_days_away)
-            elif month and day:
+                d = now + datetime.timedelta(days=num_days_away)
+            elif dayMatch.month:
                 d = datetime.datetime(
-                    self.now.year, month, day,
-                    self.now.hour, self.now.minute)
+                    now.year, dayMatch.month, dayMatch.day,
+                    now.hour, now.minute)
+            else:
+                d = now + datetime.timedelta(days=dayMatch.shift)
 
             if days_from:
                 d += datetime.timedelta(days=days_from)
 
             return d
 
-        matches = self._dayRegex.finditer(inp)
-        return [handleMatch(dayMatch) for dayMatch in matches]
+        return [(start, handleMatch(dayMatch, days_from))
+                for dayMatch, (days_from, start) in
+                zip(dayMatches, self._daysFrom(inp, dayMatches))]
+
+    def _resolveTime(self, time, now):
+        """Converts a _TimeMatch to a datetime object, relative to now."""
+        if time.relative:
+            return now + datetime.timedelta(hours=time.hours,
+                                            minutes=time.minutes)
+        return datetime.datetime(
+            now.year, now.month, now.day, time.hours, time.minutes
+        )
+
+    def extractDays(self, inp, now=None, tz=None):
+        """Extracts all day-related information from an input string.
+        Ignores any information related to the specific time-of-day.
+
+        Args:
+            inp (str): Input string to be parsed.
+            now: The time to which the results are relative, for this call
+                only. Defaults to the service's.
+            tz: The timezone of the results, for this call only, if now
+                isn't supplied. Defaults to the service's.
+
+        Returns:
+            A list of datetime objects containing the extracted date from the
+            input snippet, or an empty list if none found.
+        """
+        inp = self._preprocess(inp)
+        return [day for _, day in self._resolveDays(
+            inp, self._scanDays(inp), self._reference(now, tz))]
 
-    def extractDay(self, inp):
+    def extractDay(self, inp, now=None, tz=None):
         """Returns the first time-related date found in the input string,
         or None if not found."""
-        day = self.extractDay(inp)
+        day = self.extractDays(inp, now, tz)
         if day:
             return day[0]
         return None
 
-    def extractTimes(self, inp):
+    def extractDaySpans(self, inp, now=None, tz=None):
+        """Extracts days as in extractDays, along with where in the input
+        each was found.
+
+        Returns:
+            A list of Match of kind 'day', whose values are the datetime
+            objects of extractDays, in order of appearance.
+        """
+        text = self._preprocess(inp)
+        dayMatches = self._scanDays(text)
+        days = self._resolveDays(text, dayMatches, self._reference(now, tz))
+        return [Match('day', start, m.end, inp[start:m.end], day)
+                for m, (start, day) in zip(dayMatches, days)]
+
+    def extractTimes(self, inp, now=None, tz=None):
         """Extracts time-related information from an input string.
         Ignores any information related to the specific date, focusing
         on the time-of-day.
 
         Args:
             inp (str): Input string to be parsed.
+            now: The time to which the results are relative, for this call
+                only. Defaults to the service's.
+            tz: The timezone of the results, for this call only, if now
+                isn't supplied. Defaults to the service's.
 
         Returns:
             A list of datetime objects containing the extracted times from the
             input snippet, or an empty list if none found.
         """
-        def handleMatch(time):
-            relative = False
-
-            if not time:
-                return None
-
-            # Default times: 8am, 12pm, 7pm
-            elif time.group(1) == 'morning':
-                h = 8
-                m = 0
-            elif time.group(1) == 'afternoon':
-                h = 12
-                m = 0
-            elif time.group(1) == 'evening':
-                h = 19
-                m = 0
-            elif time.group(4) and time.group(5):
-                h, m = 0, 0
-
-                # Extract hours difference
-                converter = NumberService()
-                try:
-                    diff = converter.parse(time.group(4))
-                except:
-                    return None
-
-                if time.group(5) == 'hours':
-                    h += diff
-                else:
-                    m += diff
-
-                # Extract minutes difference
-                if time.group(6):
-                    converter = NumberService()
-                    try:
-                        diff = converter.parse(time.group(7))
-                    except:
-                        return None
-
-                    if time.group(8) == 'hours':
-                        h += diff
-                    else:
-                        m += diff
-
-                relative = True
-            else:
-                # Convert from "HH:MM pm" format
-                t = time.group(2)
-                h, m = int(t.split(':')[0]) % 12, int(t.split(':')[1])
-
-                try:
-                    if time.group(3) == 'pm':
-                        h += 12
-                except IndexError:
-                    pass
-
-            if relative:
-                return self.now + datetime.timedelta(hours=h, minutes=m)
-            else:
-                return datetime.datetime(
-                    self.now.year, self.now.month, self.now.day, h, m
-                )
-
+        now = self._reference(now, tz)
         inp = self._preprocess(inp)
-        return [handleMatch(time) for time in self._timeRegex.finditer(inp)]
+        return [self._resolveTime(time, now) for time in self._scanTimes(inp)]
 
-    def extractTime(self, inp):
+    def extractTime(self, inp, now=None, tz=None):
         """Returns the first time-related date found in the input string,
         or None if not found."""
-        times = self.extractTimes(inp)
+        times = self.extractTimes(inp, now, tz)
         if times:
             return times[0]
         return None
 
-    def extractDates(self, inp):
+    def extractTimeSpans(self, inp, now=None, tz=None):
+        """Extracts times as in extractTimes, along with where in the input
+        each was found.
+
+        Returns:
+            A list of Match of kind 'time', whose values are the datetime
+            objects of extractTimes, in order of appearance.
+        """
+        now = self._reference(now, tz)
+        return [Match('time', m.start, m.end, inp[m.start:m.end],
+                      self._resolveTime(m, now))
+                for m in self._scanTimes(self._preprocess(inp))]
+
+    def extractDates(self, inp, now=None, tz=None):
         """Extract semantic date information from an input string.
-        In effect, runs both parseDay and parseTime on the input
-        string and merges the results to produce a comprehensive
-        datetime object.
+        Finds both days and times in a single pass, and merges each day
+        with the nearest time of day in the same sentence to produce a
+        comprehensive datetime object. Days and times left unpaired are
+        returned as they are.
 
         Args:
             inp (str): Input string to be parsed.
+            now: The time to which the results are relative, for this call
+                only. Defaults to the service's.
+            tz: The timezone of the results, for this call only, if now
+                isn't supplied. Defaults to the service's.
 
         Returns:
             A list of datetime objects containing the extracted dates from the
-            input snippet, or an empty list if not found.
+            input snippet, in order of appearance, or an empty list if not
+            found.
         """
-        def merge(param):
-            day, time = param
-            if not (day or time):
-                return None
+        inp = self._preprocess(inp)
+        matches = self._scan(inp)
+        return [date for _, _, date in
+                self._mergeDates(inp, matches, self._reference(now, tz))]
 
-            if not day:
-                return time
-            if not time:
-                return day
+    def extractDateSpans(self, inp, now=None, tz=None):
+        """Extracts dates as in extractDates, along with where in the input
+        each was found. A day merged with its time spans both, and any
+        text between them.
 
-            return datetime.datetime(
-                day.year, day.month, day.day, time.hour, time.minute
-            )
+        Returns:
+            A list of Match of kind 'date', whose values are the datetime
+            objects of extractDates, in order of appearance.
+        """
+        text = self._preprocess(inp)
+        return [Match('date', start, end, inp[start:end], date)
+                for start, end, date in self._mergeDates(
+                    text, self._scan(text), self._reference(now, tz))]
 
-        days = self.extractDays(inp)
-        times = self.extractTimes(inp)
-        return map(merge, zip_longest(days, times, fillvalue=None))
+    def _mergeDates(self, inp, matches, now):
+        """Converts the days and times found in preprocessed text to
+        datetime objects, merging each day with the time paired with it by
+        _pairDates.
 
-    def extractDate(self, inp):
+        Args:
+            inp (str): The preprocessed text in which matches were found.
+            matches (list): _DayMatch and _TimeMatch, as returned by _scan.
+            now (datetime): The time to which the dates are relative.
+
+        Returns:
+            A list of (start, end, datetime) triples, each spanning a day
+            and its time, or either alone, in order of appearance.
+        """
+        partners = self._pairDates(inp, matches)
+
+        days = iter(self._resolveDays(
+            inp, [m for m in matches if isinstance(m, _DayMatch)], now))
+        values = [next(days) if isinstance(m, _DayMatch)
+                  else (m.start, self._resolveTime(m, now)) for m in matches]
+
+        dates = []
+        for i, (match, partner) in enumerate(zip(matches, partners)):
+            start, value = values[i]
+            if partner is None:
+                dates.append((start, match.end, value))
+            elif partner > i:
+                if isinstance(match, _DayMatch):
+                    day, time = value, values[partner][1]
+                else:
+                    day, time = values[partner][1], value
+                end = max(match.end, matches[partner].end)
+                dates.append((start, end, datetime.datetime(
+                    day.year, day.month, day.day, time.hour, time.minute
+                )))
+
+        return dates
+
+    def stream(self, now=None, tz=None):
+        """Starts extracting dates from text which arrives a little at a
+        time, e.g., from live transcription.
+
+        Args:
+            now: The time to which the dates are relative. Defaults to the
+                service's, read once when the stream starts.
+            tz: The timezone of the dates, if now isn't supplied. Defaults
+                to the service's.
+
+        Returns:
+            A DateStream, to which text is fed as it arrives.
+        """
+        return DateStream(self, self._reference(now, tz))
+
+    def extractDate(self, inp, now=None, tz=None):
         """Returns the first date found in the input string, or None if not
         found."""
-        dates = self.extractDates(inp)
+        dates = self.extractDates(inp, now, tz)
         for date in dates:
             return date
         return None
 
-    def convertDay(self, day, prefix="", weekday=False):
+    def _describeDate(self, inp):
+        """Describes the first date in an input string independently of
+        the time to which it's relative, as a day, the number of days
+        added to it, and a time, matching the first of extractDates.
+
+        Returns:
+            A tuple (day, daysFrom, time) of a _DayMatch (or None), a
+            number of days, and a _TimeMatch (or None), or None if the
+            input holds no date.
+        """
+        inp = self._preprocess(inp)
+        matches = self._scan(inp)
+        if not matches:
+            return None
+
+        first = matches[0]
+        partner = self._pairDates(inp, matches)[0]
+        if isinstance(first, _TimeMatch):
+            day, time = None, first
+            if partner is not None:
+                day = matches[partner]
+        else:
+            day, time = first, None
+            if partner is not None:
+                time = matches[partner]
+
+        daysFrom = self._daysFrom(inp, [day])[0][0] if day else 0
+        return day, daysFrom, time
+
+    def extractDateArray(self, inputs, now):
+        """Extracts the first date from each of a sequence of input
+        strings, each relative to its own reference time, as extractDate
+        would with now supplied per call. Each distinct input is parsed
+        only once, into an offset from its reference time, and the offsets
+        are then applied to all of the reference times at once. Suited to,
+        e.g., log records, each of which carries a timestamp.
+
+        Requires numpy. Reference times are timezone-less, and so are the
+        results.
+
+        Args:
+            inputs (list): Input strings to be parsed.
+            now: The time to which the date in each input is relative, as
+                an array of numpy.datetime64 of the same length as inputs.
+
+        Returns:
+            An array of numpy.datetime64 (in microseconds) holding the
+            first date in each input, or NaT where none was found or the
+            date doesn't exist (e.g., "February 30").
+        """
+        import numpy as np
+
+        now = np.asarray(now, dtype='datetime64[us]')
+        if now.shape != (len(inputs),):
+            raise ValueError(
+                "Expected %d reference times, got an array of shape %s" %
+                (len(inputs), now.shape))
+        if not len(inputs):
+            return now.copy()
+
+        phrases, inverse = np.unique(np.asarray(inputs, dtype=object),
+                                     return_inverse=True)
+
+        # The offset of each distinct phrase, in columns of integers: its
+        # kind of day, the day itself, the days added to it and its time
+        # (in microseconds)
+        NONE, SHIFT, WEEKDAY, MONTH = range(4)
+        CLOCK, RELATIVE = 1, 2
+        columns = np.zeros((len(phrases), 8), dtype=np.int64)
+        found = np.zeros(len(phrases), dtype=bool)
+        for i, phrase in enumerate(phrases):
+            date = self._describeDate(phrase)
+            if date is None:
+                continue
+            day, daysFrom, time = date
+            found[i] = True
+            if day is None:
+                pass
+            elif day.weekday is not None:
+                columns[i, :3] = WEEKDAY, day.weekday, day.nextWeek
+            elif day.month:
+                columns[i, 0] = MONTH
+                columns[i, 3:5] = day.month, day.day
+            else:
+                columns[i, :2] = SHIFT, day.shift
+            columns[i, 5] = int(round(daysFrom * 86400e6))
+            if time is not None:
+                columns[i, 6] = RELATIVE if time.relative else CLOCK
+                columns[i, 7] = int(round(
+                    (time.hours * 60 + time.minutes) * 60e6))
+
+        kind, value, nextWeek, month, dayOfMonth, daysFrom, timeKind, delta = \
+            columns[inverse].T
+        found = found[inverse]
+
+        us = np.timedelta64(1, 'us')
+        oneDay = np.timedelta64(1, 'D')
+        days = now.astype('datetime64[D]')
+
+        # Weekdays and shifts, e.g., "next friday" or "tomorrow", move the
+        # reference time by a number of days; 1970-01-01 was a Thursday
+        weekdays = (days.astype(np.int64) + 3) % 7
+        shift = np.where(kind == SHIFT, value, 0)
+        shift = np.where(kind == WEEKDAY,
+                         (value - weekdays) % 7 + 7 * nextWeek, shift)
+        result = now + shift * oneDay
+
+        # Months and days keep the reference time's year, hour and minute
+        months = now.astype('datetime64[Y]').astype('datetime64[M]') + \
+            np.maximum(month - 1, 0)
+        dates = months.astype('datetime64[D]') + \
+            np.maximum(dayOfMonth - 1, 0)
+        minutes = (now - days).astype('timedelta64[m]')
+        onDate = dates + minutes
+        isMonth = kind == MONTH
+        result = np.where(isMonth, onDate, result)
+        found &= ~isMonth | (dates.astype('datetime64[M]') == months)
+
+        result = result + daysFrom * us
+
+        # Times of day replace the time, while relative times only apply
+        # to the reference time, as they're never paired with a day
+        result = np.where(timeKind == CLOCK,
+                          result.astype('datetime64[D]') + delta * us, result)
+        result = np.where(timeKind == RELATIVE, now + delta * us, result)
+
+        result = result.astype('datetime64[us]')
+        result[~found] = np.datetime64('NaT')
+        return result
+
+    def convertDay(self, day, prefix="", weekday=False, now=None, tz=None):
         """Convert a datetime object representing a day into a human-ready
         string that can be read, spoken aloud, etc.
 
@@ -397,6 +1013,10 @@ class DateService(object):
                 return "tomorrow" (rather than "in tomorrow").
             weekday (bool): An optional argument that returns "Monday, Oct. 1"
                 if True, rather than "Oct. 1".
+            now: The time from which "today" and "tomorrow" are judged, for
+                this call only. Defaults to the service's.
+            tz: The timezone in which they're judged, for this call only,
+                if now isn't supplied. Defaults to the service's.
 
         Returns:
             A string representation of the input day, ignoring any time-related
@@ -408,9 +1028,10 @@ class DateService(object):
             y = d1.year == d2.year
             return d and m and y
 
-        tom = self.now + datetime.timedelta(days=1)
+        now = self._reference(now, tz)
+        tom = now + datetime.timedelta(days=1)
 
-        if sameDay(day, self.now):
+        if sameDay(day, now):
             return "today"
         elif sameDay(day, tom):
             return "tomorrow"
@@ -450,7 +1071,8 @@ class DateService(object):
 
         return timeString
 
-    def convertDate(self, date, prefix="", weekday=False):
+    def convertDate(self, date, prefix="", weekday=False, now=None,
+                    tz=None):
         """Convert a datetime object representing into a human-ready
         string that can be read, spoken aloud, etc. In effect, runs
         both convertDay and convertTime on the input, merging the results.
@@ -463,16 +1085,212 @@ class DateService(object):
                 return "tomorrow" (rather than "in tomorrow").
             weekday (bool): An optional argument that returns "Monday, Oct. 1"
                 if True, rather than "Oct. 1".
+            now: The time from which "today" and "tomorrow" are judged, for
+                this call only. Defaults to the service's.
+            tz: The timezone in which they're judged, for this call only,
+                if now isn't supplied. Defaults to the service's.
 
         Returns:
             A string representation of the input day and time.
         """
         dayString = self.convertDay(
-            date, prefix=prefix, weekday=weekday)
+            date, prefix=prefix, weekday=weekday, now=now, tz=tz)
         timeString = self.convertTime(date)
         return dayString + " at " + timeString
 
 
+class DateStream(object):
+
+    """Extracts dates from text which arrives a little at a time, as
+    extractDates would from all of the text so far, in time linear in the
+    length of the text. Created by DateService.stream.
+
+    Each feed only scans the tail of the text which could still change:
+    from the end of the last date which text yet to arrive can't affect
+    (by completing a word, or by adding a time to pair with) onwards.
+    Dates in the tail are reported as soon as they're found, and then as
+    changed or retracted if more text changes them, e.g., when "June 9" is
+    followed by "at 5pm", or when "June 1" turns out to be "June 10".
+
+    Args:
+        service (DateService): The service used to find dates.
+        now (datetime): The time to which the dates are relative.
+    """
+
+    def __init__(self, service, now):
+        self._service = service
+        self._now = now
+
+        # Preprocessed text from _offset onwards, scanned from _pos, and
+        # the offset within it of the last whitespace
+        self._text = ''
+        self._offset = 0
+        self._pos = 0
+        self._stable = -1
+
+        self._final = []
+        self._tentative = []
+
+    _lastSpaceRegex = re.compile(r"\s(?=\S*\Z)")
+
+    @property
+    def matches(self):
+        """The dates found so far, as (start, end, datetime) triples
+        spanning their descriptions in the text, in order of appearance.
+        """
+        return self._final + self._tentative
+
+    @property
+    def dates(self):
+        """The dates found so far, as a list of datetime objects."""
+        return [date for _, _, date in self.matches]
+
+    def feed(self, chunk):
+        """Appends a chunk of text, finding any dates it completes.
+
+        Args:
+            chunk (str): The text which has arrived since the last call.
+
+        Returns:
+            A tuple (added, changed, retracted) of lists of (start, end,
+            datetime) triples: the dates found for the first time, those
+            found at the same offset as before but with a different span or
+            value, and those no longer found at all.
+        """
+        return self._update(chunk, False)
+
+    def close(self):
+        """Marks the end of the text, settling any dates at its end.
+
+        Returns:
+            A tuple (added, changed, retracted), as returned by feed.
+        """
+        return self._update('', True)
+
+    def _update(self, chunk, closing):
+        service = self._service
+        chunk = service._preprocess(chunk)
+        self._text += chunk
+        text, pos = self._text, self._pos
+
+        if closing:
+            stable = len(text)
+        else:
+            space = self._lastSpaceRegex.search(chunk)
+            if space:
+                self._stable = len(text) - len(chunk) + space.start()
+            stable = self._stable
+
+        # Anchors before limit are decided; those after may change
+        limit = stable
+        if not closing:
+            for anchor in service._anchorRegex.finditer(text, pos):
+                if anchor.start() >= limit:
+                    break
+                if not service._decided(text, anchor, stable):
+                    limit = anchor.start()
+                    break
+
+        matches = service._scan(text, pos=pos)
+        dates = service._mergeDates(text, matches, self._now)
+
+        cut, pos = self._cut(text, matches, limit, closing)
+        final = [date for date in dates
+                 if cut >= 0 and date[0] <= matches[cut].start]
+        tentative = dates[len(final):]
+
+        # Keep enough words before pos for "(weeks|days) from" prefixes
+        start = self._prefixStart(text, pos)
+        self._text = text[start:]
+        self._pos = pos - start
+        self._stable -= start
+        offset = self._offset
+        self._offset += start
+
+        def absolute(dates):
+            return [(s + offset, e + offset, d) for s, e, d in dates]
+
+        final, tentative = absolute(final), absolute(tentative)
+        before = dict((s, (e, d)) for s, e, d in self._tentative)
+        added, changed = [], []
+        for s, e, d in final + tentative:
+            if s not in before:
+                added.append((s, e, d))
+            elif before.pop(s) != (e, d):
+                changed.append((s, e, d))
+        retracted = [(s,) + before[s] for s in sorted(before)]
+
+        self._final.extend(final)
+        self._tentative = tentative
+        return added, changed, retracted
+
+    def _cut(self, text, matches, limit, closing):
+        """Finds the last of matches (scanned from _pos) which is final,
+        along with all before it: one before limit, and which can't be
+        paired with any later match, nor change the pairs of those before
+        it. That's so if it isn't _pairable with the next match, or if
+        _pairDates is sure to pair it with the one before, as their gap
+        sorts before those on either side.
+
+        Returns:
+            A tuple (index, pos) of the index of the match, or -1, and the
+            offset from which to scan next.
+        """
+        service = self._service
+        n = len(matches)
+        if closing:
+            return n - 1, len(text)
+
+        final = 0
+        while final < n and matches[final].start < limit:
+            final += 1
+
+        def key(i):
+            # The order in which _pairDates considers the pair (i, i + 1),
+            # or None if it doesn't
+            if i < 0 or not service._pairable(text, matches[i],
+                                              matches[i + 1]):
+                return None
+            return max(0, matches[i + 1].start - matches[i].end), i
+
+        for i in range(final - 1, -1, -1):
+            pos = matches[i + 1].start if i + 1 < final else limit
+            if max(m.end for m in matches[:i + 1]) > pos:
+                continue
+
+            if i + 1 < final:
+                after = key(i)
+                if after is None:
+                    return i, pos
+                paired = key(i - 1)
+                if paired is not None and paired < after:
+                    earlier = key(i - 2)
+                    if earlier is None or paired < earlier:
+                        return i, pos
+            else:
+                match = matches[i]
+                if isinstance(match, _TimeMatch) and match.relative or \
+                        service._sentenceRegex.search(text, match.end, pos):
+                    return i, pos
+
+        if n and matches[0].start < limit:
+            return -1, min(limit, matches[0].start)
+        return -1, max(self._pos, limit)
+
+    def _prefixStart(self, text, pos):
+        """Finds the start of the words which a "(weeks|days) from" at or
+        after pos could read back over."""
+        if not pos:
+            return 0
+        words = re.match(r"\S*(?:\s+\S+){0,%d}" %
+                         self._service._prefixLimit, text[pos - 1::-1])
+        return pos - words.end()
+
+
+# Shared by calls to extractDates, as a DateService holds no state
+_service = DateService()
+
+
 def extractDates(inp, tz=None, now=None):
     """Extract semantic date information from an input string.
     This is a convenience method which would only be used if
@@ -491,5 +1309,4 @@ def extractDates(inp, tz=None, now=None):
     Returns:
         A list of datetime objects extracted from input.
     """
-    service = DateService(tz=tz, now=now)
-    return service.extractDates(inp)
+    return _service.extractDates(inp, now=now, tz=tz)
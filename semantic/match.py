@@ -0,0 +1,25 @@
+from collections import namedtuple
+
+
+class Match(namedtuple('Match', ['kind', 'start', 'end', 'text', 'value'])):
+
+    """A description found in text by one of the services' span-returning
+    extractors (e.g., DateService.extractDateSpans), or by Annotator.
+
+    Matches are tuples without a per-instance __dict__, so that holding
+    many of them, e.g., for every sentence of a corpus, costs little more
+    than their fields.
+
+    Args:
+        kind (str): What was found, e.g., 'day', 'time', 'date', 'unit',
+            'number', 'quantity' or 'math'.
+        start (int): The offset in the input of the description's first
+            character.
+        end (int): The offset in the input just past its last character,
+            so that text is input[start:end].
+        text (str): The description, as it appears in the input.
+        value: The parsed value, e.g., a datetime for a date, a quantities
+            label for a unit, or a float for a number.
+    """
+
+    __slots__ = ()
@@ -1,7 +1,39 @@
 import re
+from collections import namedtuple
+from .cache import LRUCache
+from .match import Match
+
+# Token kinds and roles recognized by NumberService's parsing automaton
+_SMALL, _HUNDRED, _MAGNITUDE, _LITERAL, _AND, _POINT = range(6)
+_ORDINAL, _PLURAL = range(2)
+
+# States of NumberService's parsing automaton
+_EMPTY, _WHOLE, _CONJUNCTION, _NUMERATOR, _DENOMINATOR, _DECIMAL, \
+    _DIGITS = range(7)
+
+NumberMatch = namedtuple('NumberMatch', ['value', 'text', 'start', 'end',
+                                         'tokenStart', 'tokenEnd'])
 
 
 class NumberService(object):
+
+    """Initialize a NumberService for parsing numbers described in text.
+
+    Args:
+        cacheSize: An optional capacity for an LRUCache, available as
+            self.cache, which memoizes the results of parse. Parsing is
+            uncached if none is supplied.
+
+    Returns:
+        A NumberService which parses numbers, using a cache if requested.
+    """
+
+    def __init__(self, cacheSize=None):
+        if cacheSize:
+            self.cache = LRUCache(cacheSize)
+        else:
+            self.cache = None
+
     __small__ = {
         'zero': 0,
         'one': 1,
@@ -54,13 +86,14 @@ class NumberService(object):
         'fourth': 'four',
         'fifth': 'five',
         'sixth': 'six',
-        'seventh': 'seventh',
+        'seventh': 'seven',
         'eighth': 'eight',
         'ninth': 'nine',
         'tenth': 'ten',
         'eleventh': 'eleven',
         'twelth': 'twelve',
         'thirteenth': 'thirteen',
+        'fourteenth': 'fourteen',
         'fifteenth': 'fifteen',
         'sixteenth': 'sixteen',
         'seventeenth': 'seventeen',
@@ -88,6 +121,24 @@ class NumberService(object):
         def __init__(self, msg):
             Exception.__init__(self, msg)
 
+    # Error codes reported by parseMany
+    PARSED, UNKNOWN_NUMBER, INVALID_INPUT = range(3)
+
+    _tokenRegex = re.compile(
+        r"[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?|[^\s\-]+")
+
+    _literalRegex = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?$")
+
+    # Strings which float() converts directly
+    _exactRegex = re.compile(
+        r"\s*[-+]?(?:(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?|inf(?:inity)?|nan)\s*$")
+
+    _wordRegex = re.compile(r"\S+")
+
+    # Punctuation stripped from either side of words during extraction
+    _leading = '([{"\''
+    _trailing = '.,;:!?)]}"\''
+
     def parse(self, words):
         """A general method for parsing word-representations of numbers.
         Supports floats and integers.
@@ -98,6 +149,23 @@ class NumberService(object):
         Returns:
             A double representation of the words.
         """
+        if self.cache is None:
+            return self._parse(words)
+
+        # Normalize case and spacing, which don't affect the result
+        try:
+            key = ' '.join(words.lower().split())
+        except AttributeError:
+            key = words
+
+        result = self.cache.get(key)
+        if result is None:
+            result = self._parse(words)
+            self.cache.put(key, result)
+        return result
+
+    def _parse(self, words):
+        """Parses words as in parse, bypassing the cache."""
         def exact(words):
             """If already represented as float or int, convert."""
             try:
@@ -109,17 +177,7 @@ class NumberService(object):
         if guess is not None:
             return guess
 
-        split = words.split(' ')
-
-        # Replace final ordinal/fraction with number
-        if split[-1] in self.__fractions__:
-            split[-1] = self.__fractions__[split[-1]]
-        elif split[-1] in self.__ordinals__:
-            split[-1] = self.__ordinals__[split[-1]]
-
-        parsed_ordinals = ' '.join(split)
-
-        return self.parseFloat(parsed_ordinals)
+        return self._parseTokens(words)
 
     def parseFloat(self, words):
         """Convert a floating-point number described in words to a double.
@@ -134,62 +192,7 @@ class NumberService(object):
         Returns:
             A double representation of the words.
         """
-        def pointFloat(words):
-            m = re.search(r'(.*) point (.*)', words)
-            if m:
-                whole = m.group(1)
-                frac = m.group(2)
-                total = 0.0
-                coeff = 0.10
-                for digit in frac.split(' '):
-                    total += coeff * self.parse(digit)
-                    coeff /= 10.0
-
-                return self.parseInt(whole) + total
-            return None
-
-        def fractionFloat(words):
-            m = re.search(r'(.*) and (.*)', words)
-            if m:
-                whole = self.parseInt(m.group(1))
-                frac = m.group(2)
-
-                # Replace plurals
-                frac = re.sub(r'(\w+)s(\b)', '\g<1>\g<2>', frac)
-
-                # Convert 'a' to 'one' (e.g., 'a third' to 'one third')
-                frac = re.sub(r'(\b)a(\b)', '\g<1>one\g<2>', frac)
-
-                split = frac.split(' ')
-
-                # Split fraction into num (regular integer), denom (ordinal)
-                num = split[:1]
-                denom = split[1:]
-
-                while denom:
-                    try:
-                        # Test for valid num, denom
-                        num_value = self.parse(' '.join(num))
-                        denom_value = self.parse(' '.join(denom))
-                        return whole + float(num_value) / denom_value
-                    except:
-                        # Add another word to num
-                        num += denom[:1]
-                        denom = denom[1:]
-            return None
-
-        # Extract "one point two five"-type float
-        result = pointFloat(words)
-        if result:
-            return result
-
-        # Extract "one and a quarter"-type float
-        result = fractionFloat(words)
-        if result:
-            return result
-
-        # Parse as integer
-        return self.parseInt(words)
+        return self._parseTokens(words)
 
     def parseInt(self, words):
         """Parses words to the integer they describe.
@@ -200,43 +203,144 @@ class NumberService(object):
         Returns:
             An integer representation of the words.
         """
-        # Remove 'and', case-sensitivity
-        words = words.replace(" and ", " ").lower()
-        # 'a' -> 'one'
-        words = re.sub(r'(\b)a(\b)', '\g<1>one\g<2>', words)
-
-        def textToNumber(s):
-            """
-            Converts raw number string to an integer.
-            Based on text2num.py by Greg Hewill.
-            """
-            a = re.split(r"[\s-]+", s)
-            n = 0
-            g = 0
-            for w in a:
-                x = NumberService.__small__.get(w, None)
-                if x is not None:
-                    g += x
-                elif w == "hundred":
-                    g *= 100
-                else:
-                    x = NumberService.__magnitude__.get(w, None)
-                    if x is not None:
-                        n += g * x
-                        g = 0
-                    else:
-                        raise NumberService.NumberException(
-                            "Unknown number: " + w)
-            return n + g
+        return self._parseTokens(words, decimals=False, fractions=False)
+
+    def _classify(self, w):
+        """Looks up the (kind, value, role) triple for a single token."""
+        entry = self._vocabulary.get(w)
+        if entry is not None:
+            return entry
+
+        if self._literalRegex.match(w):
+            return (_LITERAL, float(w), None)
+
+        raise NumberService.NumberException("Unknown number: " + w)
+
+    def _parseTokens(self, words, decimals=True, fractions=True):
+        """Parses a description of a number in a single left-to-right pass.
+
+        Args:
+            words (str): Description of the number.
+            decimals (bool): Whether "point" descriptions are accepted.
+            fractions (bool): Whether "and a quarter"-type descriptions
+                are accepted.
+
+        Returns:
+            An integer for integer descriptions, or a double otherwise.
+        """
+        automaton = _NumberAutomaton(decimals, fractions)
+        feed, classify = automaton.feed, self._classify
+        for w in self._tokenRegex.findall(words.lower()):
+            kind, value, role = classify(w)
+            if not feed(w, kind, value, role):
+                raise NumberService.NumberException("Unknown number: " + w)
+
+        if not automaton.accepting():
+            raise NumberService.NumberException("Unknown number: " + words)
+        return automaton.value()
+
+    def isNumberWord(self, w):
+        """Checks whether a single lowercase word (e.g., 'twenty', 'and' or
+        '3.5') can appear in a description of a number.
 
-        return textToNumber(words)
+        Args:
+            w (str): The word to be tested.
+
+        Returns:
+            True if w is in the vocabulary of parse, or a numeral.
+        """
+        return w in self._vocabulary or bool(self._literalRegex.match(w))
 
     def isValid(self, inp):
+        """Checks whether a string describes a number which parse accepts.
+
+        Runs the parsing automaton as a recognizer, rejecting the input as
+        soon as a word falls outside the vocabulary, so that the common
+        case of non-numerical text costs a dictionary lookup rather than an
+        exception.
+
+        Args:
+            inp (str): The string to be tested.
+
+        Returns:
+            True if parse would return a number for the input.
+        """
         try:
-            self.parse(inp)
-            return True
-        except:
-            return False
+            words = inp.lower()
+        except AttributeError:
+            return isinstance(inp, (int, float))
+
+        vocabulary = self._vocabulary
+        automaton = _NumberAutomaton()
+        for w in self._tokenRegex.findall(words):
+            entry = vocabulary.get(w)
+            if entry is None:
+                if self._exactRegex.match(words):
+                    return True
+                if not self._literalRegex.match(w):
+                    return False
+                entry = (_LITERAL, 0.0, None)
+            if not automaton.feed(w, *entry):
+                return False
+        return automaton.accepting()
+
+    def parseMany(self, inputs, masked=False):
+        """Parses a sequence of number descriptions into a NumPy array.
+
+        Each distinct input is parsed once, and its result is scattered back
+        to every position at which it appears, so highly repetitive inputs
+        are cheap to parse.
+
+        Args:
+            inputs (iterable): Descriptions of numbers, as accepted by parse.
+            masked (bool): If True, return a masked array in which entries
+                that failed to parse are masked, rather than NaN.
+
+        Returns:
+            A tuple (values, errors) of equal-length arrays. values is a
+            float64 array of the parsed numbers, holding NaN (or masked) for
+            inputs that failed to parse. errors is an int8 array holding
+            NumberService.PARSED for successes, UNKNOWN_NUMBER for inputs
+            that don't describe a number, and INVALID_INPUT for inputs that
+            aren't strings or numbers.
+        """
+        import numpy as np
+
+        # Map each input to the position of its first occurrence
+        positions = {}
+        distinct = []
+        inverse = []
+        for inp in inputs:
+            try:
+                k = positions.get(inp)
+                if k is None:
+                    k = positions[inp] = len(distinct)
+                    distinct.append(inp)
+            except TypeError:
+                # Unhashable inputs are parsed on their own
+                k = len(distinct)
+                distinct.append(inp)
+            inverse.append(k)
+
+        values = np.empty(len(distinct), dtype=np.float64)
+        errors = np.zeros(len(distinct), dtype=np.int8)
+        for k, inp in enumerate(distinct):
+            try:
+                values[k] = self.parse(inp)
+            except NumberService.NumberException:
+                values[k] = np.nan
+                errors[k] = NumberService.UNKNOWN_NUMBER
+            except Exception:
+                values[k] = np.nan
+                errors[k] = NumberService.INVALID_INPUT
+
+        inverse = np.asarray(inverse, dtype=np.intp)
+        values = values[inverse]
+        errors = errors[inverse]
+
+        if masked:
+            values = np.ma.masked_array(values, mask=errors != 0)
+        return values, errors
 
     @staticmethod
     def parseMagnitude(m):
@@ -278,13 +382,142 @@ class NumberService(object):
         magString = re.sub(r'(\d)e\+(\d+)',
                            '\g<1> times ten to the \g<2>', magString)
         magString = re.sub(r'-(\d+)', 'negative \g<1>', magString)
-        magString = re.sub(r'\b0(\d+)', '\g<1>', magString)
+        magString = re.sub(r'(?<![.\d])0(\d+)', '\g<1>', magString)
         return magString
 
+    def _scan(self, text):
+        """Splits text into classified tokens for extraction, in one pass.
+
+        Words are delimited by whitespace, and spelled-out words are further
+        split on hyphens. Surrounding punctuation is stripped but ends any
+        number description that spans it.
+
+        Returns:
+            A list of (w, kind, value, role, start, end, index, joined)
+            tuples, where index is the position of the enclosing word in
+            text.split() and joined indicates that the token may continue
+            a description begun by the previous token. Words which cannot
+            appear in a number have kind None.
+        """
+        tokens = []
+        vocabulary = self._vocabulary
+        joined = False
+        for index, m in enumerate(self._wordRegex.finditer(text)):
+            word = m.group()
+            left = len(word) - len(word.lstrip(self._leading))
+            word = word[left:].rstrip(self._trailing)
+            start = m.start() + left
+            end = start + len(word)
+            joined = joined and not left
+
+            w = word.lower()
+            if not w:
+                joined = False
+                continue
+            elif self._literalRegex.match(w):
+                tokens.append((w, _LITERAL, float(w), None,
+                               start, end, index, joined))
+            else:
+                parts = w.split('-')
+                entries = [vocabulary.get(part) for part in parts]
+                if None in entries:
+                    tokens.append((w, None, None, None,
+                                   start, end, index, False))
+                else:
+                    offset = start
+                    for part, entry in zip(parts, entries):
+                        kind, value, role = entry
+                        tokens.append((part, kind, value, role, offset,
+                                       offset + len(part), index, joined))
+                        offset += len(part) + 1
+                        joined = True
+            joined = end == m.end()
+
+        return tokens
+
+    def extractNumbers(self, text):
+        """Extracts every numerical description from a string, in a single
+        left-to-right scan.
+
+        Each description is the longest run of words which can be parsed as
+        a single number. An 'and' only joins two numbers if it follows a
+        'hundred' or a magnitude (e.g., "two thousand and five") or begins
+        a fraction (e.g., "three and a half"), so that "between five and
+        ten" yields two numbers.
+
+        Args:
+            text (str): An arbitrary string, possibly containing several
+                numbers.
+
+        Returns:
+            A list of NumberMatch tuples, in order of appearance, each with
+            the parsed value, the matching text, its [start, end) character
+            offsets and its [tokenStart, tokenEnd) offsets into text.split().
+        """
+        return self._matchNumbers(text, self._scan(text))
+
+    def _matchNumbers(self, text, tokens):
+        """Extracts the numbers described by the tokens of text, as returned
+        by _scan, as in extractNumbers."""
+        matches = []
+
+        def isFractionTail(i):
+            """Whether tokens[i:] describe a fraction, as in "a quarter"."""
+            if i >= len(tokens):
+                return False
+            w, kind, value, role, _, _, _, joined = tokens[i]
+            if not joined or role is not None or \
+                    kind not in (_SMALL, _LITERAL):
+                return False
+            for j in range(i + 1, len(tokens)):
+                w, kind, value, role, _, _, _, joined = tokens[j]
+                if not joined or kind not in (_SMALL, _HUNDRED, _MAGNITUDE):
+                    return False
+                if role is not None:
+                    return True
+            return False
+
+        def emit(first, last, value):
+            start, end = tokens[first][4], tokens[last][5]
+            matches.append(NumberMatch(value, text[start:end], start, end,
+                                       tokens[first][6], tokens[last][6] + 1))
+
+        automaton = None
+        first = last = value = None
+        for i, (w, kind, v, role, _, _, _, joined) in enumerate(tokens):
+            if automaton is not None:
+                # Close the current description if w cannot continue it
+                weak = kind == _AND and \
+                    tokens[i - 1][1] not in (_HUNDRED, _MAGNITUDE) and \
+                    not isFractionTail(i + 1)
+                if joined and kind is not None and not weak and \
+                        automaton.feed(w, kind, v, role):
+                    if automaton.accepting():
+                        last, value = i, automaton.value()
+                    continue
+
+                if last is not None:
+                    emit(first, last, value)
+                automaton = None
+
+            # Otherwise, w may begin a new description
+            if kind is None or kind in (_AND, _POINT) or role == _PLURAL:
+                continue
+            if kind == _LITERAL:
+                emit(i, i, v)
+                continue
+
+            automaton = _NumberAutomaton()
+            automaton.feed(w, kind, v, role)
+            first, last, value = i, i, automaton.value()
+
+        if automaton is not None and last is not None:
+            emit(first, last, value)
+
+        return matches
+
     def longestNumber(self, inp):
         """Extracts the longest valid numerical description from a string.
-        Not guaranteed to return a result even if some valid numerical
-        description exists (i.e., method is not particularly advanced).
 
         Args:
             inp (str): An arbitrary string, hopefully containing a number.
@@ -293,22 +526,194 @@ class NumberService(object):
             The number with the longest string description in input,
             or None if not found.
         """
-        split = inp.split(' ')
-
-        # Assume just a single number
-        numStart = None
-        numEnd = None
-        for i, w in enumerate(split):
-            if self.isValid(w):
-                if numStart is None:
-                    numStart = i
-                numEnd = i
+        longest = self.longestNumberSpan(inp)
+        if longest is None:
+            return None
+        return longest.value
+
+    def longestNumberSpan(self, inp):
+        """Extracts the longest valid numerical description from a string
+        as in longestNumber, along with where in the string it was found.
+
+        Args:
+            inp (str): An arbitrary string, hopefully containing a number.
+
+        Returns:
+            A Match of kind 'number', whose value is that of
+            longestNumber, or None if not found.
+        """
+        longest = None
+        for match in self.extractNumbers(inp):
+            if longest is None or \
+                    match.end - match.start > longest.end - longest.start:
+                longest = match
+
+        if longest is None:
+            return None
+        return Match('number', longest.start, longest.end, longest.text,
+                     longest.value)
+
+
+class _NumberAutomaton(object):
+
+    """The state machine behind NumberService's parsers, fed one classified
+    token at a time.
+
+    The integer value is accumulated as in text2num.py, while the value
+    preceding the latest 'and' is remembered so that a trailing fraction
+    (e.g., "and two fifths") or the digits following a 'point' can be
+    resolved without re-parsing any part of the input. Tokens which cannot
+    continue the description are rejected without raising, so that the
+    automaton can also serve as a recognizer.
+    """
+
+    __slots__ = ('decimals', 'fractions', 'state', 'n', 'g', 'whole',
+                 'numerator', 'dn', 'dg', 'decimal', 'coeff', 'fraction',
+                 'plural', 'literal', 'closed')
+
+    def __init__(self, decimals=True, fractions=True):
+        self.decimals = decimals
+        self.fractions = fractions
+        self.state = _EMPTY
+        self.n = self.g = 0
+        self.whole = 0
+        self.numerator = None
+        self.dn = self.dg = 0
+        self.decimal = 0.0
+        self.coeff = 0.10
+        self.fraction = False
+        self.plural = False
+        self.literal = False
+        self.closed = False
+
+    def feed(self, w, kind, value, role):
+        """Advances the automaton by the token w, classified as
+        (kind, value, role).
+
+        Returns:
+            True if w continues the description, or False if it was
+            rejected, in which case the automaton is left unchanged.
+        """
+        state = self.state
+        if self.closed:
+            return False
+
+        if kind == _AND:
+            if self.literal or state in (_EMPTY, _CONJUNCTION,
+                                         _DECIMAL, _DIGITS):
+                return False
+            self.whole = self.n + self.g
+            self.state = _CONJUNCTION
+        elif kind == _POINT:
+            if not self.decimals or self.literal or state in (
+                    _EMPTY, _CONJUNCTION, _DECIMAL, _DIGITS):
+                return False
+            self.whole = self.n + self.g
+            self.state = _DECIMAL
+        elif state == _DECIMAL or state == _DIGITS:
+            # Each word after 'point' is a single digit
+            if kind not in (_SMALL, _LITERAL) or role == _PLURAL:
+                return False
+            self.decimal += self.coeff * value
+            self.coeff /= 10.0
+            self.state = _DIGITS
+        else:
+            # Digits may only stand alone, follow a 'point', or serve as
+            # the numerator of a fraction
+            if kind == _LITERAL and state != _CONJUNCTION:
+                return False
+
+            # An ordinal following the numerator completes a fraction, and
+            # a plural ordinal may only do so
+            fraction = self.fractions and role is not None and \
+                (state == _NUMERATOR or state == _DENOMINATOR)
+            if role == _PLURAL and not fraction:
+                return False
+
+            # Track a candidate fraction following the latest 'and'
+            if state == _CONJUNCTION:
+                if kind == _SMALL or kind == _LITERAL:
+                    self.numerator = value
+                    self.dn = self.dg = 0
+                    state = _NUMERATOR
+                else:
+                    state = _WHOLE
+            elif state == _NUMERATOR or state == _DENOMINATOR:
+                if kind == _SMALL:
+                    self.dg += value
+                elif kind == _HUNDRED:
+                    self.dg *= 100
+                elif kind == _MAGNITUDE:
+                    self.dn += self.dg * value
+                    self.dg = 0
+                state = _DENOMINATOR
             else:
-                # Check for ordinal, which would signify end
-                w = re.sub(r'(\w+)s(\b)', '\g<1>\g<2>', w)
-                if w in self.__ordinals__:
-                    if self.isValid(' '.join(split[numStart:i + 1])):
-                        numEnd = i
-                        break
-        description = ' '.join(split[numStart:numEnd + 1])
-        return self.parse(description)
+                state = _WHOLE
+
+            self.state = state
+            self.fraction = fraction
+            if role == _PLURAL:
+                self.plural = True
+            if kind == _LITERAL:
+                self.literal = True
+            elif kind == _SMALL:
+                self.g += value
+            elif kind == _HUNDRED:
+                self.g *= 100
+            elif kind == _MAGNITUDE:
+                self.n += self.g * value
+                self.g = 0
+
+        if role is not None:
+            self.closed = True
+        return True
+
+    def accepting(self):
+        """Whether the tokens fed so far form a complete description."""
+        state = self.state
+        if state == _DIGITS:
+            return True
+        if state in (_EMPTY, _CONJUNCTION, _DECIMAL):
+            return False
+        if self.fraction and (self.dn + self.dg):
+            return True
+        return not (self.plural or self.literal)
+
+    def value(self):
+        """The number described by the tokens fed so far, assuming the
+        automaton is accepting."""
+        if self.state == _DIGITS:
+            return self.whole + self.decimal
+        if self.fraction:
+            denominator = self.dn + self.dg
+            if denominator:
+                return self.whole + float(self.numerator) / denominator
+        return self.n + self.g
+
+
+def _buildVocabulary():
+    """Flattens the NumberService tables into a single token lookup, mapping
+    each word to a (kind, value, role) triple."""
+    vocabulary = {'a': (_SMALL, 1, None),
+                  'hundred': (_HUNDRED, 100, None),
+                  'and': (_AND, None, None),
+                  'point': (_POINT, None, None)}
+
+    for w, value in NumberService.__small__.items():
+        vocabulary[w] = (_SMALL, value, None)
+    for w, value in NumberService.__magnitude__.items():
+        vocabulary[w] = (_MAGNITUDE, value, None)
+
+    # Ordinals and fractions end a description, and may be pluralized as the
+    # denominator of a fraction (e.g., "two fifths", "three quarters")
+    denominators = dict(NumberService.__ordinals__)
+    denominators.update(NumberService.__fractions__)
+    for w, cardinal in denominators.items():
+        kind, value, _ = vocabulary[cardinal]
+        vocabulary[w] = (kind, value, _ORDINAL)
+        vocabulary[w + 's'] = (kind, value, _PLURAL)
+
+    return vocabulary
+
+
+NumberService._vocabulary = _buildVocabulary()
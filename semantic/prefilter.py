@@ -0,0 +1,156 @@
+import re
+from .dates import DateService
+from .numbers import NumberService
+from .solver import MathService
+
+
+def _trieRegex(words):
+    """Builds a regular expression matching any of a set of words from a
+    trie of their characters, so that the words sharing a prefix are
+    tried together rather than one after another."""
+    trie = {}
+    for w in words:
+        node = trie
+        for c in w:
+            node = node.setdefault(c, {})
+        node[None] = None
+
+    def build(node):
+        end = None in node
+        branches = [re.escape(c) + build(child)
+                    for c, child in sorted(node.items(), key=lambda item:
+                                           item[0] or '')
+                    if c is not None]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not end:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        if end:
+            pattern += '?'
+        return pattern
+
+    return build(trie)
+
+
+class Prefilter(object):
+
+    """Initialize a Prefilter for cheaply finding the segments of text,
+    e.g., sentences, in which a service may find something.
+
+    Most text describes no numbers or dates, yet each service tokenizes
+    and parses all of it. A Prefilter rejects a segment with a single
+    search by one automaton, compiled from the services' vocabularies,
+    for any of the words without which nothing can be found in it, or
+    for a digit.
+
+    Args:
+        words: The words, in lowercase, of which a segment must contain at
+            least one (or a digit) to be kept.
+
+    Returns:
+        A Prefilter, which counts the segments it has checked and skipped.
+    """
+
+    def __init__(self, words):
+        # Digits are tried first, at the start of each word, as the
+        # automaton only runs quickly over lowercase text
+        self._regex = re.compile(r"\b(?:\d|%ss?\b)" % _trieRegex(
+            set(w.lower() for w in words)))
+        self.checked = 0
+        self.skipped = 0
+
+    # The end of a segment: the end of a sentence, at which every extractor
+    # stops. Descriptions may run across a line break, e.g., "next\nfriday",
+    # so lines aren't segments
+    _segmentRegex = re.compile(r"[.!?;]\s")
+
+    @staticmethod
+    def vocabulary(kinds):
+        """Collects the words without which none of the kinds of
+        Annotator's annotations can be found in a segment, besides digits.
+
+        The article 'a' isn't among them, though NumberService reads it
+        as one, so that, e.g., the quantity "a kilogram" is missed in a
+        segment without any other number.
+
+        Quantities and arithmetic expressions (other than of constants,
+        e.g., "pi times e") need a number, so neither the unit registry
+        nor MathService's operators are needed, which is as well: the
+        registry's symbols include common words, e.g., 'in' and 'a', so a
+        prefilter holding them would keep nearly everything.
+
+        Args:
+            kinds: Annotator.NUMBER, QUANTITY, DATE and MATH, or any of
+                them.
+
+        Returns:
+            A set of lowercase words.
+        """
+        words = set()
+        if set(kinds) & set(['number', 'quantity', 'math', 'date']):
+            # Dates' durations (e.g., "in two hours") need numbers too
+            words.add('hundred')
+            words.update(NumberService.__small__)
+            words.update(NumberService.__magnitude__)
+            words.update(NumberService.__ordinals__)
+            words.update(NumberService.__fractions__)
+        if 'math' in kinds:
+            words.update(w.lower() for w in MathService.__constants__)
+        if 'date' in kinds:
+            words.update(DateService.__months__)
+            words.update(DateService.__shortMonths__)
+            words.update(DateService.__daysOfWeek__)
+            words.update(DateService.__timesOfDay__)
+            for phrase in DateService.__todayMatches__ + \
+                    DateService.__tomorrowMatches__:
+                words.update(phrase.split()[-1:])
+        return words
+
+    def mayMatch(self, text, start=0, end=None):
+        """Checks if text[start:end], in lowercase, holds any of the
+        Prefilter's words or a digit, without counting it as a segment."""
+        if end is None:
+            end = len(text)
+        return self._regex.search(text, start, end) is not None
+
+    def segments(self, text):
+        """Splits text into segments at the ends of its sentences, keeping
+        only those which may hold a description.
+
+        Args:
+            text (str): The text to be split, in lowercase, e.g., as
+                lowercased by Annotator.
+
+        Returns:
+            A list of the [start, end) offsets of the kept segments, in
+            order, with consecutive kept segments merged into one.
+        """
+        if not text:
+            return []
+
+        kept = []
+        start = checked = skipped = 0
+        ends = [m.end() for m in self._segmentRegex.finditer(text)]
+        if not ends or ends[-1] < len(text):
+            ends.append(len(text))
+        for end in ends:
+            checked += 1
+            if not self._regex.search(text, start, end):
+                skipped += 1
+            elif kept and kept[-1][1] == start:
+                kept[-1] = (kept[-1][0], end)
+            else:
+                kept.append((start, end))
+            start = end
+        self.checked += checked
+        self.skipped += skipped
+        return kept
+
+    @property
+    def skippedFraction(self):
+        """The fraction of the segments checked so far which were skipped,
+        or 0 if none have been checked."""
+        if not self.checked:
+            return 0.0
+        return float(self.skipped) / self.checked
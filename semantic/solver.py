@@ -3,11 +3,121 @@ import re
 from math import sqrt, sin, cos, log, tan, acos, asin, atan, e, pi
 from operator import truediv as div
 from operator import add, sub, mul, pow
+from collections import namedtuple
+from .cache import LRUCache
 from .numbers import NumberService
 
+# Kinds of token in an equation
+_NUMBER, _VARIABLE, _UNARY, _BINARY = range(4)
+
+# Nodes of the syntax tree built for an equation: a literal value, a
+# variable bound at evaluation, or an operator applied to the values of its
+# arguments
+_Value = namedtuple('_Value', ['value'])
+_Variable = namedtuple('_Variable', ['name'])
+_Operation = namedtuple('_Operation', ['op', 'args'])
+
+# NumPy ufuncs standing in for each operator when evaluating arrays
+_ufuncs = {
+    log: 'log',
+    sin: 'sin',
+    cos: 'cos',
+    tan: 'tan',
+    asin: 'arcsin',
+    acos: 'arccos',
+    atan: 'arctan',
+    sqrt: 'sqrt',
+    add: 'add',
+    sub: 'subtract',
+    mul: 'multiply',
+    div: 'true_divide',
+    pow: 'power'
+}
+
+
+def _ufuncOps():
+    """Maps each operator to the NumPy ufunc which evaluates it
+    elementwise."""
+    import numpy as np
+    return dict((op, getattr(np, name)) for op, name in _ufuncs.items())
+
+
+class Expression(object):
+
+    """An equation compiled by MathService.compile, which can be evaluated
+    repeatedly without processing its text.
+
+    Calling an Expression binds its variables, in order or by name, and
+    returns the result. If any is bound to an array (or list), the
+    Expression is evaluated elementwise with NumPy ufuncs.
+
+    Attributes:
+        text (str): The equation from which the Expression was compiled.
+        variables (tuple): The names of its variables.
+    """
+
+    __slots__ = ('text', 'variables', '_tree')
+
+    def __init__(self, text, variables, tree):
+        self.text = text
+        self.variables = variables
+        self._tree = tree
+
+    def __call__(self, *args, **kwargs):
+        if len(args) > len(self.variables):
+            raise MathService.MathException(
+                "Expected at most %d values" % len(self.variables))
+
+        bindings = dict(zip(self.variables, args))
+        for name, value in kwargs.items():
+            if name not in self.variables or name in bindings:
+                raise MathService.MathException(
+                    "Unexpected or repeated variable: " + name)
+            bindings[name] = value
+        if len(bindings) != len(self.variables):
+            raise MathService.MathException(
+                "Missing values for: " + ', '.join(
+                    v for v in self.variables if v not in bindings))
+
+        if all(isinstance(v, (int, float)) for v in bindings.values()):
+            return float(MathService._evaluate(self._tree, bindings, None))
+
+        import numpy as np
+        bindings = dict((name, np.asarray(value, dtype=np.float64))
+                        for name, value in bindings.items())
+        return MathService._evaluate(self._tree, bindings, _ufuncOps())
+
+    def __repr__(self):
+        return 'Expression(%r, variables=%r)' % (self.text, self.variables)
+
 
 class MathService(object):
 
+    """Initialize a MathService for solving equations described in text.
+
+    Args:
+        cacheSize: An optional capacity for an LRUCache, available as
+            self.cache, which memoizes the results of parseEquation.
+            Equations are solved from scratch if none is supplied.
+
+    Returns:
+        A MathService which solves equations, using a cache if requested.
+    """
+
+    def __init__(self, cacheSize=None):
+        if cacheSize:
+            self.cache = LRUCache(cacheSize)
+        else:
+            self.cache = None
+
+    class MathException(ValueError):
+
+        def __init__(self, msg):
+            ValueError.__init__(self, msg)
+
+    # Error codes reported by parseEquations
+    SOLVED, UNKNOWN_NUMBER, INVALID_EQUATION, MATH_ERROR = range(4)
+
     __constants__ = {
         'e': e,
         'E': e,
@@ -51,97 +161,199 @@ class MathService(object):
         'to': pow
     }
 
-    @staticmethod
-    def _applyBinary(a, b, op):
-        a = float(a)
-        b = float(b)
-        return op(a, b)
+    # Words rewritten to their canonical forms
+    __rewrites__ = {
+        'a': ['one'],
+        'root': ['sqrt'],
+        'squared': ['to', 'two'],
+        'cubed': ['to', 'three'],
+        'divided': ['divide'],
+        'over': ['divide'],
+        'EE': ['e'],
+        'E': ['e'],
+        'pie': ['pi'],
+        'PI': ['pi']
+    }
 
-    @staticmethod
-    def _applyUnary(a, op):
-        a = float(a)
-        return op(a)
+    # Filler words dropped when they follow the canonical form of another,
+    # e.g., "log of" and "divided by"
+    __followers__ = {
+        'to': 'the',
+        'log': 'of',
+        'sqrt': 'of',
+        'divide': 'by'
+    }
 
-    @staticmethod
-    def _preprocess(inp):
-        """Revise wording to match canonical and expected forms."""
-        inp = re.sub(r'(\b)a(\b)', r'\g<1>one\g<2>', inp)
-        inp = re.sub(r'to the (.*) power', r'to \g<1>', inp)
-        inp = re.sub(r'to the (.*?)(\b)', r'to \g<1>\g<2>', inp)
-        inp = re.sub(r'log of', r'log', inp)
-        inp = re.sub(r'(square )?root( of)?', r'sqrt', inp)
-        inp = re.sub(r'squared', r'to two', inp)
-        inp = re.sub(r'cubed', r'to three', inp)
-        inp = re.sub(r'divided?( by)?', r'divide', inp)
-        inp = re.sub(r'(\b)over(\b)', r'\g<1>divide\g<2>', inp)
-        inp = re.sub(r'(\b)EE(\b)', r'\g<1>e\g<2>', inp)
-        inp = re.sub(r'(\b)E(\b)', r'\g<1>e\g<2>', inp)
-        inp = re.sub(r'(\b)pie(\b)', r'\g<1>pi\g<2>', inp)
-        inp = re.sub(r'(\b)PI(\b)', r'\g<1>pi\g<2>', inp)
-
-        def findImplicitMultiplications(inp):
-            """Replace omitted 'times' references."""
-
-            def findConstantMultiplications(inp):
-                split = inp.split(' ')
-                revision = ""
-
-                converter = NumberService()
-                for i, w in enumerate(split):
-                    if i > 0 and w in MathService.__constants__:
-                        if converter.isValid(split[i - 1]):
-                            revision += " times"
-                    if not revision:
-                        revision = w
-                    else:
-                        revision += " " + w
-
-                return revision
-
-            def findUnaryMultiplications(inp):
-                split = inp.split(' ')
-                revision = ""
-
-                for i, w in enumerate(split):
-                    if i > 0 and w in MathService.__unaryOperators__:
-                        last_op = split[i - 1]
-
-                        binary = last_op in MathService.__binaryOperators__
-                        unary = last_op in MathService.__unaryOperators__
-
-                        if last_op and not (binary or unary):
-                            revision += " times"
-                    if not revision:
-                        revision = w
-                    else:
-                        revision += " " + w
-
-                return revision
-
-            return findUnaryMultiplications(findConstantMultiplications(inp))
-
-        return findImplicitMultiplications(inp)
+    _numbers = NumberService()
+
+    # Binary operators in decreasing order of precedence, each group of which
+    # is evaluated left-to-right
+    __precedence__ = [[pow], [mul, div], [add, sub]]
+
+    _ranks = dict((op, rank) for rank, group in enumerate(__precedence__)
+                  for op in group)
+
+    def _normalize(self, inp, variables=()):
+        """Revises wording to match canonical and expected forms (e.g.,
+        "divided by" to 'divide' and "to the fifth power" to "to fifth"),
+        and inserts the 'times' omitted from implicit multiplications (e.g.,
+        "two pi"), in a single pass over the words of inp.
+
+        Args:
+            inp (str): An equation, specified in words.
+            variables (tuple): Words which are left as they are.
+
+        Returns:
+            A list of the revised words.
+        """
+        words = []
+        isNumber = self._numbers.isValid
+        follower = None
+        power = False
+        for w in inp.split():
+            if w in variables:
+                words.append(w)
+                follower = None
+                continue
+
+            # Drop filler words, e.g., the 'of' in "log of"
+            if w == follower:
+                power = power or w == 'the'
+                follower = None
+                continue
+            follower = None
+
+            # Drop the 'power' closing "to the fifth power"
+            if w == 'power' and power:
+                power = False
+                continue
+
+            for r in self.__rewrites__.get(w, (w,)):
+                if r == 'sqrt' and words and words[-1] == 'square':
+                    words.pop()
+
+                if words:
+                    last = words[-1]
+                    if r in self.__constants__ and isNumber(last):
+                        words.append('times')
+                    elif r in self.__unaryOperators__ and not (
+                            last in self.__binaryOperators__ or
+                            last in self.__unaryOperators__):
+                        words.append('times')
+
+                words.append(r)
+                follower = self.__followers__.get(r)
+
+        return words
+
+    def _tokenize(self, words, variables=()):
+        """Converts the normalized words of an equation into a list of
+        (kind, value) tokens, where consecutive words other than operators
+        and variables form a single number."""
+        tokens = []
+        number = []
+        parse = self._numbers.parse
+
+        def operand(kind, value):
+            # Multiply adjacent operands, e.g., "two x"
+            if tokens and tokens[-1][0] in (_NUMBER, _VARIABLE):
+                tokens.append((_BINARY, mul))
+            tokens.append((kind, value))
+
+        def flush():
+            if number:
+                n = ' '.join(number)
+                if n in self.__constants__:
+                    operand(_NUMBER, self.__constants__[n])
+                else:
+                    operand(_NUMBER, parse(n))
+                del number[:]
+
+        for w in words:
+            if w in variables:
+                flush()
+                operand(_VARIABLE, w)
+            elif w in self.__binaryOperators__:
+                flush()
+                tokens.append((_BINARY, self.__binaryOperators__[w]))
+            elif w in self.__unaryOperators__:
+                flush()
+                tokens.append((_UNARY, self.__unaryOperators__[w]))
+            else:
+                number.append(w)
+        flush()
+
+        return tokens
+
+    def _buildTree(self, tokens):
+        """Builds the syntax tree for a list of tokens with the shunting-yard
+        algorithm. Binary operators bind by __precedence__, while a unary
+        operator applies to the entirety of the equation that follows it."""
+        output = []
+        operators = []
+
+        def reduce():
+            kind, op = operators.pop()
+            arity = 1 if kind == _UNARY else 2
+            if len(output) < arity:
+                raise MathService.MathException("Missing operand")
+            args = tuple(output[-arity:])
+            del output[-arity:]
+            output.append(_Operation(op, args))
+
+        ranks = self._ranks
+        for kind, value in tokens:
+            if kind == _NUMBER:
+                output.append(_Value(float(value)))
+            elif kind == _VARIABLE:
+                output.append(_Variable(value))
+            elif kind == _UNARY:
+                operators.append((kind, value))
+            else:
+                rank = ranks[value]
+                while operators and operators[-1][0] == _BINARY and \
+                        ranks[operators[-1][1]] <= rank:
+                    reduce()
+                operators.append((kind, value))
+
+        while operators:
+            reduce()
+
+        if len(output) != 1:
+            raise MathService.MathException("Missing operator")
+        return output[0]
 
     @staticmethod
-    def _calculate(numbers, symbols):
-        """Calculates a final value given a set of numbers and symbols."""
-        if len(numbers) is 1:
-            return numbers[0]
-
-        precedence = [[pow], [mul, div], [add, sub]]
-
-        # Find most important operation
-        for op_group in precedence:
-            for i, op in enumerate(symbols):
-                if op in op_group:
-                    # Apply operation
-                    a = numbers[i]
-                    b = numbers[i + 1]
-                    result = MathService._applyBinary(a, b, op)
-                    new_numbers = numbers[:i] + [result] + numbers[i + 2:]
-                    new_symbols = symbols[:i] + symbols[i + 1:]
-
-                    return MathService._calculate(new_numbers, new_symbols)
+    def _evaluate(tree, bindings=None, ops=None):
+        """Evaluates a syntax tree, iteratively rather than recursively, so
+        that long equations can't exhaust the stack.
+
+        Args:
+            tree: The root of the syntax tree.
+            bindings (dict): The value of each variable in the tree.
+            ops (dict): Optional replacements for the tree's operators.
+        """
+        values = []
+        push = values.append
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if type(node) is _Value:
+                push(node.value)
+            elif type(node) is _Operation:
+                # Apply the operator once its arguments have been evaluated
+                op = ops.get(node.op, node.op) if ops else node.op
+                stack.append((op, len(node.args)))
+                stack.extend(reversed(node.args))
+            elif type(node) is _Variable:
+                push(bindings[node.name])
+            elif node[1] == 1:
+                push(node[0](values.pop()))
+            else:
+                b = values.pop()
+                push(node[0](values.pop(), b))
+
+        return values[0]
 
     def parseEquation(self, inp):
         """Solves the equation specified by the input string.
@@ -153,60 +365,131 @@ class MathService(object):
         Returns:
             The floating-point result of carrying out the computation.
         """
-        inp = MathService._preprocess(inp)
-        split = inp.split(' ')
-
-        # Recursive call on unary operators
-        for i, w in enumerate(split):
-            if w in self.__unaryOperators__:
-                op = self.__unaryOperators__[w]
-
-                # Split equation into halves
-                eq1 = ' '.join(split[:i])
-                eq2 = ' '.join(split[i + 1:])
-
-                # Calculate second half
-                result = MathService._applyUnary(self.parseEquation(eq2), op)
-
-                return self.parseEquation(eq1 + " " + str(result))
-
-        def extractNumbersAndSymbols(inp):
-            numbers = []
-            symbols = []
+        if self.cache is None:
+            return self._parseEquation(inp)
+
+        # Normalize spacing, which doesn't affect the result
+        key = ' '.join(inp.split())
+        result = self.cache.get(key)
+        if result is None:
+            result = self._parseEquation(inp)
+            self.cache.put(key, result)
+        return result
+
+    def _parseEquation(self, inp):
+        """Solves inp as in parseEquation, bypassing the cache."""
+        tokens = self._tokenize(self._normalize(inp))
+        return MathService._evaluate(self._buildTree(tokens))
+
+    def parseEquations(self, inputs, masked=False):
+        """Solves a sequence of equations into a NumPy array.
+
+        Equations which share a structure (e.g., "X plus Y times Z"),
+        differing only in their numbers, are parsed into a single syntax
+        tree, which is evaluated for the whole group at once with NumPy
+        ufuncs.
 
-            # Divide into values (numbers), operators (symbols)
-            next_number = ""
-            for w in inp.split(' '):
-                if w in self.__binaryOperators__:
-                    symbols.append(self.__binaryOperators__[w])
-
-                    if next_number:
-                        numbers.append(next_number)
-                        next_number = ""
+        Args:
+            inputs (iterable): Equations, as accepted by parseEquation.
+            masked (bool): If True, return a masked array in which entries
+                that failed to solve are masked, rather than NaN.
 
+        Returns:
+            A tuple (values, errors) of equal-length arrays. values is a
+            float64 array of the solutions, holding NaN (or masked) for
+            equations that failed to solve. errors is an int8 array holding
+            MathService.SOLVED for successes, UNKNOWN_NUMBER for equations
+            containing words which are neither numbers nor operators,
+            INVALID_EQUATION for malformed equations (or inputs which
+            aren't strings), and MATH_ERROR for equations without a finite
+            solution (e.g., division by zero).
+        """
+        import numpy as np
+
+        inputs = list(inputs)
+        values = np.full(len(inputs), np.nan)
+        errors = np.zeros(len(inputs), dtype=np.int8)
+
+        # Group equations by their tokens, with numbers left as placeholders
+        groups = {}
+        for k, inp in enumerate(inputs):
+            try:
+                tokens = self._tokenize(self._normalize(inp))
+            except NumberService.NumberException:
+                errors[k] = MathService.UNKNOWN_NUMBER
+                continue
+            except Exception:
+                errors[k] = MathService.INVALID_EQUATION
+                continue
+
+            skeleton = tuple((kind, None if kind == _NUMBER else value)
+                             for kind, value in tokens)
+            numbers = [float(value) for kind, value in tokens
+                       if kind == _NUMBER]
+            positions, rows = groups.setdefault(skeleton, ([], []))
+            positions.append(k)
+            rows.append(numbers)
+
+        ops = _ufuncOps()
+        for skeleton, (positions, rows) in groups.items():
+            # Bind the i-th number of each equation to the variable i
+            template = []
+            count = 0
+            for kind, value in skeleton:
+                if kind == _NUMBER:
+                    template.append((_VARIABLE, count))
+                    count += 1
                 else:
-                    if next_number:
-                        next_number += " "
-                    next_number += w
-
-            if next_number:
-                numbers.append(next_number)
-
-            # Cast numbers from words to integers
-            def convert(n):
-                if n in self.__constants__:
-                    return self.__constants__[n]
+                    template.append((kind, value))
+
+            try:
+                tree = self._buildTree(template)
+            except MathService.MathException:
+                errors[positions] = MathService.INVALID_EQUATION
+                continue
+
+            columns = np.array(rows, dtype=np.float64).reshape(
+                len(rows), count)
+            bindings = dict((i, columns[:, i]) for i in range(count))
+            with np.errstate(all='ignore'):
+                result = MathService._evaluate(tree, bindings, ops)
+            values[positions] = result
+
+        unsolved = (errors == MathService.SOLVED) & ~np.isfinite(values)
+        errors[unsolved] = MathService.MATH_ERROR
+        values[errors != MathService.SOLVED] = np.nan
+
+        if masked:
+            values = np.ma.masked_array(values,
+                                        mask=errors != MathService.SOLVED)
+        return values, errors
+
+    def compile(self, inp, variables=None):
+        """Compiles the equation specified by the input string, so that it
+        can be evaluated repeatedly, or for different values of its
+        variables, without processing its text again.
 
-                converter = NumberService()
-                return converter.parse(n)
-
-            numbers = [convert(n) for n in numbers]
-
-            return numbers, symbols
-
-        numbers, symbols = extractNumbersAndSymbols(inp)
+        Args:
+            inp (str): An equation, specified in words, containing some
+                combination of numbers, variables, binary, and unary
+                operations.
+            variables (list): The names of the variables in the equation,
+                in the order in which the Expression accepts their values.
 
-        return MathService._calculate(numbers, symbols)
+        Returns:
+            A callable Expression, which returns the floating-point (or,
+            for arrays, elementwise) result of carrying out the computation.
+        """
+        variables = tuple(variables or ())
+        vocabulary = (self.__constants__, self.__unaryOperators__,
+                      self.__binaryOperators__)
+        for v in variables:
+            if any(v in words for words in vocabulary) or \
+                    self._numbers.isValid(v) or not re.match(r'\w+$', v):
+                raise MathService.MathException("Invalid variable: " + v)
+
+        tokens = self._tokenize(self._normalize(inp, variables), variables)
+        return Expression(inp, variables, self._buildTree(tokens))
 
 
 def parseEquation(self, inp):
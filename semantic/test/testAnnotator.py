@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import datetime
+import os
+import tempfile
+import unittest
+from semantic.annotator import Annotator, Annotation
+from semantic.dates import DateService
+from semantic.numbers import NumberService
+
+
+class TestAnnotator(unittest.TestCase):
+
+    now = datetime.datetime(2014, 1, 1, 12, 0)
+
+    def annotate(self, inp, kinds=None):
+        return Annotator(kinds=kinds, now=self.now).annotate(inp)
+
+    def compareAnnotations(self, inp, target, kinds=None):
+        result = [(a.kind, a.text, a.value)
+                  for a in self.annotate(inp, kinds)]
+        self.assertEqual(result, target)
+
+    def testNumbers(self):
+        inp = "Eighty-six people came, and 3.5 of them stayed."
+        self.compareAnnotations(inp, [
+            (Annotator.NUMBER, "Eighty-six", 86),
+            (Annotator.NUMBER, "3.5", 3.5)
+        ])
+
+    def testQuantities(self):
+        inp = "I ran five kilometers at 3.5 miles per hour."
+        result = self.annotate(inp)
+        self.assertEqual([(a.kind, a.text) for a in result], [
+            (Annotator.QUANTITY, "five kilometers"),
+            (Annotator.QUANTITY, "3.5 miles per hour")
+        ])
+        self.assertEqual(result[0].value.magnitude, 5)
+        self.assertEqual(str(result[1].value.dimensionality), "mi/h")
+
+    def testAmbiguousUnits(self):
+        inp = "Call me at 5 pm, or 6 in the evening."
+        self.assertNotIn(Annotator.QUANTITY,
+                         [a.kind for a in self.annotate(inp)])
+
+    def testMath(self):
+        inp = "Is two times three plus four equal to ten? The square " \
+            "root of sixteen is two to the power two."
+        self.compareAnnotations(inp, [
+            (Annotator.MATH, "two times three plus four", 10),
+            (Annotator.NUMBER, "ten", 10),
+            (Annotator.MATH, "square root of sixteen", 4),
+            (Annotator.MATH, "two to the power two", 4)
+        ], kinds=[Annotator.NUMBER, Annotator.MATH])
+
+    def testRangeIsNotMath(self):
+        inp = "It rose from 5 to 10."
+        self.compareAnnotations(inp, [
+            (Annotator.NUMBER, "5", 5),
+            (Annotator.NUMBER, "10", 10)
+        ])
+
+    def testDates(self):
+        inp = "Meet me tomorrow at 5:30pm; the report is due June 9."
+        service = DateService(now=self.now)
+        self.compareAnnotations(inp, [
+            (Annotator.DATE, "tomorrow at 5:30pm",
+             service.extractDate("tomorrow at 5:30pm")),
+            (Annotator.DATE, "June 9", service.extractDate("June 9"))
+        ], kinds=[Annotator.DATE])
+
+    def testQuantityWithinDate(self):
+        inp = "We ship three weeks from Friday at 5:30pm"
+        service = DateService(now=self.now)
+        self.compareAnnotations(inp, [
+            (Annotator.DATE, "three weeks from Friday at 5:30pm",
+             service.extractDate(inp))
+        ])
+
+    def testKinds(self):
+        inp = "Add 5 km to two times three next week."
+        result = self.annotate(inp, kinds=[Annotator.NUMBER])
+        self.assertEqual([a.text for a in result], ["5", "two", "three"])
+
+    def testSpans(self):
+        inp = "It's ÆON, İstanbul: twenty-two kilograms on March 3rd."
+        for annotation in self.annotate(inp):
+            self.assertIsInstance(annotation, Annotation)
+            self.assertEqual(inp[annotation.start:annotation.end],
+                             annotation.text)
+
+    def testMatchesServices(self):
+        inp = "hey, can we meet tomorrow at 5:30pm? I'm in the office " \
+            "until the evening, or in two hours and twenty minutes."
+        result = self.annotate(inp, kinds=[Annotator.NUMBER])
+        numbers = NumberService().extractNumbers(inp)
+        self.assertEqual([(a.start, a.end, a.value) for a in result],
+                         [(n.start, n.end, n.value) for n in numbers])
+
+        result = self.annotate(inp, kinds=[Annotator.DATE])
+        dates = DateService(now=self.now).extractDates(inp)
+        self.assertEqual([a.value for a in result], dates)
+
+    def testPerCallNow(self):
+        annotator = Annotator(kinds=[Annotator.DATE], now=self.now)
+        now = datetime.datetime(2015, 6, 1, 12, 0)
+        result = annotator.annotate("tomorrow", now=now)
+        self.assertEqual(result[0].value.date(), datetime.date(2015, 6, 2))
+
+    def testPrefilter(self):
+        inp = "The team met in the office. Add 5 km to two times three " \
+            "next week.\nNothing else happened; a dog barked! It rained " \
+            "tomorrow at 5:30pm, for twenty-two minutes."
+        annotator = Annotator(now=self.now)
+        prefiltered = Annotator(now=self.now, prefilter=True)
+        self.assertEqual(prefiltered.annotate(inp), annotator.annotate(inp))
+        self.assertEqual(prefiltered.prefilter.checked, 5)
+        self.assertEqual(prefiltered.prefilter.skipped, 3)
+
+    def testPrefilterAcrossLines(self):
+        # Descriptions which run across a line break, beside a skipped
+        # sentence
+        inp = "Nobody came. See you next\nFriday. The dog barked; it is " \
+            "two\nsquared."
+        annotator = Annotator(now=self.now)
+        prefiltered = Annotator(now=self.now, prefilter=True)
+        result = prefiltered.annotate(inp)
+        self.assertEqual(result, annotator.annotate(inp))
+        self.assertEqual([(a.kind, a.text) for a in result],
+                         [(Annotator.DATE, "next\nFriday"),
+                          (Annotator.MATH, "two\nsquared")])
+        self.assertEqual(prefiltered.prefilter.skipped, 2)
+
+    def testArticleIsNotNumber(self):
+        inp = "A dog saw a hundred cats"
+        self.compareAnnotations(inp, [(Annotator.NUMBER, "a hundred", 100)],
+                                kinds=[Annotator.NUMBER])
+
+    def annotateFile(self, content, **kwargs):
+        with tempfile.NamedTemporaryFile('wb', delete=False) as f:
+            f.write(content)
+        try:
+            annotator = Annotator(kinds=[Annotator.NUMBER, Annotator.DATE],
+                                  now=self.now)
+            return list(annotator.annotateFile(f.name, **kwargs))
+        finally:
+            os.unlink(f.name)
+
+    def testAnnotateFile(self):
+        lines = ["Meet tomorrow at 5:30pm with twenty-two people.",
+                 "Café déjà vu: June 9 works, ÆON ships 3.5 tonnes.",
+                 "nothing to see here",
+                 "İstanbul in two hours and 42 minutes; next friday."] * 20
+        content = "\n".join(lines).encode('utf-8')
+        annotator = Annotator(kinds=[Annotator.NUMBER, Annotator.DATE],
+                              now=self.now)
+        expected = [(a.kind, a.text, a.value) for line in lines
+                    for a in annotator.annotate(line)]
+
+        for windowSize in (64, 1000, 1 << 20):
+            result = self.annotateFile(content, windowSize=windowSize)
+            self.assertEqual([(a.kind, a.text, a.value) for a in result],
+                             expected)
+            for a in result:
+                self.assertEqual(content[a.start:a.end].decode('utf-8'),
+                                 a.text)
+
+    def testAnnotateFileAcrossLines(self):
+        # Descriptions which run across a line break, which may fall at
+        # the end of a window longer than a sentence
+        content = b"Meet me next\nfriday at 5pm. Nothing here; it is " \
+            b"two\nsquared. See you in two\nhours.\n" * 10
+        annotator = Annotator(kinds=[Annotator.NUMBER, Annotator.DATE],
+                              now=self.now)
+        expected = annotator.annotate(content.decode('utf-8'))
+        for windowSize in range(30, 200, 7):
+            self.assertEqual(self.annotateFile(content,
+                                               windowSize=windowSize),
+                             expected)
+
+    def testAnnotateFileWithoutLines(self):
+        content = b"at 5:30pm, " * 100
+        result = self.annotateFile(content, windowSize=50)
+        self.assertEqual(len(result), 100)
+        self.assertEqual(set(content[a.start:a.end] for a in result),
+                         set([b"5:30pm"]))
+
+    def testAnnotateFileWithLongWords(self):
+        result = self.annotateFile(b"see you tomorrow", windowSize=4)
+        self.assertEqual([(a.kind, a.text) for a in result],
+                         [(Annotator.DATE, "tomorrow")])
+
+        # Windows shorter than a word, and its characters
+        content = "Überschönheitswettbewerbe: 42".encode('utf-8')
+        for windowSize in range(1, len(content)):
+            result = self.annotateFile(content, windowSize=windowSize)
+            self.assertEqual([(a.kind, a.text, a.value) for a in result],
+                             [(Annotator.NUMBER, "42", 42)])
+            self.assertEqual(content[result[0].start:result[0].end], b"42")
+
+    def testAnnotateEmptyFile(self):
+        self.assertEqual(self.annotateFile(b""), [])
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestAnnotator)
+    unittest.TextTestRunner(verbosity=2).run(suite)
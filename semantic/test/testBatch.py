@@ -0,0 +1,49 @@
+import datetime
+import unittest
+from semantic import batch
+from semantic.dates import DateService
+from semantic.solver import MathService
+from semantic.units import ConversionService
+
+
+class TestBatch(unittest.TestCase):
+
+    def testDatesInOrder(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0)
+        inputs = ["tomorrow", "in %d hours" % 3, "next friday at 5:30pm",
+                  "nothing", "June 9"] * 5
+        results = list(batch.extractDates(inputs, now=now, workers=2,
+                                          chunkSize=3))
+        service = DateService(now=now)
+        self.assertEqual(results, [service.extractDates(inp)
+                                   for inp in inputs])
+
+    def testFailures(self):
+        inputs = ["fifty kilograms to pounds", "kilograms to pounds",
+                  "two meters to feet"]
+        results = list(batch.convert(inputs, workers=2, chunkSize=1))
+        self.assertAlmostEqual(float(results[0].magnitude), 110.231, 3)
+        self.assertIsInstance(results[1], batch.Failure)
+        self.assertEqual(results[1].input, "kilograms to pounds")
+        self.assertIsInstance(results[1].error,
+                              ConversionService.ConversionException)
+        self.assertEqual(str(results[2].units), "1.0 ft")
+
+    def testEquations(self):
+        inputs = ["%d times three" % i for i in range(50)] + ["times"]
+        results = list(batch.parseEquation(iter(inputs), workers=2,
+                                           chunkSize=7))
+        self.assertEqual(results[:50], [3.0 * i for i in range(50)])
+        self.assertIsInstance(results[50], batch.Failure)
+
+    def testEmpty(self):
+        self.assertEqual(list(batch.parseEquation([], workers=2)), [])
+
+    def testChunkSize(self):
+        self.assertRaises(ValueError, batch.run, MathService,
+                          'parseEquation', [], chunkSize=0)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestBatch)
+    unittest.TextTestRunner(verbosity=2).run(suite)
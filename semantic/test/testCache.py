@@ -0,0 +1,83 @@
+import threading
+import unittest
+from semantic.cache import LRUCache
+from semantic.numbers import NumberService
+from semantic.solver import MathService
+from semantic.units import ConversionService
+
+
+class TestCache(unittest.TestCase):
+
+    def testEviction(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+
+        # 'b' is now the least recently used entry
+        cache.put('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {
+            'size': 2, 'capacity': 2, 'hits': 2, 'misses': 1,
+            'evictions': 1})
+
+    def testInvalidate(self):
+        cache = LRUCache(4)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.invalidate('a')
+        self.assertFalse('a' in cache)
+        self.assertTrue('b' in cache)
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def testThreadSafety(self):
+        cache = LRUCache(16)
+
+        def work(offset):
+            for i in range(2000):
+                cache.put(offset + i % 32, i)
+                cache.get(offset + i % 64)
+
+        threads = [threading.Thread(target=work, args=(k * 100,))
+                   for k in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.stats()
+        self.assertEqual(stats['size'], 16)
+        self.assertEqual(stats['hits'] + stats['misses'], 8 * 2000)
+
+    #
+    # Service tests
+    #
+
+    def testNumberCache(self):
+        service = NumberService(cacheSize=8)
+        self.assertEqual(service.parse("One  hundred"), 100)
+        self.assertEqual(service.parse("one hundred"), 100)
+        self.assertEqual(service.cache.hits, 1)
+        self.assertEqual(service.cache.misses, 1)
+        self.assertEqual(NumberService().cache, None)
+
+    def testMathCache(self):
+        service = MathService(cacheSize=8)
+        service.parseEquation("two plus two")
+        self.assertEqual(service.parseEquation("two  plus two"), 4)
+        self.assertEqual(service.cache.stats()['size'], 1)
+        self.assertEqual(service.cache.hits, 1)
+
+    def testUnitCache(self):
+        service = ConversionService(cacheSize=8)
+        self.assertTrue(service.isValidUnit('kilometers'))
+        self.assertFalse(service.isValidUnit('eggs'))
+        self.assertFalse(service.isValidUnit('eggs'))
+        self.assertEqual(service.cache.hits, 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestCache)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import unittest
 import quantities as pq
 from semantic.units import ConversionService
@@ -48,6 +50,24 @@ class TestConversion(unittest.TestCase):
         units = service.extractUnits(inp)
         self.assertEqual(units, ['pounds', 'inches / foot^2'])
 
+    def testExtractionSpans(self):
+        inp = "I want three pounds of eggs and two inches per squared foot"
+        service = ConversionService()
+        units = service.extractUnitSpans(inp)
+        self.assertEqual([(m.kind, m.text, m.value) for m in units], [
+            ('unit', "pounds", 'pounds'),
+            ('unit', "inches per squared foot", 'inches / foot^2')
+        ])
+        for m in units:
+            self.assertEqual(inp[m.start:m.end], m.text)
+
+    def testNumberEndingInUnit(self):
+        service = ConversionService()
+        result = service.convert("one second to milliseconds")
+        self.assertAlmostEqual(float(result.magnitude), 1000.0)
+        parsed = service.parseConversion("one second to milliseconds")
+        self.assertEqual(parsed.magnitudeSpan, (0, 3))
+
     def testExponentiation(self):
         service = ConversionService()
         inp = "I want two squared meters"
@@ -78,6 +98,98 @@ class TestConversion(unittest.TestCase):
         units = service.extractUnits(inp)
         self.assertEqual(units, ['meters^5'])
 
+    def testMultiWordUnits(self):
+        service = ConversionService()
+        inp = "Pour two US fluid ounces into ten acre feet"
+        units = service.extractUnits(inp)
+        self.assertEqual(units, ['US_fluid_ounces', 'acre_feet'])
+
+        inp = "two fluid ounces to milliliters"
+        target = pq.Quantity(2.0, "fluid_ounce")
+        target.units = "mL"
+        self.compareConversion(inp, target)
+
+    def testValidUnit(self):
+        service = ConversionService()
+        for w in ['kg', 'meters', 'in', 'meters^2', 'kg/m**2', '/']:
+            self.assertTrue(service.isValidUnit(w))
+        for w in ['eggs', 'a', 'point', 'meters^', 'pi']:
+            self.assertFalse(service.isValidUnit(w))
+
+    def testTemperature(self):
+        service = ConversionService()
+        result = service.convert("ten celsius to fahrenheit")
+        self.assertAlmostEqual(result.magnitude, 50.0)
+        self.assertEqual(result.units, pq.degF)
+
+        result = service.convert("two hundred and twelve fahrenheit to kelvin")
+        self.assertAlmostEqual(result.magnitude, 373.15)
+
+    def testIncompatible(self):
+        service = ConversionService()
+        inp = "five kilograms to meters"
+        for _ in range(2):
+            self.assertRaises(ConversionService.ConversionException,
+                              lambda: service.convert(inp))
+        self.assertEqual(service.plans.hits, 1)
+
+    def testPlanCache(self):
+        service = ConversionService()
+        service.convert("55.12 kilograms to pounds")
+        result = service.convert("twelve kilograms to pounds")
+        target = pq.Quantity(12.0, "kg")
+        target.units = "pounds"
+        self.assertEqual(result.magnitude, target.magnitude)
+        self.assertEqual(service.plans.stats()['size'], 1)
+        self.assertEqual(service.plans.hits, 1)
+
+    def testParsedConversion(self):
+        inp = "three hundred square feet to square meters"
+        parsed = ConversionService().parseConversion(inp)
+        self.assertEqual(parsed.magnitude, 300.0)
+        start, end = parsed.magnitudeSpan
+        self.assertEqual(inp[start:end], "three hundred")
+        self.assertEqual(parsed.source, "feet^2")
+        self.assertEqual(parsed.target, "meters^2")
+        self.assertEqual(parsed.exponents, [('feet', 2), ('meters', 2)])
+
+    def testOrdinalExponent(self):
+        inp = "two meters to the third power per second"
+        parsed = ConversionService().parseConversion(inp)
+        self.assertEqual(parsed.magnitude, 2.0)
+        self.assertEqual(parsed.units, ['meters^3 / second'])
+
+    def testReuseParsed(self):
+        service = ConversionService()
+        parsed = service.parseConversion("five miles to kilometers")
+        self.assertEqual(service.extractUnits(parsed),
+                         ['miles', 'kilometers'])
+        for units in ("kilometers", "feet", "yards"):
+            target = pq.Quantity(5.0, "miles")
+            target.units = units
+            result = service.convert(parsed, units)
+            self.assertAlmostEqual(result.magnitude, target.magnitude)
+        self.assertEqual(service.parseUnits(parsed), "8.05 km")
+
+    def testMissingUnits(self):
+        service = ConversionService()
+        self.assertRaises(ConversionService.ConversionException,
+                          lambda: service.convert("five kilograms"))
+        self.assertRaises(ConversionService.ConversionException,
+                          lambda: service.convert("kilograms to pounds"))
+
+    def testLazyImport(self):
+        # Run in a fresh interpreter, as this one has loaded quantities
+        script = "import sys\n" \
+            "from semantic import NumberService, DateService\n" \
+            "import semantic.units\n" \
+            "NumberService().parse('seven')\n" \
+            "print('quantities' in sys.modules)\n" \
+            "semantic.units.ConversionService()\n" \
+            "print('quantities' in sys.modules)\n"
+        output = subprocess.check_output([sys.executable, '-c', script])
+        self.assertEqual(output.decode().split(), ['False', 'True'])
+
     def testComplex(self):
         inp = "Seven and a half pounds per square ft to kg per meter squared"
         target = pq.Quantity(7.5, "lb/ft**2")
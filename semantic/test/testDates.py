@@ -1,5 +1,11 @@
 import datetime
 import unittest
+import numpy
+try:
+    import pytz
+except ImportError:
+    pytz = None
+from multiprocessing.pool import ThreadPool
 from semantic.dates import DateService
 
 
@@ -140,6 +146,298 @@ class TestDate(unittest.TestCase):
         self.compareDates(inp, targets)
         self.compareTimes(inp, targets)
 
+    def testPairNearestTime(self):
+        service = DateService()
+        inp = "Tomorrow, I'll schedule the meeting for June 9 at 1:30pm"
+        tomorrow, june = service.extractDates(inp)
+        self.assertEqual((june.month, june.day, june.hour, june.minute),
+                         (6, 9, 13, 30))
+        self.assertEqual(tomorrow.date(),
+                         (service.now + datetime.timedelta(days=1)).date())
+
+        inp = "Dinner on June 9 or June 10 at 7:30pm"
+        first, second = service.extractDates(inp)
+        self.assertEqual((first.day, first.hour), (9, service.now.hour))
+        self.assertEqual((second.day, second.hour), (10, 19))
+
+    def testPairWithinSentence(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0)
+        service = DateService(now=now)
+        inp = "Let's meet on Friday. At 5:30 I'm busy"
+        self.assertEqual(service.extractDates(inp),
+                         [datetime.datetime(2014, 1, 3, 12, 0),
+                          datetime.datetime(2014, 1, 1, 5, 30)])
+
+    def testRelativeTimeUnpaired(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0)
+        service = DateService(now=now)
+        self.assertEqual(service.extractDates("tomorrow, in two hours"),
+                         [datetime.datetime(2014, 1, 2, 12, 0),
+                          datetime.datetime(2014, 1, 1, 14, 0)])
+
+    #
+    # Scanner tests
+    #
+
+    def testOrdinalSuffix(self):
+        inp = "Remind me on Dec 1st"
+        target = datetime.datetime(datetime.datetime.now().year, 12, 1)
+        self.compareDate(inp, target)
+
+    def testNoFalseMonths(self):
+        service = DateService()
+        self.assertEqual(service.extractDays("I may be late"), [])
+        self.assertEqual(service.extractDays("the grammar 5 class"), [])
+
+    def testUnparseableDuration(self):
+        inp = "I'll be in the office for 2 hours"
+        self.assertEqual(DateService().extractTimes(inp), [])
+
+    def testSpans(self):
+        service = DateService()
+        inp = "Tomorrow, meet at 12:30 pm or in two hours and five minutes"
+        days = service._scanDays(service._preprocess(inp))
+        times = service._scanTimes(service._preprocess(inp))
+        self.assertEqual([inp[d.start:d.end] for d in days], ["Tomorrow"])
+        self.assertEqual([inp[t.start:t.end] for t in times],
+                         ["12:30 pm", "in two hours and five minutes"])
+
+    def testPunctuationEndsDescription(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0)
+        service = DateService(now=now)
+        self.assertEqual(service.extractDates(
+            "We met in June. 9 people came."), [])
+        self.assertEqual(service.extractDates("Due June, 9 days later"), [])
+        self.assertEqual(service.extractDates(
+            "I fly in. Two hours later we land"), [])
+        self.assertEqual(service.extractDates(
+            "I will do it next. Friday works."),
+            [datetime.datetime(2014, 1, 3, 12, 0)])
+
+    def testRepeatedDaysFrom(self):
+        service = DateService()
+        inp = "two weeks from January 5 and three weeks from January 5"
+        first, second = service.extractDays(inp)
+        self.assertEqual(first.day, 19)
+        self.assertEqual(second.day, 26)
+
+    def testDaysFromWithoutNumber(self):
+        inp = "weeks from January 5"
+        target = datetime.datetime(datetime.datetime.now().year, 1, 12)
+        self.compareDate(inp, target)
+
+    def testAdversarialInput(self):
+        # Takes minutes with backtracking regular expressions
+        service = DateService()
+        self.assertEqual(service.extractTimes("in " * 20000), [])
+        self.assertEqual(service.extractTimes("in " + "one " * 20000), [])
+
+    #
+    # Reference time tests
+    #
+
+    def testPerCallNow(self):
+        service = DateService(now=datetime.datetime(2014, 1, 1, 12, 0))
+        now = datetime.datetime(2015, 6, 1, 9, 0)
+        self.assertEqual(service.extractDate("tomorrow", now=now),
+                         datetime.datetime(2015, 6, 2, 9, 0))
+        self.assertEqual(service.extractDate("tomorrow"),
+                         datetime.datetime(2014, 1, 2, 12, 0))
+        self.assertEqual(service.convertDay(now, now=now), "today")
+
+    def testCurrentNow(self):
+        # Without a fixed time, each call is relative to the time it's made
+        service = DateService()
+        before = datetime.datetime.now()
+        result = service.extractTime("in five minutes")
+        self.assertTrue(before + datetime.timedelta(minutes=5) <= result)
+
+    @unittest.skipIf(pytz is None, "requires pytz")
+    def testPerCallTimezone(self):
+        utc = pytz.utc
+        tokyo = pytz.FixedOffset(9 * 60)
+        now = datetime.datetime(2014, 1, 1, 20, 0, tzinfo=utc)
+        service = DateService(now=now)
+        self.assertEqual(service.extractDay("today", tz=tokyo).day, 2)
+        self.assertEqual(service.extractDay("today").day, 1)
+
+    def testExtractDay(self):
+        service = DateService(now=datetime.datetime(2014, 1, 1, 12, 0))
+        self.assertEqual(service.extractDay("Remind me on Dec 1st"),
+                         datetime.datetime(2014, 12, 1, 12, 0))
+        self.assertEqual(service.extractDay("nothing to see"), None)
+
+    def testSharedAcrossThreads(self):
+        service = DateService()
+        inp = "June 9 at 1:30pm, then three weeks from next friday"
+
+        def extract(day):
+            now = datetime.datetime(2014, 1, day, 12, 0)
+            return service.extractDates(inp, now=now)
+
+        pool = ThreadPool(8)
+        try:
+            results = pool.map(extract, list(range(1, 29)) * 10)
+        finally:
+            pool.close()
+        self.assertEqual(results, [extract(day) for day in range(1, 29)] * 10)
+
+    @unittest.skipIf(pytz is None, "requires pytz")
+    def testLocalNow(self):
+        # Across the start and end of daylight saving time in New York
+        service = DateService()
+        tz = pytz.timezone('America/New_York')
+        for day in (datetime.datetime(2014, 3, 8, 12, 0),
+                    datetime.datetime(2014, 11, 1, 12, 0)):
+            start = (day - datetime.datetime(1970, 1, 1)).total_seconds()
+            for hours in range(0, 60, 3):
+                t = start + hours * 3600 + 0.25
+                expected = datetime.datetime.fromtimestamp(t, tz)
+                result = service._localNow(tz, t)
+                self.assertEqual(result, expected)
+                self.assertEqual(result.utcoffset(), expected.utcoffset())
+
+    @unittest.skipIf(pytz is None, "requires pytz")
+    def testLocalDayRollover(self):
+        service = DateService()
+        tz = pytz.FixedOffset(5 * 60 + 30)
+        t = (datetime.datetime(2014, 1, 1, 18, 29) -
+             datetime.datetime(1970, 1, 1)).total_seconds()
+        self.assertEqual(service._localNow(tz, t).day, 1)
+        day = service._localDays[tz]
+        self.assertEqual(service._localNow(tz, t + 59).day, 1)
+        self.assertTrue(service._localDays[tz] is day)
+        self.assertEqual(service._localNow(tz, t + 60).day, 2)
+        self.assertFalse(service._localDays[tz] is day)
+
+    #
+    # Stream tests
+    #
+
+    def testStream(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0)
+        service = DateService(now=now)
+        inp = "Tomorrow, I'll schedule the meeting for June 9 at 1:30pm. " \
+            "Or in two hours and twenty minutes; next friday works too"
+        for size in (1, 3, 10):
+            stream = service.stream()
+            for i in range(0, len(inp), size):
+                stream.feed(inp[i:i + size])
+            stream.close()
+            self.assertEqual(stream.dates, service.extractDates(inp))
+            self.assertEqual([inp[s:e] for s, e, _ in stream.matches],
+                             ["Tomorrow", "June 9 at 1:30pm",
+                              "in two hours and twenty minutes",
+                              "next friday"])
+
+    def testStreamEvents(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0)
+        stream = DateService().stream(now=now)
+        self.assertEqual(stream.feed("See you June 1"),
+                         ([(8, 14, now.replace(month=6))], [], []))
+        june10 = datetime.datetime(2014, 6, 10, 5, 30)
+        self.assertEqual(stream.feed("0 at 5:30"),
+                         ([], [(8, 23, june10)], []))
+        self.assertEqual(stream.feed("pm"),
+                         ([], [(8, 25, june10.replace(hour=17))], []))
+        self.assertEqual(stream.feed("3"), ([], [(8, 23, june10)], []))
+        self.assertEqual(stream.close(), ([], [], []))
+
+        stream = DateService().stream(now=now)
+        june1 = datetime.datetime(2014, 6, 1, 12, 0)
+        self.assertEqual(stream.feed("Due June 1"),
+                         ([(4, 10, june1)], [], []))
+        self.assertEqual(stream.feed("x"), ([], [], [(4, 10, june1)]))
+        self.assertEqual(stream.dates, [])
+
+    #
+    # Span tests
+    #
+
+    def testExtractSpans(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0)
+        service = DateService(now=now)
+        inp = "Meet me Next Friday at 5:30pm, or in two hours; June 9 works."
+
+        days = service.extractDaySpans(inp)
+        self.assertEqual([(m.kind, m.text) for m in days],
+                         [('day', "Next Friday"), ('day', "June 9")])
+        self.assertEqual([m.value for m in days], service.extractDays(inp))
+
+        times = service.extractTimeSpans(inp)
+        self.assertEqual([m.text for m in times], ["5:30pm", "in two hours"])
+        self.assertEqual([m.value for m in times], service.extractTimes(inp))
+
+        dates = service.extractDateSpans(inp)
+        self.assertEqual([m.text for m in dates],
+                         ["Next Friday at 5:30pm", "in two hours", "June 9"])
+        self.assertEqual([m.value for m in dates], service.extractDates(inp))
+        for m in days + times + dates:
+            self.assertEqual(inp[m.start:m.end], m.text)
+
+    def testExtractSpansWithDaysFrom(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0)
+        service = DateService(now=now)
+        inp = "We ship three weeks from Friday at 5:30pm"
+        self.assertEqual([m.text for m in service.extractDaySpans(inp)],
+                         ["three weeks from Friday"])
+        self.assertEqual([m.text for m in service.extractDateSpans(inp)],
+                         ["three weeks from Friday at 5:30pm"])
+
+        inp = "Call twenty one days from today"
+        dates = service.extractDateSpans(inp)
+        self.assertEqual([m.text for m in dates],
+                         ["twenty one days from today"])
+        self.assertEqual([m.value for m in dates], service.extractDates(inp))
+
+    #
+    # Date array tests
+    #
+
+    def testDateArray(self):
+        service = DateService()
+        inputs = ["tomorrow", "in 3 hours", "next friday", "June 9 at 1:30pm",
+                  "three weeks from monday evening", "at 12:51pm tomorrow",
+                  "Tomorrow, meet me on June 9 at 1:30pm", "nothing"] * 3
+        now = [datetime.datetime(2014, 1, 1, 12, 0) +
+               datetime.timedelta(days=97 * i, seconds=3607 * i)
+               for i in range(len(inputs))]
+        results = service.extractDateArray(
+            inputs, numpy.array(now, dtype='datetime64[s]'))
+
+        for inp, t, result in zip(inputs, now, results):
+            expected = service.extractDate(inp, now=t)
+            if expected is None:
+                self.assertEqual(str(result), 'NaT')
+            else:
+                self.assertEqual(result.astype(datetime.datetime), expected)
+
+    def testDateArrayPairsLikeExtractDate(self):
+        # The time goes with the day after it, not the first day
+        service = DateService()
+        now = datetime.datetime(2014, 6, 4, 12, 0)
+        inp = "monday or at 5:30 tuesday"
+        results = service.extractDateArray(
+            [inp], numpy.array([now], dtype='datetime64[s]'))
+        self.assertEqual(results[0].astype(datetime.datetime),
+                         service.extractDate(inp, now=now))
+        self.assertEqual(results[0].astype(datetime.datetime),
+                         datetime.datetime(2014, 6, 9, 12, 0))
+
+    def testDateArrayInvalidDate(self):
+        service = DateService()
+        now = numpy.array(['2015-06-01', '2016-06-01'], dtype='datetime64[D]')
+        results = service.extractDateArray(["February 29"] * 2, now)
+        self.assertEqual(str(results[0]), 'NaT')
+        self.assertEqual(results[1], numpy.datetime64('2016-02-29'))
+
+    def testDateArrayLength(self):
+        service = DateService()
+        now = numpy.array(['2015-06-01'], dtype='datetime64[D]')
+        self.assertRaises(ValueError,
+                          lambda: service.extractDateArray(["a", "b"], now))
+        self.assertEqual(len(service.extractDateArray([], now[:0])), 0)
+
 if __name__ == "__main__":
     suite = unittest.TestLoader().loadTestsFromTestCase(TestDate)
     unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,5 +1,6 @@
 from math import log, sin, sqrt, e, pi
 import unittest
+import numpy as np
 from semantic.solver import MathService
 
 
@@ -45,6 +46,85 @@ class TestMath(unittest.TestCase):
         inp = "two pie"
         self.compareSolution(inp, 2 * pi)
 
+    def testAssociativity(self):
+        self.compareSolution("ten minus three minus two", 5)
+        self.compareSolution("twelve over three times two", 8)
+        self.compareSolution("two to the three to two", 64)
+
+    def testPrecedence(self):
+        inp = "one plus two times three to the second power minus four " \
+            "over two"
+        self.compareSolution(inp, 1 + 2 * 3 ** 2 - 4 / 2)
+
+    def testUnaryScope(self):
+        inp = "sqrt four plus five times two"
+        self.compareSolution(inp, sqrt(4 + 5 * 2))
+
+    def testLongEquation(self):
+        inp = " plus ".join(["two times three"] * 2000)
+        self.compareSolution(inp, 12000)
+
+    def testMalformed(self):
+        service = MathService()
+        for inp in ["plus two", "two plus", "sqrt"]:
+            self.assertRaises(MathService.MathException,
+                              lambda: service.parseEquation(inp))
+
+    def testCompile(self):
+        expression = MathService().compile(
+            "x squared plus two x plus one", variables=['x'])
+        self.assertEqual(expression(3), 16)
+        self.assertEqual(expression(x=-1), 0)
+        self.assertIsInstance(MathService().compile(
+            "x times y", variables=['x', 'y'])(2, 3), float)
+
+    def testCompileVariables(self):
+        expression = MathService().compile(
+            "pi plus y times log x", variables=['x', 'y'])
+        self.assertAlmostEqual(expression(e, 2), pi + 2)
+        self.assertAlmostEqual(expression(y=2, x=e), pi + 2)
+
+    def testCompileArrays(self):
+        expression = MathService().compile(
+            "sqrt x times x plus y", variables=['x', 'y'])
+        x = np.array([1.0, 2.0, 3.0])
+        result = expression(x, 7)
+        self.assertTrue(np.allclose(result, np.sqrt(x * x + 7)))
+
+    def testCompileErrors(self):
+        service = MathService()
+        for v in ['pi', 'plus', 'sqrt', 'two']:
+            self.assertRaises(MathService.MathException,
+                              lambda: service.compile("x", variables=[v]))
+
+        expression = service.compile("x plus y", variables=['x', 'y'])
+        self.assertRaises(MathService.MathException, lambda: expression(1))
+        self.assertRaises(MathService.MathException,
+                          lambda: expression(1, 2, 3))
+        self.assertRaises(MathService.MathException,
+                          lambda: expression(1, x=2))
+
+    def testParseEquations(self):
+        service = MathService()
+        inputs = ["two plus three times four", "five plus one times two",
+                  "log e", "sqrt sixteen", "two pie",
+                  "two plus three times four"]
+        values, errors = service.parseEquations(inputs)
+        self.assertTrue((errors == MathService.SOLVED).all())
+        for inp, value in zip(inputs, values):
+            self.assertAlmostEqual(value, service.parseEquation(inp))
+
+    def testParseEquationsErrors(self):
+        inputs = ["one over zero", "foo plus two", "two plus", None, "seven"]
+        values, errors = MathService().parseEquations(inputs, masked=True)
+        self.assertEqual(list(errors), [MathService.MATH_ERROR,
+                                        MathService.UNKNOWN_NUMBER,
+                                        MathService.INVALID_EQUATION,
+                                        MathService.INVALID_EQUATION,
+                                        MathService.SOLVED])
+        self.assertEqual(list(values.mask), [True] * 4 + [False])
+        self.assertEqual(values[4], 7)
+
 if __name__ == "__main__":
     suite = unittest.TestLoader().loadTestsFromTestCase(TestMath)
     unittest.TextTestRunner(verbosity=2).run(suite)
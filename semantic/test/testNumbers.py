@@ -29,6 +29,14 @@ class TestNumbers(unittest.TestCase):
         inp = "five hundred and ten point one five"
         self.compareNumbers(inp, 510.15)
 
+    def testFloatFracPlural(self):
+        inp = "three and three quarters"
+        self.compareNumbers(inp, 3.75)
+
+    def testFloatFracSevenths(self):
+        inp = "two and three sevenths"
+        self.compareNumbers(inp, 2 + 3.0 / 7)
+
     #
     # Integer tests
     #
@@ -41,6 +49,87 @@ class TestNumbers(unittest.TestCase):
         inp = "fifty one million and eleven"
         self.compareNumbers(inp, 51000011)
 
+    def testCompoundInt(self):
+        inp = "one hundred and twenty one"
+        self.compareNumbers(inp, 121)
+
+    def testHyphenatedInt(self):
+        inp = "Twenty-One thousand"
+        self.compareNumbers(inp, 21000)
+
+    def testInvalid(self):
+        service = NumberService()
+        for inp in ["", "and five", "one and", "five point", "three 3",
+                    "first two", "two fifths"]:
+            self.assertRaises(NumberService.NumberException,
+                              lambda: service.parse(inp))
+
+    def testIsValid(self):
+        service = NumberService()
+        for inp in ["two and a quarter", "Twenty-One", "5.5", " 7 ", 3.0]:
+            self.assertTrue(service.isValid(inp))
+        for inp in ["", "the", "one and", "three 3", "two fifths", None]:
+            self.assertFalse(service.isValid(inp))
+
+    #
+    # Extraction tests
+    #
+
+    def testExtractNumbers(self):
+        inp = "Between five and ten apples, (three hundred and six) and 4.5 kg"
+        service = NumberService()
+        matches = service.extractNumbers(inp)
+        self.assertEqual([m.value for m in matches], [5, 10, 306, 4.5])
+        self.assertEqual([m.text for m in matches],
+                         ["five", "ten", "three hundred and six", "4.5"])
+        for m in matches:
+            self.assertEqual(inp[m.start:m.end], m.text)
+        self.assertEqual([(m.tokenStart, m.tokenEnd) for m in matches],
+                         [(1, 2), (3, 4), (5, 9), (10, 11)])
+
+    def testExtractFractions(self):
+        inp = "Mix two and a half cups with twelve thousand and eleven and " \
+            "one third grams"
+        service = NumberService()
+        values = [m.value for m in service.extractNumbers(inp)]
+        self.assertEqual(values, [2.5, 12011 + 1.0 / 3])
+
+    def testLongestNumber(self):
+        inp = "what is eleven and two thirds pounds converted to kilograms"
+        service = NumberService()
+        self.assertEqual(service.longestNumber(inp), 11 + 2.0 / 3)
+        self.assertEqual(service.longestNumber("no numbers here"), None)
+
+    def testLongestNumberSpan(self):
+        inp = "what is eleven and two thirds pounds converted to kilograms"
+        service = NumberService()
+        match = service.longestNumberSpan(inp)
+        self.assertEqual((match.kind, match.text, match.value),
+                         ('number', "eleven and two thirds", 11 + 2.0 / 3))
+        self.assertEqual(inp[match.start:match.end], match.text)
+        self.assertEqual(service.longestNumberSpan("no numbers here"), None)
+
+    #
+    # Batch tests
+    #
+
+    def testParseMany(self):
+        inp = ["two and a quarter", "fifty one", None, "two and a quarter",
+               "not a number", "5"]
+        service = NumberService()
+        values, errors = service.parseMany(inp)
+        self.assertEqual(values.dtype.name, 'float64')
+        self.assertEqual(list(values[[0, 1, 3, 5]]), [2.25, 51, 2.25, 5])
+        self.assertTrue(all(v != v for v in values[[2, 4]]))
+        self.assertEqual(list(errors), [
+            NumberService.PARSED, NumberService.PARSED,
+            NumberService.INVALID_INPUT, NumberService.PARSED,
+            NumberService.UNKNOWN_NUMBER, NumberService.PARSED])
+
+        values, errors = service.parseMany(inp, masked=True)
+        self.assertEqual(list(values.mask),
+                         [False, False, True, False, True, False])
+
     #
     # Readability tests
     #
@@ -0,0 +1,47 @@
+import unittest
+from semantic.prefilter import Prefilter
+
+
+class TestPrefilter(unittest.TestCase):
+
+    def setUp(self):
+        self.prefilter = Prefilter(Prefilter.vocabulary(
+            ['number', 'quantity', 'date', 'math']))
+
+    def compareSegments(self, inp, targets):
+        segments = self.prefilter.segments(inp.lower())
+        self.assertEqual([inp[start:end].strip() for start, end in segments],
+                         targets)
+
+    def testSegments(self):
+        inp = "The team met. They ate Twenty-Two apples! Nobody left; " \
+            "we meet on Friday.\nIt took 3 hours\nThen, nothing"
+        self.compareSegments(inp, [
+            "They ate Twenty-Two apples!",
+            "we meet on Friday.\nIt took 3 hours\nThen, nothing"])
+        self.assertEqual((self.prefilter.checked, self.prefilter.skipped),
+                         (5, 2))
+        self.assertEqual(self.prefilter.skippedFraction, 0.4)
+
+    def testWholeWords(self):
+        self.compareSegments("Someone often frets.", [])
+        self.compareSegments("Five hundreds.", ["Five hundreds."])
+        self.compareSegments("Two fifths", ["Two fifths"])
+        self.compareSegments("This morning.", ["This morning."])
+
+    def testKinds(self):
+        prefilter = Prefilter(Prefilter.vocabulary(['date']))
+        self.assertTrue(prefilter.mayMatch("see you in june"))
+        self.assertFalse(prefilter.mayMatch("pi times pi"))
+        prefilter = Prefilter(Prefilter.vocabulary(['math']))
+        self.assertTrue(prefilter.mayMatch("pi times pi"))
+        self.assertFalse(prefilter.mayMatch("see you in june"))
+
+    def testEmpty(self):
+        self.compareSegments("", [])
+        self.assertEqual(self.prefilter.skippedFraction, 0)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestLoader().loadTestsFromTestCase(TestPrefilter)
+    unittest.TextTestRunner(verbosity=2).run(suite)
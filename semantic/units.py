@@ -1,58 +1,349 @@
+from __future__ import division
 import re
-import quantities as pq
+from collections import namedtuple
+from .cache import LRUCache
+from .match import Match
 from .numbers import NumberService
 
+# quantities (and numpy, through it) is slow to import and builds its entire
+# unit registry on load, so it's only imported once a ConversionService is
+# constructed
+pq = None
+
+
+def _importQuantities():
+    global pq
+    if pq is None:
+        import quantities
+        pq = quantities
+    return pq
+
+
+ConversionPlan = namedtuple('ConversionPlan', ['scale', 'offset', 'units',
+                                               'error'])
+
+
+class ParsedConversion(namedtuple('ParsedConversion', [
+        'text', 'words', 'magnitude', 'magnitudeSpan', 'units',
+        'exponents'])):
+
+    """The result of preprocessing and tokenizing a conversion once, as
+    returned by ConversionService.parseConversion.
+
+    Attributes:
+        text (str): The original input.
+        words (tuple): The preprocessed words of the input.
+        magnitude (float): The longest number described in the input, or
+            None if not found.
+        magnitudeSpan (tuple): The [start, end) character offsets of the
+            magnitude in text, or None if not found.
+        units (list): The unit descriptions, in order of appearance.
+        exponents (list): (unit, exponent) pairs for each exponentiated
+            unit, e.g., ('feet', 2) for "square feet".
+    """
+
+    __slots__ = ()
+
+    @property
+    def source(self):
+        """The units from which to convert, or None if not found."""
+        return self.units[0] if self.units else None
+
+    @property
+    def target(self):
+        """The units to which to convert, or None if not found."""
+        return self.units[1] if len(self.units) > 1 else None
+
 
 class ConversionService(object):
 
+    """Initialize a ConversionService for converting between units described
+    in text.
+
+    Args:
+        cacheSize: An optional capacity for an LRUCache, available as
+            self.cache, which memoizes the results of isValidUnit. Unit
+            lookups are uncached if none is supplied.
+        planCacheSize: The capacity of the LRUCache, available as
+            self.plans, which holds compiled conversion plans keyed on
+            (source units, target units).
+
+    Returns:
+        A ConversionService which converts units, using a cache if requested.
+    """
+
+    def __init__(self, cacheSize=None, planCacheSize=256):
+        _importQuantities()
+        if cacheSize:
+            self.cache = LRUCache(cacheSize)
+        else:
+            self.cache = None
+        self.plans = LRUCache(planCacheSize)
+
+    class ConversionException(ValueError):
+
+        def __init__(self, msg):
+            ValueError.__init__(self, msg)
+
     __exponents__ = {
         'square': 2,
         'squared': 2,
+        'sq': 2,
+        'cubic': 3,
         'cubed': 3
     }
 
-    def _preprocess(self, inp):
-        def handleExponents(inp):
-            m = re.search(r'\bsquare (\w+)', inp)
-            if m and self.isValidUnit(m.group(1)):
-                inp = re.sub(r'\bsquare (\w+)', r'\g<1>^2', inp)
+    # Exponents which follow, rather than precede, their units
+    __postfixExponents__ = set(['squared', 'cubed'])
+
+    # Absolute temperature units, which quantities converts as differences,
+    # as (scale, offset) from degrees to kelvin
+    __temperatures__ = {
+        'K': (1.0, 0.0),
+        'degC': (1.0, 273.15),
+        'degR': (5 / 9, 0.0),
+        'degF': (5 / 9, 459.67 * 5 / 9)
+    }
+
+    # Words which quantities accepts as units, but which aren't in text
+    __notUnits__ = set(['point', 'a'])
+
+    # Index of unit names, symbols and aliases, and a trie of the words in
+    # multi-word units, built from the quantities registry on first use
+    _unitIndex = None
+    _unitTrie = None
+
+    _exponentRegex = re.compile(r'(.+?)(?:\^|\*\*)-?\d+$')
+
+    _operatorRegex = re.compile(r'[*/^().]')
+
+    _wordRegex = re.compile(r'\S+')
+
+    @staticmethod
+    def _loadUnits():
+        """Builds the unit index and trie from the quantities registry.
+
+        Returns:
+            A tuple (index, trie), where index is the set of single-word
+            labels accepted by quantities, and trie maps lowercased words
+            to nested tries, with the None key marking the label of the
+            unit spelled out so far (e.g., "fluid ounce").
+        """
+        if ConversionService._unitIndex is not None:
+            return ConversionService._unitIndex, ConversionService._unitTrie
+
+        candidates = set()
+        for attr in dir(pq.units):
+            unit = getattr(pq.units, attr)
+            if isinstance(unit, pq.UnitQuantity):
+                candidates.add(attr)
+                candidates.add(unit.name)
+                candidates.add(unit.symbol)
+                candidates.update(getattr(unit, '_aliases', []))
+
+        index = set()
+        for label in candidates:
+            try:
+                pq.Quantity(0.0, label)
+                index.add(label)
+            except:
+                pass
+
+        # Special cases handled by the registry itself
+        index.update(['', '%', 'in', 'In', 'IN', 'iN'])
+
+        trie = {}
+        for label in index:
+            words = label.split('_')
+            if len(words) < 2 or '' in words:
+                continue
+            node = trie
+            for w in words:
+                # 'per' is rewritten as '/' before units are extracted
+                w = w.lower()
+                node = node.setdefault('/' if w == 'per' else w, {})
+            node[None] = label
+
+        ConversionService._unitTrie = trie
+        ConversionService._unitIndex = index
+        return index, trie
+
+    def _matchUnit(self, words, i):
+        """Greedily matches the longest multi-word unit starting at words[i].
+
+        Args:
+            words (list): The words of the input.
+            i (int): The position at which the unit should begin.
+
+        Returns:
+            A tuple (label, end), where label is the quantities label of the
+            longest unit spelled out by words[i:end], or (None, i) if no
+            multi-word unit begins at i.
+        """
+        node = self._loadUnits()[1]
+        label, end = None, i
+        for j in range(i, len(words)):
+            node = node.get(words[j].lower())
+            if node is None:
+                break
+            if None in node:
+                label, end = node[None], j + 1
+        return label, end
+
+    _baseRegex = re.compile(r'\w+$')
+
+    def _tokenize(self, inp):
+        """Splits a conversion into words in a single pass, rewriting 'per'
+        as '/' and folding exponents into their units (e.g., "square feet"
+        and "feet squared" to 'feet^2', "meters to the fifth" to
+        'meters^5').
+
+        Returns:
+            A tuple (words, spans, exponents), where spans holds the
+            [start, end) character offsets in inp from which each word was
+            produced, and exponents lists (unit, exponent) pairs for each
+            exponentiated unit.
+        """
+        words = []
+        spans = []
+        exponents = []
+
+        def isBase(w):
+            return self._baseRegex.match(w) and self.isValidUnit(w)
+
+        raw = [(m.group(), m.start(), m.end())
+               for m in self._wordRegex.finditer(inp)]
+        i = 0
+        while i < len(raw):
+            w, start, end = raw[i]
+            following = raw[i + 1][0] if i + 1 < len(raw) else None
+            previous = words[-1] if words and spans[-1][2] else None
+
+            # Exponent preceding its unit, e.g., "square feet"
+            if w in self.__exponents__ and following and isBase(following):
+                exponent = self.__exponents__[w]
+                words.append('%s^%d' % (following, exponent))
+                spans.append((start, raw[i + 1][2], False))
+                exponents.append((following, exponent))
+                i += 2
+                continue
+
+            # Exponent following its unit, e.g., "feet squared"
+            if w in self.__postfixExponents__ and previous and \
+                    isBase(previous):
+                exponent = self.__exponents__[w]
+                words[-1] = '%s^%d' % (previous, exponent)
+                spans[-1] = (spans[-1][0], end, False)
+                exponents.append((previous, exponent))
+                i += 1
+                continue
+
+            # Ordinal exponent, e.g., "meters to the fifth (power)"
+            if w == 'to' and previous and i + 2 < len(raw) and \
+                    raw[i + 1][0] == 'the' and \
+                    raw[i + 2][0] in NumberService.__ordinals__ and \
+                    isBase(previous):
+                exponent = NumberService.parseMagnitude(raw[i + 2][0])
+                i += 3
+                if i < len(raw) and raw[i][0] == 'power':
+                    i += 1
+                words[-1] = '%s^%s' % (previous, exponent)
+                spans[-1] = (spans[-1][0], raw[i - 1][2], False)
+                exponents.append((previous, int(exponent)))
+                continue
+
+            words.append('/' if w == 'per' else w)
+            spans.append((start, end, True))
+            i += 1
+
+        return words, [span[:2] for span in spans], exponents
+
+    def _extractUnits(self, words):
+        """Collects the unit descriptions among a list of words, joining
+        consecutive units and preferring the longest multi-word unit."""
+        return [description for description, _, _ in
+                self._extractUnitRuns(words)]
+
+    def _extractUnitRuns(self, words):
+        """Collects the unit descriptions among a list of words, as in
+        _extractUnits.
+
+        Returns:
+            A list of (description, first, end) triples, each describing
+            the units spelled out by words[first:end].
+        """
+        units = []
+        description = ""
+        first = i = 0
+        while i < len(words):
+            w, end = self._matchUnit(words, i)
+            if w is None:
+                w, end = words[i], i + 1
+
+            if self.isValidUnit(w):
+                if description:
+                    description += " "
+                else:
+                    first = i
+                description += w
+            else:
+                if description:
+                    units.append((description, first, i))
+                description = ""
+            i = end
 
-            m = re.search(r'\bsquared (\w+)', inp)
-            if m and self.isValidUnit(m.group(1)):
-                inp = re.sub(r'\bsquared (\w+)', r'\g<1>^2', inp)
+        if description:
+            units.append((description, first, i))
+        return units
 
-            m = re.search(r'\b(\w+) squared', inp)
-            if m and self.isValidUnit(m.group(1)):
-                inp = re.sub(r'\b(\w+) squared', r'\g<1>^2', inp)
+    def parseConversion(self, inp):
+        """Parses a textual conversion into a ParsedConversion, which can be
+        passed to convert, extractUnits and parseUnits in place of the text,
+        so that it is only preprocessed and tokenized once.
 
-            m = re.search(r'\bsq (\w+)', inp)
-            if m and self.isValidUnit(m.group(1)):
-                inp = re.sub(r'\bsq (\w+)', r'\g<1>^2', inp)
+        Args:
+            inp (str): A textual representation of some quantity of units,
+                and possibly the units to which it should be converted.
 
-            m = re.search(r'\b(\w+) cubed', inp)
-            if m and self.isValidUnit(m.group(1)):
-                inp = re.sub(r'\b(\w+) cubed', r'\g<1>^3', inp)
+        Returns:
+            A ParsedConversion holding the magnitude, its span in inp, the
+            unit descriptions in order of appearance, and the exponents
+            folded into them.
+        """
+        words, spans, exponents = self._tokenize(inp)
 
-            m = re.search(r'\bcubic (\w+)', inp)
-            if m and self.isValidUnit(m.group(1)):
-                inp = re.sub(r'\bcubic (\w+)', r'\g<1>^3', inp)
+        numbers = NumberService()
+        longest = None
+        for match in numbers.extractNumbers(' '.join(words)):
+            # Drop trailing words that double as units (e.g., the 'second'
+            # of "one second"), which describe the units, not the magnitude
+            first, end = match.tokenStart, match.tokenEnd
+            while end > first and self.isValidUnit(words[end - 1]):
+                end -= 1
+            if end == first:
+                continue
 
-            service = NumberService()
-            m = re.search(r'\b(\w+) to the (\w+)( power)?', inp)
-            if m and self.isValidUnit(m.group(1)):
-                if m.group(2) in service.__ordinals__:
-                    exp = service.parseMagnitude(m.group(2))
-                    inp = re.sub(r'\b(\w+) to the (\w+)( power)?',
-                                   r'\g<1>^' + str(exp), inp)
+            value = match.value
+            if end < match.tokenEnd:
+                try:
+                    value = numbers.parse(' '.join(words[first:end]))
+                except NumberService.NumberException:
+                    continue
 
-            return inp
+            length = len(' '.join(words[first:end]))
+            if longest is None or length > longest[0]:
+                longest = (length, value, first, end)
 
-        inp = re.sub(r'\sper\s', r' / ', inp)
-        inp = handleExponents(inp)
+        magnitude = magnitudeSpan = None
+        if longest is not None:
+            _, value, first, end = longest
+            magnitude = float(value)
+            magnitudeSpan = (spans[first][0], spans[end - 1][1])
 
-        return inp
+        return ParsedConversion(inp, tuple(words), magnitude, magnitudeSpan,
+                                self._extractUnits(words), exponents)
 
-    def parseUnits(self, inp):
+    def parseUnits(self, inp, target=None):
         """Carries out a conversion (represented as a string) and returns the
         result as a human-readable string.
 
@@ -60,13 +351,15 @@ class ConversionService(object):
             inp (str): Text representing a unit conversion, which should
                 include a magnitude, a description of the initial units,
                 and a description of the target units to which the quantity
-                should be converted.
+                should be converted. May also be a ParsedConversion.
+            target (str): Optional units to convert to, in place of the
+                target units described in inp.
 
         Returns:
             A quantities object representing the converted quantity and its new
             units.
         """
-        quantity = self.convert(inp)
+        quantity = self.convert(inp, target)
         units = ' '.join(str(quantity.units).split(' ')[1:])
         return NumberService.parseMagnitude(quantity.item()) + " " + units
 
@@ -81,66 +374,162 @@ class ConversionService(object):
             True if the string can be used as a unit in the quantities
             module.
         """
-        bad = set(['point', 'a'])
-        if w in bad:
+        if self.cache is None:
+            return self._isValidUnit(w)
+
+        result = self.cache.get(w)
+        if result is None:
+            result = self._isValidUnit(w)
+            self.cache.put(w, result)
+        return result
+
+    def _isValidUnit(self, w):
+        """Checks w as in isValidUnit, bypassing the cache."""
+        if w in self.__notUnits__:
             return False
 
+        index = self._loadUnits()[0]
+        if w in index or w == '/':
+            return True
+
+        # Exponentiated units (e.g., 'meters^2'), as produced by _tokenize
+        m = self._exponentRegex.match(w)
+        if m and m.group(1) in index:
+            return True
+
+        # Leave compound expressions (e.g., 'kg/m**2') to quantities
+        if not self._operatorRegex.search(w):
+            return False
         try:
             pq.Quantity(0.0, w)
             return True
         except:
-            return w == '/'
+            return False
 
     def extractUnits(self, inp):
         """Collects all the valid units from an inp string. Works by
-        appending consecutive words from the string and cross-referncing
-        them with a set of valid units.
+        appending consecutive words from the string and cross-referencing
+        them with an index of valid units, preferring the longest match
+        for units spanning several words.
 
         Args:
             inp (str): Some text which hopefully contains descriptions
-                of different units.
+                of different units. May also be a ParsedConversion.
 
         Returns:
             A list of strings, each entry in which is a valid quantities
             unit.
         """
-        inp = self._preprocess(inp)
+        if isinstance(inp, ParsedConversion):
+            return list(inp.units)
+        return self._extractUnits(self._tokenize(inp)[0])
 
-        units = []
-        description = ""
-        for w in inp.split(' '):
-            if self.isValidUnit(w) or w == '/':
-                if description:
-                    description += " "
-                description += w
-            else:
-                if description:
-                    units.append(description)
-                description = ""
+    def extractUnitSpans(self, inp):
+        """Collects the valid units from an input string as in
+        extractUnits, along with where in the input each was found.
 
-        if description:
-            units.append(description)
-        return units
+        Args:
+            inp (str): Some text which hopefully contains descriptions
+                of different units.
 
-    def convert(self, inp):
+        Returns:
+            A list of Match of kind 'unit', whose values are the quantities
+            units of extractUnits, in order of appearance.
+        """
+        words, spans, _ = self._tokenize(inp)
+        return [Match('unit', spans[first][0], spans[end - 1][1],
+                      inp[spans[first][0]:spans[end - 1][1]], description)
+                for description, first, end in self._extractUnitRuns(words)]
+
+    def convert(self, inp, target=None):
         """Converts a string representation of some quantity of units into a
         quantities object.
 
         Args:
             inp (str): A textual representation of some quantity of units,
-                e.g., "fifty kilograms".
+                e.g., "fifty kilograms to pounds". May also be a
+                ParsedConversion, e.g., to convert a single quantity to
+                several different units.
+            target (str): Optional units to convert to, in place of the
+                target units described in inp.
 
         Returns:
             A quantities object representing the described quantity and its
             units.
+
+        Raises:
+            ConversionException: If inp lacks a magnitude or units, or the
+                units can't be converted.
         """
-        inp = self._preprocess(inp)
+        if not isinstance(inp, ParsedConversion):
+            inp = self.parseConversion(inp)
+
+        target = target or inp.target
+        if inp.magnitude is None:
+            raise ConversionService.ConversionException(
+                "No magnitude found: " + inp.text)
+        if inp.source is None or target is None:
+            raise ConversionService.ConversionException(
+                "No units to convert between: " + inp.text)
+
+        # Apply the (cached) plan for converting between the two units
+        plan = self.conversionPlan(inp.source, target)
+        return pq.Quantity(inp.magnitude * plan.scale + plan.offset,
+                           plan.units)
+
+    def conversionPlan(self, source, target):
+        """Returns the plan for converting between two units, compiling it
+        on first use. Plans are cached in self.plans.
+
+        Args:
+            source (str): The quantities units from which to convert.
+            target (str): The quantities units to which to convert.
+
+        Returns:
+            A ConversionPlan, such that a magnitude x in source units is
+            x * plan.scale + plan.offset in plan.units, the target units.
+
+        Raises:
+            ConversionException: If either units are unknown, or they
+                describe different dimensions.
+        """
+        key = (' '.join(source.split()), ' '.join(target.split()))
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = self._compilePlan(*key)
+            self.plans.put(key, plan)
+
+        if plan.error:
+            raise ConversionService.ConversionException(plan.error)
+        return plan
+
+    def _compilePlan(self, source, target):
+        """Compiles the ConversionPlan between source and target units.
+        Failures are returned as a plan with an error message, so that
+        they can be cached too."""
+        try:
+            fr = pq.Quantity(1.0, source)
+            to = pq.Quantity(1.0, target)
+        except:
+            return ConversionPlan(None, None, None, "Unknown units: %s, %s" %
+                                  (source, target))
+
+        # Check dimensions up front, rather than letting quantities raise
+        if fr.dimensionality.simplified != to.dimensionality.simplified:
+            return ConversionPlan(None, None, None,
+                                  "Cannot convert from %s to %s" %
+                                  (fr.dimensionality, to.dimensionality))
 
-        n = NumberService().longestNumber(inp)
-        units = self.extractUnits(inp)
+        scale = fr.rescale(to.dimensionality).item()
 
-        # Convert to quantity object, attempt conversion
-        quantity = pq.Quantity(float(n), units[0])
-        quantity.units = units[1]
+        # Shift between temperature scales with different zeros
+        offset = 0.0
+        frSymbol = getattr(pq.unit_registry[source], 'symbol', None)
+        toSymbol = getattr(pq.unit_registry[target], 'symbol', None)
+        if frSymbol in self.__temperatures__ and \
+                toSymbol in self.__temperatures__:
+            frScale, frOffset = self.__temperatures__[frSymbol]
+            toScale, toOffset = self.__temperatures__[toSymbol]
+            offset = (frOffset - toOffset) / toScale
 
-        return quantity
+        return ConversionPlan(scale, offset, to.dimensionality, None)